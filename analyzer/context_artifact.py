@@ -0,0 +1,119 @@
+import hashlib
+import json
+import time
+from config import PROMPT_SECTION_BUDGETS, MORPHEME_TOP_N
+from analyzer.prompt_budget import PromptAssembler
+from analyzer.sentence import split_sentences
+from analyzer.term_stats import TermStatistics
+from prompts.get_ref import ref
+from utils.tokens import count_tokens
+
+# 아티팩트 형식이 바뀌면 올려서 이전 아티팩트를 다시 만들도록 함
+CONTEXT_ARTIFACT_FORMAT = 1
+
+
+def _dedupe(items: list) -> list:
+    """순서를 유지하면서 빈 값과 중복을 제거합니다."""
+    seen = set()
+    result = []
+    for item in items:
+        if item and item not in seen:
+            seen.add(item)
+            result.append(item)
+    return result
+
+
+def _flatten_grouped(grouped: dict) -> list:
+    """{키: [값]}을 키 순서대로 (키, 값) 쌍 리스트로 펼칩니다. 같은 쌍은 한 번만 남깁니다."""
+    return _dedupe([(key, value) for key in sorted(grouped) for value in grouped[key]])
+
+
+def _render_grouped(pairs: list) -> str:
+    """(키, 값) 쌍을 '키': [값] 형태의 JSON 문자열로 만듭니다."""
+    if not pairs:
+        return "없음"
+    grouped = {}
+    for key, value in pairs:
+        grouped.setdefault(key, []).append(value)
+    return json.dumps(grouped, ensure_ascii=False)
+
+
+def build_category_artifact(analysis_data: dict, morpheme_counts, version: float = None) -> dict:
+    """
+    카테고리 DB의 분석 데이터로 저장용 컨텍스트 아티팩트를 만듭니다. (analyze 단계와 API 서버의 재구축이 함께 사용)
+    단어는 전체를 넣지 않고 카테고리에서 변별력이 큰 TF-IDF 상위 MORPHEME_TOP_N개만 사용하므로,
+    어느 쪽에서 만들어도 같은 분석 버전이면 같은 접두부와 content_hash가 나옵니다.
+    morpheme_counts는 파일명 순서대로 정렬된 (파일명, {단어: 빈도}) 쌍들입니다.
+    """
+    term_stats = TermStatistics.from_documents(morpheme_counts)
+    top_words = [word for word, _ in term_stats.top_terms(MORPHEME_TOP_N)]
+    return build_context_artifact(
+        **{**analysis_data, "unique_words": top_words or analysis_data["unique_words"]}, version=version
+    )
+
+
+def build_context_artifact(
+    unique_words: list,
+    sentences: list,
+    expressions: dict,
+    parameters: dict,
+    version: float = None
+) -> dict:
+    """
+    카테고리 분석 데이터로 원고 생성 프롬프트의 고정 컨텍스트 아티팩트를 만듭니다.
+    섹션별로 중복을 제거하고 토큰 예산에 맞게 자른 뒤, 요청마다 바뀌지 않는 프롬프트 접두부(prefix)로 직렬화합니다.
+    접두부가 요청 간에 바이트 단위로 같아야 API 제공자의 프롬프트 프리픽스 캐시가 적중하므로,
+    키워드에 따라 달라지는 내용은 여기에 넣지 않습니다.
+    unique_words는 중요한 순서(예: TF-IDF 상위)대로 넘기면 예산을 넘을 때 뒤쪽부터 잘립니다.
+    """
+    # 접두부가 프로세스마다 달라지지 않도록 실제 사용량 보정(token_ratio) 없이 tiktoken 값 그대로 예산을 적용
+    assembler = PromptAssembler(ratio=1.0)
+    assembler.add("ref", split_sentences(ref), lambda items: " ".join(items),
+                  budget=PROMPT_SECTION_BUDGETS["ref"])
+    assembler.add("words", _dedupe(unique_words), lambda items: ", ".join(items) if items else "없음",
+                  budget=PROMPT_SECTION_BUDGETS["words"])
+    assembler.add("sentences", _dedupe(sentences), lambda items: "\n- ".join(items) if items else "없음",
+                  budget=PROMPT_SECTION_BUDGETS["sentences"])
+    assembler.add("expressions", _flatten_grouped(expressions), _render_grouped,
+                  budget=PROMPT_SECTION_BUDGETS["expressions"])
+    assembler.add("parameters", _flatten_grouped(parameters), _render_grouped,
+                  budget=PROMPT_SECTION_BUDGETS["parameters"])
+    sections, report = assembler.build()
+
+    prefix = f"""
+    [참고 문서]
+    {sections["ref"]}
+
+    [고유 단어 리스트]
+    {sections["words"]}
+
+    [문장 리스트]
+     - {sections["sentences"]}
+
+    [표현 라이브러리 (중분류 키워드: [표현])]
+    {sections["expressions"]}
+
+    [AI 개체 인식 및 그룹화 결과 (대표 키워드: [개체])]
+    {sections["parameters"]}
+    """
+
+    return {
+        "format": CONTEXT_ARTIFACT_FORMAT,
+        "version": version,
+        "content_hash": hashlib.sha256(prefix.encode("utf-8")).hexdigest(),
+        "prefix": prefix,
+        "prefix_tokens": count_tokens(prefix),
+        "section_tokens": report["section_tokens"],
+        "trimmed_items": report["trimmed_items"],
+        "created_at": time.time(),
+    }
+
+
+def is_artifact_current(artifact: dict, version: float) -> bool:
+    """저장된 아티팩트가 현재 형식이고 주어진 분석 버전으로 만들어졌는지 확인합니다."""
+    return (
+        artifact is not None
+        and artifact.get("format") == CONTEXT_ARTIFACT_FORMAT
+        and version is not None
+        and artifact.get("version") == version
+    )
@@ -0,0 +1,116 @@
+import codecs
+import hashlib
+from pathlib import Path
+
+# 파일을 스트리밍으로 읽을 때 한 번에 읽는 바이트 수
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+def read_document(file_path) -> dict:
+    """
+    텍스트 파일 하나를 한 번만 읽어 분석 단계들이 공유할 문서(dict)로 반환합니다.
+    바이트를 한 번에 읽은 뒤 UTF-8로 한 번만 디코딩하고, 같은 바이트로 내용 해시를 계산합니다.
+    """
+    file_path = Path(file_path)
+    stat = file_path.stat()
+    raw = file_path.read_bytes()
+    return {
+        "path": file_path,
+        "name": file_path.name,
+        "content": raw.decode('utf-8'),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "content_hash": hashlib.sha256(raw).hexdigest(),
+    }
+
+
+def iter_file_bytes(file_path, chunk_bytes: int = READ_CHUNK_BYTES):
+    """파일을 chunk_bytes 크기의 바이트 조각으로 차례로 읽습니다."""
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_text_chunks(file_path, chunk_bytes: int = READ_CHUNK_BYTES):
+    """
+    UTF-8 텍스트 파일을 조각 단위로 디코딩하여 차례로 반환합니다.
+    조각 경계에서 잘린 멀티바이트 문자는 증분 디코더가 다음 조각과 이어 붙입니다.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in iter_file_bytes(file_path, chunk_bytes):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def fingerprint_file(file_path) -> dict:
+    """
+    본문을 메모리에 올리지 않고 파일의 크기, 수정 시각, 내용 해시를 계산합니다.
+    반환값은 {"path", "name", "size", "mtime", "content_hash"} 형태이며, 본문은 필요할 때 iter_text_chunks로 읽습니다.
+    """
+    file_path = Path(file_path)
+    stat = file_path.stat()
+    digest = hashlib.sha256()
+    for chunk in iter_file_bytes(file_path):
+        digest.update(chunk)
+    return {
+        "path": file_path,
+        "name": file_path.name,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "content_hash": digest.hexdigest(),
+    }
+
+
+def read_document_text(document: dict) -> str:
+    """문서의 본문을 반환합니다. 본문 없이 fingerprint_file로 만든 문서라면 그때 파일을 읽습니다."""
+    if "content" in document:
+        return document["content"]
+    return "".join(iter_text_chunks(document["path"]))
+
+
+def load_corpus(directory_path) -> list:
+    """
+    디렉토리의 모든 .txt 파일을 파일명 순서대로 한 번씩 읽어 문서 목록을 반환합니다.
+    각 문서는 {"path", "name", "content", "size", "mtime", "content_hash"} 형태입니다.
+    """
+    p = Path(directory_path)
+    return [read_document(file_path) for file_path in sorted(p.glob('*.txt'))]
+
+
+def scan_corpus_changes(directory_path, manifest: dict) -> dict:
+    """
+    디렉토리의 .txt 파일을 이전에 처리한 파일 목록(manifest: {파일명: {"size", "mtime", "content_hash"}})과 비교합니다.
+    크기와 수정 시각이 같으면 파일을 읽지 않고 그대로 둔 것으로 보고, 다르면 스트리밍으로 읽어 내용 해시로 실제 변경 여부를 판단합니다.
+    반환되는 문서에는 본문이 들어 있지 않습니다. (fingerprint_file 참고)
+
+    반환값:
+        {"added": [문서], "changed": [문서], "touched": [문서], "unchanged": [파일명], "deleted": [파일명]}
+        touched는 수정 시각만 바뀌고 내용은 같은 파일로, 다시 분석할 필요 없이 manifest만 갱신하면 됩니다.
+    """
+    changes = {"added": [], "changed": [], "touched": [], "unchanged": [], "deleted": []}
+    present = set()
+    for file_path in sorted(Path(directory_path).glob('*.txt')):
+        present.add(file_path.name)
+        entry = manifest.get(file_path.name)
+        stat = file_path.stat()
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+            changes["unchanged"].append(file_path.name)
+            continue
+
+        document = fingerprint_file(file_path)
+        if entry is None:
+            changes["added"].append(document)
+        elif entry.get("content_hash") == document["content_hash"]:
+            changes["touched"].append(document)
+        else:
+            changes["changed"].append(document)
+
+    changes["deleted"] = sorted(name for name in manifest if name not in present)
+    return changes
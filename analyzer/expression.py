@@ -1,14 +1,12 @@
 import re
-from openai import OpenAI
 import json
 from config import OPENAI_API_KEY
+from utils.llm_cache import cached_chat_completion
 
 def extract_expressions_with_ai(text: str) -> dict:
     if not OPENAI_API_KEY:
         raise ValueError("API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
     prompt = f"""
     다음은 블로그 원고의 일부입니다.
 
@@ -27,8 +25,13 @@ def extract_expressions_with_ai(text: str) -> dict:
     }}
     """
 
+    def parse(raw):
+        cleaned = re.sub(r"^```json|```$", "", raw).strip()
+        return json.loads(cleaned)
+
     try:
-        response = client.chat.completions.create(
+        return cached_chat_completion(
+            "gpt",
             model='gpt-4.1-mini-2025-04-14',
             messages=[
                 {
@@ -37,14 +40,12 @@ def extract_expressions_with_ai(text: str) -> dict:
                 },
                 {"role": "user", "content": prompt}
             ],
+            parse=parse,
             # temperature=0.5,
             
         )
 
-        raw = response.choices[0].message.content.strip()
-        cleaned = re.sub(r"^```json|```$", "", raw).strip()
-        return json.loads(cleaned)
-
-    except Exception as e:
-        print(f"OpenAI API 호출 중 오류가 발생했습니다: {e}")
+    except json.JSONDecodeError as e:
+        # 재시도 후에도 실패한 API 오류는 호출한 쪽에서 파일별 실패로 처리하도록 그대로 전달
+        print(f"AI 응답을 JSON으로 해석하지 못했습니다: {e}")
         return None
\ No newline at end of file
@@ -1,19 +1,22 @@
 import os
 from pathlib import Path
-import kss
+from analyzer.pipeline import split_library_sentences
 
-def build_sentence_library(directory_path):
+def build_sentence_library(directory_path, workers=None):
     library = {}
     p = Path(directory_path)
     
+    items = []
     for file_path in p.glob('*.txt'):
         category = file_path.stem  # 파일명에서 확장자를 제외한 부분을 카테고리로 사용
         
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
-            
-        sentences = kss.split_sentences(content)
-        
+
+        items.append((category, content))
+
+    # kss 문장 분리는 무거운 CPU 작업이므로 여러 프로세스에서 나눠 처리
+    for category, sentences in split_library_sentences(items, workers=workers):
         if category not in library:
             library[category] = []
         library[category].extend(sentences)
@@ -1,88 +1,202 @@
 import os
-from openai import OpenAI
-import json
-from config import OPENAI_API_KEY
+from config import PROMPT_SECTION_BUDGETS, MANUSCRIPT_MAX_TOKENS
+from llm.providers import PROVIDERS, ResponseTruncatedError, TRUNCATED_FINISH_REASON, complete, acomplete, astream, ensure_complete
+from llm.routing import generation_router
 from mongodb_service import MongoDBService
 from prompts.get_ko_prompt import getKoPrompt
 from prompts.get_my_ko_prompt import myGetKoPrompt
-from prompts.get_ref import ref
+from analyzer.context_artifact import build_context_artifact
+from analyzer.prompt_budget import PromptAssembler, record_token_usage
+from analyzer.retrieval import ContextRetriever
 from typing import Optional
 
 
-def generate_manuscript_with_ai(
+MANUSCRIPT_MODEL = 'gpt-5-mini-2025-08-07'
+# MANUSCRIPT_MODEL = 'gpt-5-nano-2025-08-07'
+# MANUSCRIPT_MODEL = 'gpt-4.1-2025-04-14'
+
+
+def _manuscript_model(service: str) -> Optional[str]:
+    """gpt는 원고 전용 모델을, 다른 서비스는 제공자 기본 모델(None)을 사용합니다."""
+    return MANUSCRIPT_MODEL if service == "gpt" else None
+
+
+def _manuscript_options(service: str) -> dict:
+    """원고 생성에 쓸 제공자별 최대 출력 토큰 수 인자입니다. (MANUSCRIPT_MAX_TOKENS에 없으면 제공자 기본값)"""
+    max_tokens = MANUSCRIPT_MAX_TOKENS.get(service)
+    if max_tokens is None:
+        return {}
+    # OpenAI 추론 모델(gpt-5 등)은 max_tokens 대신 max_completion_tokens만 받음
+    key = "max_tokens" if PROVIDERS[service]["kind"] == "anthropic" else "max_completion_tokens"
+    return {key: max_tokens}
+
+
+def build_manuscript_messages(
     unique_words: list,
     sentences: list,
     expressions: dict,
     parameters: dict,
-    user_instructions: str
-) -> str:
+    user_instructions: str,
+    retriever: ContextRetriever = None,
+    artifact: dict = None
+) -> tuple:
     """
-    수집된 분석 데이터를 기반으로 OpenAI API를 사용하여 블로그 원고를 생성합니다.
+    분석 데이터로 원고 생성 요청 메시지(system + user)를 만들고, (messages, 토큰 리포트)를 반환합니다.
+    요청마다 같은 system 프롬프트와 미리 만들어 둔 컨텍스트 아티팩트(analyzer.context_artifact)를 앞에 두고,
+    키워드에 따라 달라지는 사용자 지시사항과 RAG 스니펫은 맨 뒤에 붙여 API 제공자의 프롬프트 프리픽스 캐시가 적중하도록 합니다.
+    retriever나 artifact를 넘기지 않으면 전달된 데이터로 새로 만듭니다.
     """
-# 출력 길이 목표: 한글 공백 포함 {target_chars}자 ±10%.
-    if not OPENAI_API_KEY:
-        raise ValueError("API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    if artifact is None:
+        artifact = build_context_artifact(unique_words, sentences, expressions, parameters)
+    if retriever is None:
+        retriever = ContextRetriever(sentences)
+    rag_snippets = retriever.select_snippets(user_instructions)
+
+    gore_level = 2
+    system_prompt = f'''
+                 너는 인터넷 괴담/게시판 스레드풍 이야기 생성기다. 
+출력은 ‘일본 2ch/5ch 풍 스레드 로그 + 한글 내레이션 혼합’ 형식으로만 작성한다.
+반드시 창작하되, 사실 명예훼손·실존인물 식별·개인정보·증오표현·과도한 고어를 피한다.
+불쾌·잔혹 수위는 {gore_level}로 제한한다(0=전무, 1=묘사 최소, 2=암시 위주, 3=노골적). 
+실존 지명은 광역단위까지만, 구체 주소/연락처/기관명은 생성하지 않는다.
+유사도 검사: RAG 문서의 문장을 12자 이상 연속 복붙 금지. 표현은 변형하되 핵심 설정만 참고.
 
-    words_str = ", ".join(unique_words) if unique_words else "없음"
-    sentences_str = "\n- ".join(sentences) if sentences else "없음"
-    expressions_str = json.dumps(expressions, ensure_ascii=False, indent=2) if expressions else "없음"
-    parameters_str = json.dumps(parameters, ensure_ascii=False, indent=2) if parameters else "없음"
+형식 강제: “스레드 OP 도입 → 몇 개의 리플 번호/ID/시각 → OP 추가 사진/메모 → 요약/후일담 3줄” 순서.
+                 '''
 
-    prompt = f"""
+    def render_request(snippets):
+        rag_text = "\n".join(f"- {s}" for s in snippets)
+        return f"""{getKoPrompt(topk=len(snippets), rag_snippets=rag_text)}
+    """
 
-    [고유 단어 리스트]
-    {words_str}
+    # 섹션을 이어 붙인 결과가 실제로 보내는 메시지와 같도록 나누어, 예상 토큰 수와 보정 비율이 보낸 텍스트를 기준으로 계산되게 함
+    assembler = PromptAssembler()
+    assembler.add("system", [system_prompt], lambda items: "".join(items), required=True)
+    assembler.add("context", [artifact["prefix"]], lambda items: "".join(items), required=True)
+    assembler.add("user_instructions", [user_instructions], lambda items: f"""
+    [사용자 지시사항]
+    {items[0]}
 
-    [문장 리스트]
-     - {sentences_str}
-    
-    [표현 라이브러리 (중분류 키워드: [표현])]
-    {expressions_str}
+    [요청]
 
-    [AI 개체 인식 및 그룹화 결과 (대표 키워드: [개체])]
-    {parameters_str}
+    """, required=True)
+    # RAG 스니펫 예산은 스니펫 자체에만 적용되도록, 스니펫 없이 렌더링한 요청 프롬프트만큼 더해 줌
+    assembler.add("request", rag_snippets, render_request,
+                  budget=PROMPT_SECTION_BUDGETS["rag_snippets"] + assembler.count(render_request([])))
+    sections, report = assembler.build()
+    report["context_hash"] = artifact["content_hash"]
 
-    [사용자 지시사항]
-    {user_instructions}
+    # 고정 접두부(아티팩트) 뒤에 요청별로 달라지는 부분만 붙임
+    prompt = sections["context"] + sections["user_instructions"] + sections["request"]
 
-    [참고 문서]
-    {ref}
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+    return messages, report
 
-    [요청]
 
-    {getKoPrompt()}
+def generate_manuscript_with_ai(
+    unique_words: list,
+    sentences: list,
+    expressions: dict,
+    parameters: dict,
+    user_instructions: str,
+    retriever: ContextRetriever = None,
+    artifact: dict = None,
+    service: str = "gpt"
+) -> str:
+    """
+    수집된 분석 데이터를 기반으로 LLM(service: gpt, claude, gemini, solar)을 사용하여 블로그 원고를 생성합니다.
+    service가 auto이면 응답 시간이 짧은 제공자부터 시도하고, 실패하면 다음 제공자로 넘어갑니다.
     """
+# 출력 길이 목표: 한글 공백 포함 {target_chars}자 ±10%.
+    messages, prompt_report = build_manuscript_messages(unique_words, sentences, expressions, parameters, user_instructions, retriever, artifact)
 
     try:
-        gore_level = 2
-        
-        response = client.chat.completions.create(
-            model='gpt-5-mini-2025-08-07',
-            # model='gpt-5-nano-2025-08-07',
-            # model='gpt-4.1-2025-04-14', 
-            messages=[
-                {"role": "system", "content": f'''
-                 너는 인터넷 괴담/게시판 스레드풍 이야기 생성기다. 
-출력은 ‘일본 2ch/5ch 풍 스레드 로그 + 한글 내레이션 혼합’ 형식으로만 작성한다.
-반드시 창작하되, 사실 명예훼손·실존인물 식별·개인정보·증오표현·과도한 고어를 피한다.
-불쾌·잔혹 수위는 {gore_level}로 제한한다(0=전무, 1=묘사 최소, 2=암시 위주, 3=노골적). 
-실존 지명은 광역단위까지만, 구체 주소/연락처/기관명은 생성하지 않는다.
-유사도 검사: RAG 문서의 문장을 12자 이상 연속 복붙 금지. 표현은 변형하되 핵심 설정만 참고.
-
-형식 강제: “스레드 OP 도입 → 몇 개의 리플 번호/ID/시각 → OP 추가 사진/메모 → 요약/후일담 3줄” 순서.
-                 '''},
-                {"role": "user", "content": prompt}
-            ],
-            # temperature=0.2,
-            
-        )
-        usage = response.usage
-        print(f"사용된 토큰 수 - prompt: {usage.prompt_tokens}, completion: {usage.completion_tokens}, total: {usage.total_tokens}")
+        if service == "auto":
+            result = generation_router.complete(messages, model_for=_manuscript_model, options_for=_manuscript_options)
+        else:
+            result = ensure_complete(service, complete(
+                service,
+                messages,
+                model=_manuscript_model(service),
+                **_manuscript_options(service),
+                # temperature=0.2,
+            ))
+        record_token_usage(prompt_report, result["usage"])
 
-        generated_manuscript = response.choices[0].message.content.strip()
+        generated_manuscript = result["content"].strip()
 
         return generated_manuscript
     except Exception as e:
-        print(f"OpenAI API 호출 중 오류가 발생했습니다: {e}")
-        raise
\ No newline at end of file
+        print(f"{service} API 호출 중 오류가 발생했습니다: {e}")
+        raise
+
+
+async def generate_manuscript_with_ai_async(
+    unique_words: list,
+    sentences: list,
+    expressions: dict,
+    parameters: dict,
+    user_instructions: str,
+    retriever: ContextRetriever = None,
+    artifact: dict = None,
+    service: str = "gpt",
+    hedge: bool = None
+) -> str:
+    """
+    generate_manuscript_with_ai의 비동기 버전입니다. 공유 비동기 클라이언트를 사용하여 이벤트 루프를 막지 않습니다.
+    service가 auto이면 llm.routing의 제공자 선택·장애 전환을 사용하며, hedge로 헤지 요청 여부를 정합니다. (None이면 설정값)
+    """
+    messages, prompt_report = build_manuscript_messages(unique_words, sentences, expressions, parameters, user_instructions, retriever, artifact)
+
+    try:
+        if service == "auto":
+            result = await generation_router.acomplete(
+                messages, model_for=_manuscript_model, options_for=_manuscript_options, hedge=hedge
+            )
+        else:
+            result = ensure_complete(
+                service, await acomplete(service, messages, model=_manuscript_model(service), **_manuscript_options(service))
+            )
+        record_token_usage(prompt_report, result["usage"])
+
+        return result["content"].strip()
+    except Exception as e:
+        print(f"{service} API 호출 중 오류가 발생했습니다: {e}")
+        raise
+
+
+async def stream_manuscript_with_ai(
+    unique_words: list,
+    sentences: list,
+    expressions: dict,
+    parameters: dict,
+    user_instructions: str,
+    retriever: ContextRetriever = None,
+    artifact: dict = None,
+    service: str = "gpt"
+):
+    """
+    원고를 토큰 단위로 스트리밍하는 비동기 제너레이터입니다.
+    ("token", 텍스트 조각)을 차례로 내보내고, 마지막에 ("usage", 예상/실제 토큰 사용량 dict)를 내보냅니다.
+    service가 auto이면 첫 토큰 전에 실패한 제공자만 다음 제공자로 전환합니다. (스트리밍은 헤지하지 않음)
+    응답이 최대 출력 토큰 수에 걸려 잘렸으면 마지막에 ResponseTruncatedError를 발생시킵니다.
+    """
+    messages, prompt_report = build_manuscript_messages(unique_words, sentences, expressions, parameters, user_instructions, retriever, artifact)
+
+    if service == "auto":
+        events = generation_router.astream(messages, model_for=_manuscript_model, options_for=_manuscript_options)
+    else:
+        events = astream(service, messages, model=_manuscript_model(service), **_manuscript_options(service))
+    truncated = False
+    async for kind, value in events:
+        if kind == "token":
+            yield "token", value
+        elif kind == "finish":
+            truncated = value == TRUNCATED_FINISH_REASON
+        else:
+            yield "usage", record_token_usage(prompt_report, value)
+    if truncated:
+        raise ResponseTruncatedError("원고가 최대 출력 토큰 수에 걸려 잘렸습니다.")
@@ -0,0 +1,99 @@
+from collections import deque
+
+
+class ParameterMatcher:
+    """
+    known_parameters_map('대표 키워드': ['값1', '값2'])의 모든 값으로 Aho–Corasick 오토마톤을 한 번 만들어,
+    문서를 한 번 선형 스캔하는 것만으로 모든 값의 등장 위치를 찾습니다.
+    """
+
+    def __init__(self, known_parameters_map: dict):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._values = []  # 패턴 번호 -> 값
+        self._keys = []    # 패턴 번호 -> 해당 값을 가진 대표 키워드 목록
+
+        value_index = {}
+        for key, values in known_parameters_map.items():
+            for value in values:
+                if not value:
+                    continue
+                if value in value_index:
+                    keys = self._keys[value_index[value]]
+                    if key not in keys:
+                        keys.append(key)
+                    continue
+                value_index[value] = len(self._values)
+                self._values.append(value)
+                self._keys.append([key])
+                self._insert(value, value_index[value])
+        self._build_failure_links()
+
+    def _insert(self, value: str, pattern_id: int):
+        state = 0
+        for char in value:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def find_all(self, text: str) -> list:
+        """텍스트에 등장하는 모든 값의 (시작, 끝, 값, 대표 키워드 목록)을 겹치는 것까지 모두 반환합니다."""
+        matches = []
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_id in self._output[state]:
+                value = self._values[pattern_id]
+                matches.append((position - len(value) + 1, position + 1, value, self._keys[pattern_id]))
+        return matches
+
+    def template(self, text: str):
+        """
+        가장 왼쪽-가장 긴 일치를 우선하여 값을 '[대표 키워드]'로 대체한 텍스트와 모호 여부를 반환합니다.
+        한 값이 여러 대표 키워드에 속하거나, 서로 다른 키워드의 값이 부분적으로 겹치면 모호한 것으로 봅니다.
+        """
+        matches = sorted(self.find_all(text), key=lambda m: (m[0], -(m[1] - m[0])))
+        selected = []
+        ambiguous = False
+        last_end = 0
+        for start, end, value, keys in matches:
+            if start >= last_end:
+                selected.append((start, end, keys))
+                last_end = end
+                if len(keys) > 1:
+                    ambiguous = True
+            elif end > last_end and keys != selected[-1][2]:
+                ambiguous = True
+
+        if not selected:
+            return text, False
+
+        parts = []
+        cursor = 0
+        for start, end, keys in selected:
+            parts.append(text[cursor:start])
+            parts.append(f"[{keys[0]}]")
+            cursor = end
+        parts.append(text[cursor:])
+        return ''.join(parts), ambiguous
@@ -1,5 +1,132 @@
+import os
 import re
+from collections import Counter
+from glob import glob
+from config import (
+    MORPHEME_BACKEND,
+    MORPHEME_JVM_MAX_HEAP,
+    MORPHEME_JVM_CODE_CACHE,
+    MORPHEME_JVM_OPTIONS,
+    MORPHEME_BATCH_CHARS,
+)
 
-def analyze_morphemes(text: str) -> list:
-    
-    return list(set(re.findall(r'[가-힣]{2,}', text)))
+try:
+    import jpype
+    from konlpy.tag import Okt
+except ImportError:  # konlpy/jpype가 없으면 다른 백엔드로 대체
+    jpype = None
+    Okt = None
+
+try:
+    from kiwipiepy import Kiwi
+except ImportError:  # JVM이 필요 없는 선택적 백엔드
+    Kiwi = None
+
+# 모듈을 불러올 때 한 번만 컴파일 (프로세스 풀의 각 워커에서도 한 번씩만 컴파일됨)
+WORD_PATTERN = re.compile(r'[가-힣]{2,}')
+
+# 형태소 분석 결과에서 남길 품사 (체언·용언·부사)
+OKT_CONTENT_TAGS = {"Noun", "Verb", "Adjective", "Adverb"}
+KIWI_CONTENT_TAG_PREFIXES = ("NN", "VV", "VA", "MA")
+
+# 프로세스마다 한 번만 만드는 형태소 분석기 (백엔드 이름, 분석기)
+_tagger = None
+
+
+def start_jvm():
+    """
+    konlpy용 JVM을 프로세스당 한 번만 시작합니다. 이미 시작되어 있으면 아무것도 하지 않습니다.
+    konlpy 기본 초기화는 -Xmx만 지정하는데, 기본 코드 캐시 예약 크기에서 시작 직후
+    CodeHeap::allocate로 JVM이 죽는 경우가 있어 코드 캐시 크기를 함께 지정합니다.
+    """
+    if jpype.isJVMStarted():
+        return
+    import konlpy
+
+    java_dir = os.path.join(konlpy.__path__[0], "java")
+    classpath = [java_dir, os.path.join(java_dir, "bin")] + sorted(glob(os.path.join(java_dir, "*.jar")))
+    options = [
+        "-Dfile.encoding=UTF8",
+        "-ea",
+        f"-Xmx{MORPHEME_JVM_MAX_HEAP}",
+        f"-XX:ReservedCodeCacheSize={MORPHEME_JVM_CODE_CACHE}",
+        *MORPHEME_JVM_OPTIONS.split(),
+    ]
+    jpype.startJVM(jpype.getDefaultJVMPath(), *options, classpath=classpath, convertStrings=True)
+
+
+def _create_tagger(backend: str):
+    if backend == "okt":
+        if Okt is None:
+            raise ImportError("konlpy/jpype1이 설치되어 있지 않습니다.")
+        start_jvm()
+        return Okt()
+    if backend == "kiwi":
+        if Kiwi is None:
+            raise ImportError("kiwipiepy가 설치되어 있지 않습니다.")
+        return Kiwi()
+    if backend == "regex":
+        return None
+    raise ValueError(f"알 수 없는 형태소 분석 백엔드입니다: {backend}")
+
+
+def get_tagger():
+    """
+    설정된 백엔드(MORPHEME_BACKEND)의 형태소 분석기를 프로세스당 한 번만 만들어 반환합니다. ((백엔드 이름, 분석기))
+    auto이면 okt(konlpy) → kiwi(kiwipiepy) → regex 순서로 사용 가능한 첫 백엔드를 씁니다.
+    """
+    global _tagger
+    if _tagger is None:
+        backends = ("okt", "kiwi", "regex") if MORPHEME_BACKEND == "auto" else (MORPHEME_BACKEND,)
+        for backend in backends:
+            try:
+                _tagger = (backend, _create_tagger(backend))
+                break
+            except Exception as e:
+                print(f"형태소 분석 백엔드 '{backend}'를 사용할 수 없어 다음 백엔드로 대체합니다: {e}")
+        else:
+            _tagger = ("regex", None)
+    return _tagger
+
+
+def warm_up():
+    """프로세스 풀 워커 시작 시 JVM과 형태소 분석기를 미리 준비합니다. (파일마다 시작 비용을 내지 않도록)"""
+    get_tagger()
+
+
+def _extract_words(backend: str, tagger, text: str) -> list:
+    if backend == "okt":
+        return [
+            word for word, tag in tagger.pos(text, norm=True, stem=True)
+            if tag in OKT_CONTENT_TAGS and len(word) >= 2
+        ]
+    if backend == "kiwi":
+        words = []
+        for token in tagger.tokenize(text):
+            if not token.tag.startswith(KIWI_CONTENT_TAG_PREFIXES):
+                continue
+            # 용언은 기본형(어간 + 다)으로 맞춘 뒤 길이를 확인 (okt처럼 '하다', '먹다' 같은 한 글자 어간도 남김)
+            word = token.form + "다" if token.tag.startswith(("VV", "VA")) else token.form
+            if len(word) >= 2:
+                words.append(word)
+        return words
+    return WORD_PATTERN.findall(text)
+
+
+def count_morphemes_batch(texts, batch_chars: int = MORPHEME_BATCH_CHARS) -> Counter:
+    """
+    여러 텍스트(예: 한 파일의 문장들)를 batch_chars자 정도씩 줄바꿈으로 이어 붙여 한 번에 품사 태깅하고,
+    단어별 등장 횟수를 Counter로 반환합니다. 문장마다 분석기를 호출하는 것보다 JVM 호출 횟수가 크게 줄어듭니다.
+    """
+    backend, tagger = get_tagger()
+    counts = Counter()
+    batch, size = [], 0
+    for text in texts:
+        batch.append(text)
+        size += len(text) + 1
+        if size >= batch_chars:
+            counts.update(_extract_words(backend, tagger, "\n".join(batch)))
+            batch, size = [], 0
+    if batch:
+        counts.update(_extract_words(backend, tagger, "\n".join(batch)))
+    return counts
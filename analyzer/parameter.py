@@ -1,15 +1,13 @@
 import os
-from openai import OpenAI
 import json
 from config import OPENAI_API_KEY
+from utils.llm_cache import cached_chat_completion
 
 def extract_and_group_entities_with_ai(full_text):
     """OpenAI API를 사용하여 원고 내용에서 직접 개체를 인식하고 그룹화합니다."""
     if not OPENAI_API_KEY:
         raise ValueError("API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
-
     prompt = f"""다음은 여러 블로그 원고를 합친 텍스트입니다.
 
 [원고 내용]
@@ -28,18 +26,19 @@ def extract_and_group_entities_with_ai(full_text):
 """
 
     try:
-        response = client.chat.completions.create(
+        grouped_params = cached_chat_completion(
+            "gpt",
             model='gpt-5-mini-2025-08-07',
             messages=[
                 {"role": "system", "content": "You are an expert in Named Entity Recognition and text analysis. Your task is to extract key entities from the text and group them semantically into a JSON format."},
                 {"role": "user", "content": prompt}
             ],
+            parse=json.loads,
             # response_format={"type": "json_object"}
         )
-        
-        grouped_params = json.loads(response.choices[0].message.content)
         return grouped_params
 
-    except Exception as e:
-        print(f"OpenAI API 호출 중 오류가 발생했습니다: {e}")
+    except json.JSONDecodeError as e:
+        # 재시도 후에도 실패한 API 오류는 호출한 쪽에서 파일별 실패로 처리하도록 그대로 전달
+        print(f"AI 응답을 JSON으로 해석하지 못했습니다: {e}")
         return None
@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from analyzer.corpus import iter_text_chunks
+from config import ANALYSIS_MAX_PENDING_BYTES
+from analyzer.morpheme import count_morphemes_batch, warm_up
+from analyzer.sentence import iter_sentences, split_sentences
+
+
+def _analyze_text_chunk(chunk: list) -> list:
+    """워커 프로세스에서 (파일명, 본문) 묶음을 형태소 분석·문장 분리하여 (파일명, 단어 빈도 Counter, 문장 리스트)로 반환합니다."""
+    results = []
+    for name, content in chunk:
+        sentences = split_sentences(content)
+        results.append((name, count_morphemes_batch(sentences), sentences))
+    return results
+
+
+def _analyze_file_chunk(chunk: list) -> list:
+    """
+    워커 프로세스에서 (파일명, 경로) 묶음을 스트리밍으로 읽어 형태소 분석·문장 분리합니다.
+    파일 전체를 한 번에 읽지 않고 조각 단위로 문장을 나눈 뒤, 문장들을 묶어서 품사 태깅합니다.
+    """
+    results = []
+    for name, path in chunk:
+        sentences = list(iter_sentences(iter_text_chunks(path)))
+        results.append((name, count_morphemes_batch(sentences), sentences))
+    return results
+
+
+def _split_library_chunk(chunk: list) -> list:
+    """워커 프로세스에서 (카테고리, 본문) 묶음을 kss로 문장 분리합니다. kss는 워커마다 한 번만 불러옵니다."""
+    import kss
+
+    return [(category, kss.split_sentences(content)) for category, content in chunk]
+
+
+def _split_chunks(weights: list, chunk_size: int, max_chunk_weight: int = None) -> list:
+    """
+    항목들을 순서대로 최대 chunk_size개, 무게 합 max_chunk_weight 이하인 묶음 (시작, 끝, 무게)로 나눕니다.
+    한 항목이 max_chunk_weight보다 무거우면 그 항목만으로 묶음을 만듭니다.
+    """
+    chunks = []
+    start, weight = 0, 0
+    for index, item_weight in enumerate(weights):
+        if index > start and (
+            index - start >= chunk_size or (max_chunk_weight is not None and weight + item_weight > max_chunk_weight)
+        ):
+            chunks.append((start, index, weight))
+            start, weight = index, 0
+        weight += item_weight
+    if start < len(weights):
+        chunks.append((start, len(weights), weight))
+    return chunks
+
+
+def _iter_chunks(func, items: list, workers: int = None, chunk_size: int = 64, initializer=None,
+                 weights: list = None, max_pending_weight: int = None):
+    """
+    items를 chunk_size개씩 묶어 ProcessPoolExecutor로 나눠 처리하고, 입력 순서대로 결과를 하나씩 내보냅니다.
+    동시에 진행 중인 묶음 수를 워커 수의 두 배로 제한하여, 소비자가 느려도 결과가 메모리에 쌓이지 않습니다.
+    weights(항목별 무게, 예: 파일 크기)와 max_pending_weight를 주면 진행 중인 묶음의 무게 합도 그 이하로 제한하고,
+    묶음 하나의 무게도 그 몫(max_pending_weight / 진행 중 묶음 수)을 넘지 않게 나눕니다.
+    워커가 1개이거나 묶음이 하나뿐이면 프로세스를 띄우지 않고 현재 프로세스에서 처리합니다.
+    initializer는 워커 프로세스가 시작될 때 한 번 실행됩니다. (JVM·형태소 분석기 준비 등)
+    JVM은 fork로 복제하면 동작하지 않으므로 워커는 항상 spawn 방식으로 시작합니다.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    if weights is None or max_pending_weight is None:
+        weights, max_pending_weight = [0] * len(items), None
+    max_chunk_weight = None if max_pending_weight is None else max(1, max_pending_weight // max_pending)
+    chunks = _split_chunks(weights, max(1, chunk_size), max_chunk_weight)
+    if workers <= 1 or len(chunks) <= 1:
+        for start, end, _ in chunks:
+            yield from func(items[start:end])
+        return
+
+    workers = min(workers, len(chunks))
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=initializer
+    ) as executor:
+        pending = deque()
+        pending_weight = 0
+        for start, end, weight in chunks:
+            # 진행 중인 묶음이 너무 많거나 무거우면 가장 오래된 묶음의 결과부터 내보내 자리를 만듦
+            while pending and (
+                len(pending) >= max_pending
+                or (max_pending_weight is not None and pending_weight + weight > max_pending_weight)
+            ):
+                future, done_weight = pending.popleft()
+                pending_weight -= done_weight
+                yield from future.result()
+            pending.append((executor.submit(func, items[start:end]), weight))
+            pending_weight += weight
+        while pending:
+            yield from pending.popleft()[0].result()
+
+
+def _run_chunks(func, items: list, workers: int = None, chunk_size: int = 64, initializer=None) -> list:
+    """_iter_chunks의 결과를 리스트로 모아 반환합니다."""
+    return list(_iter_chunks(func, items, workers=workers, chunk_size=chunk_size, initializer=initializer))
+
+
+def analyze_documents_locally(documents: list, workers: int = None, chunk_size: int = 64) -> list:
+    """
+    문서들의 형태소 분석과 문장 분리(순수 CPU 작업)를 여러 코어에서 병렬로 수행합니다.
+    문서 순서대로 (파일명, 단어 빈도 Counter, 문장 리스트) 리스트를 반환합니다.
+    """
+    items = [(document["name"], document["content"]) for document in documents]
+    return _run_chunks(_analyze_text_chunk, items, workers=workers, chunk_size=chunk_size, initializer=warm_up)
+
+
+def iter_analyze_files(documents: list, workers: int = None, chunk_size: int = 64,
+                       max_pending_bytes: int = ANALYSIS_MAX_PENDING_BYTES):
+    """
+    analyze_documents_locally의 스트리밍 버전입니다. 문서의 본문 대신 경로를 워커에 넘기고,
+    문서 순서대로 (파일명, 단어 빈도 Counter, 문장 리스트)를 하나씩 내보냅니다.
+    워커에 넘긴 파일 크기 합을 max_pending_bytes 이하로 제한하므로, 파일 수가 아니라 크기 기준으로
+    메모리에 올라가는 결과가 일정합니다. (max_pending_bytes보다 큰 파일 하나는 단독으로 처리)
+    """
+    items = [(document["name"], str(document["path"])) for document in documents]
+    weights = [document.get("size") or os.path.getsize(document["path"]) for document in documents]
+    yield from _iter_chunks(
+        _analyze_file_chunk, items, workers=workers, chunk_size=chunk_size, initializer=warm_up,
+        weights=weights, max_pending_weight=max_pending_bytes,
+    )
+
+
+def split_library_sentences(items: list, workers: int = None, chunk_size: int = 8) -> list:
+    """(카테고리, 본문) 리스트를 kss로 병렬 문장 분리하여 (카테고리, 문장 리스트) 리스트를 반환합니다."""
+    return _run_chunks(_split_library_chunk, items, workers=workers, chunk_size=chunk_size)
@@ -0,0 +1,156 @@
+import math
+from collections import deque
+from config import PROMPT_MAX_TOKENS
+from utils.tokens import count_tokens
+
+# 메시지 하나당 역할/구분자에 붙는 대략적인 오버헤드 토큰
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# 최근 요청들의 예상/실제 프롬프트 토큰 기록 (token_ratio가 예산 보정에 사용)
+token_usage_log = deque(maxlen=1000)
+# 실제/예상 토큰 비율로 예산을 보정하기 시작하는 최소 기록 수, 보정에 쓰는 분위수와 상한
+TOKEN_RATIO_MIN_SAMPLES = 20
+TOKEN_RATIO_QUANTILE = 0.9
+TOKEN_RATIO_MAX = 3.0
+
+
+def token_ratio() -> float:
+    """
+    최근 요청에서 제공자가 보고한 프롬프트 토큰 수를 tiktoken으로 센 수로 나눈 비율의 상위 분위수입니다.
+    제공자마다 토크나이저가 달라 tiktoken 값이 실제보다 적게 나오는 만큼 예산 계산에 곱해 보정합니다.
+    기록이 적으면 1.0이며, 예산을 넘지 않도록 1.0보다 작게는 보정하지 않습니다.
+    """
+    ratios = sorted(
+        record["prompt_tokens"] / record["counted_prompt_tokens"]
+        for record in list(token_usage_log)
+        if record.get("prompt_tokens") and record.get("counted_prompt_tokens")
+    )
+    if len(ratios) < TOKEN_RATIO_MIN_SAMPLES:
+        return 1.0
+    return min(max(ratios[int(TOKEN_RATIO_QUANTILE * (len(ratios) - 1))], 1.0), TOKEN_RATIO_MAX)
+
+
+class PromptTooLargeError(ValueError):
+    """필수 섹션만으로도 프롬프트가 최대 토큰 수를 넘을 때 발생합니다."""
+
+
+class PromptAssembler:
+    """
+    프롬프트를 섹션 단위로 조립하면서 섹션별 토큰 예산과 전체 최대 토큰 수를 지킵니다.
+    각 섹션의 항목은 중요한 순서대로 넘겨야 하며, 예산을 넘으면 뒤쪽 항목부터 잘라냅니다.
+    전체가 최대 토큰 수를 넘으면 priority가 낮은 섹션부터 더 줄입니다.
+    토큰 수는 tiktoken으로 센 값에 최근 실제 사용량으로 구한 보정 비율(token_ratio)을 곱해 계산합니다.
+    """
+
+    def __init__(self, max_tokens: int = PROMPT_MAX_TOKENS, ratio: float = None):
+        self.max_tokens = max_tokens
+        self.ratio = token_ratio() if ratio is None else ratio
+        self._sections = []
+
+    def add(self, name: str, items: list, render, budget: int = None, priority: int = 0, required: bool = False):
+        """
+        섹션을 추가합니다. render(items)는 항목 리스트를 프롬프트 문자열로 바꾸는 함수입니다.
+        required 섹션은 잘라내지 않습니다.
+        """
+        self._sections.append({
+            "name": name,
+            "items": list(items),
+            "render": render,
+            "budget": budget,
+            "priority": priority,
+            "required": required,
+        })
+
+    def count(self, text: str) -> int:
+        """보정 비율을 적용한 텍스트의 토큰 수입니다."""
+        return math.ceil(count_tokens(text) * self.ratio)
+
+    def _fit(self, section: dict, budget: int) -> int:
+        """렌더링 결과가 budget 토큰 이하가 되는 가장 긴 항목 접두사의 길이를 이분 탐색으로 찾습니다."""
+        items, render = section["items"], section["render"]
+        if self.count(render(items)) <= budget:
+            return len(items)
+        low, high = 0, len(items)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count(render(items[:middle])) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def build(self) -> tuple:
+        """
+        ({섹션 이름: 렌더링된 문자열}, 리포트)를 반환합니다.
+        리포트에는 섹션별 토큰 수, 잘라낸 항목 수, 보정한 예상 프롬프트 토큰 수와 보정 전 tiktoken 토큰 수가 담깁니다.
+        """
+        kept = {}
+        for section in self._sections:
+            if section["required"] or section["budget"] is None:
+                kept[section["name"]] = len(section["items"])
+            else:
+                kept[section["name"]] = self._fit(section, section["budget"])
+
+        def section_tokens(section):
+            return self.count(section["render"](section["items"][:kept[section["name"]]]))
+
+        tokens = {section["name"]: section_tokens(section) for section in self._sections}
+        overhead = MESSAGE_OVERHEAD_TOKENS * len(self._sections)
+
+        # 전체 한도를 넘으면 우선순위가 낮은 섹션부터 초과분만큼 줄임
+        for section in sorted(self._sections, key=lambda s: s["priority"]):
+            excess = sum(tokens.values()) + overhead - self.max_tokens
+            if excess <= 0:
+                break
+            if section["required"]:
+                continue
+            name = section["name"]
+            kept[name] = self._fit(section, max(0, tokens[name] - excess))
+            tokens[name] = section_tokens(section)
+
+        predicted = sum(tokens.values()) + overhead
+        if predicted > self.max_tokens:
+            raise PromptTooLargeError(
+                f"프롬프트가 최대 토큰 수를 초과합니다. (예상 {predicted} > 최대 {self.max_tokens})"
+            )
+
+        rendered = {
+            section["name"]: section["render"](section["items"][:kept[section["name"]]])
+            for section in self._sections
+        }
+        report = {
+            "section_tokens": tokens,
+            "trimmed_items": {
+                section["name"]: len(section["items"]) - kept[section["name"]] for section in self._sections
+            },
+            "predicted_prompt_tokens": predicted,
+            # 보정 비율을 다시 계산할 때는 보정 전 값과 비교해야 함
+            "counted_prompt_tokens": sum(count_tokens(text) for text in rendered.values()) + overhead,
+            "token_ratio": self.ratio,
+        }
+        return rendered, report
+
+
+def record_token_usage(report: dict, usage) -> dict:
+    """
+    예상 프롬프트 토큰 수와 실제 사용량을 함께 기록하고 출력합니다.
+    usage는 OpenAI 응답의 usage 객체 또는 {"prompt_tokens", "completion_tokens", "total_tokens"} dict입니다.
+    """
+    if usage is not None and not isinstance(usage, dict):
+        usage = {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+        }
+    record = {
+        "predicted_prompt_tokens": report["predicted_prompt_tokens"],
+        "counted_prompt_tokens": report.get("counted_prompt_tokens"),
+        **(usage or {}),
+    }
+    token_usage_log.append(record)
+    if usage:
+        print(
+            f"사용된 토큰 수 - prompt: {usage['prompt_tokens']} (예상 {report['predicted_prompt_tokens']}), "
+            f"completion: {usage['completion_tokens']}, total: {usage['total_tokens']}"
+        )
+    return record
@@ -0,0 +1,86 @@
+import re
+import sys
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from config import RAG_TOP_K
+
+
+def char_ngrams(text: str, ngram_range: tuple = (2, 3)) -> list:
+    """텍스트를 어절 단위로 나누어 각 어절 안의 문자 n-gram 목록을 만듭니다. (공백을 걸치는 n-gram은 만들지 않음)"""
+    ngrams = []
+    for token in re.split(r"[\s\u200b]+", text.lower()):
+        for n in range(ngram_range[0], ngram_range[1] + 1):
+            ngrams.extend(token[i:i + n] for i in range(len(token) - n + 1))
+    return ngrams
+
+
+class CharNgramBM25Index:
+    """
+    문자 n-gram 기반 BM25 인덱스입니다.
+    문서별 BM25 가중치를 scipy 희소 행렬로 미리 계산해 두고, 질의는 해당 열만 합산하여 점수를 냅니다.
+    형태소 분석 없이도 한국어 어미 변화에 강하고, 질의 키워드가 짧아도 동작합니다.
+    """
+
+    def __init__(self, texts: list, ngram_range: tuple = (2, 3), k1: float = 1.5, b: float = 0.75):
+        self.ngram_range = ngram_range
+        self.vocabulary = {}
+        rows, cols, counts = [], [], []
+        for row, text in enumerate(texts):
+            for ngram, count in Counter(char_ngrams(text, ngram_range)).items():
+                rows.append(row)
+                cols.append(self.vocabulary.setdefault(ngram, len(self.vocabulary)))
+                counts.append(count)
+
+        n_docs = len(texts)
+        term_freq = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (rows, cols)),
+            shape=(n_docs, len(self.vocabulary)),
+        )
+        doc_lengths = np.asarray(term_freq.sum(axis=1)).ravel()
+        avg_doc_length = doc_lengths.mean() if n_docs else 0.0
+        doc_freq = np.bincount(term_freq.indices, minlength=len(self.vocabulary))
+        idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        length_norm = k1 * (1 - b + b * doc_lengths / avg_doc_length) if avg_doc_length else np.zeros(n_docs)
+        row_norm = np.repeat(length_norm, np.diff(term_freq.indptr)).astype(np.float32)
+        tf = term_freq.data
+        term_freq.data = tf * (k1 + 1) / (tf + row_norm) * idf[term_freq.indices]
+        self.weights = term_freq.tocsc()
+
+    @property
+    def nbytes(self) -> int:
+        """BM25 희소 행렬과 n-gram 사전이 차지하는 대략적인 메모리(바이트)입니다."""
+        matrix = self.weights.data.nbytes + self.weights.indices.nbytes + self.weights.indptr.nbytes
+        vocabulary = sys.getsizeof(self.vocabulary) + sum(
+            sys.getsizeof(ngram) + sys.getsizeof(column) for ngram, column in self.vocabulary.items()
+        )
+        return matrix + vocabulary
+
+    def search(self, query: str, top_k: int = None) -> list:
+        """질의와 관련도가 높은 순서대로 (문서 인덱스, 점수) 목록을 반환합니다. 점수가 0인 문서는 제외합니다."""
+        columns = sorted({self.vocabulary[g] for g in char_ngrams(query, self.ngram_range) if g in self.vocabulary})
+        if not columns:
+            return []
+        scores = np.asarray(self.weights[:, columns].sum(axis=1)).ravel()
+        candidates = np.flatnonzero(scores > 0)
+        if top_k is not None and len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(int(index), float(scores[index])) for index in ranked]
+
+
+class ContextRetriever:
+    """
+    한 카테고리의 문장들에 대한 검색 인덱스를 한 번 만들어 두고,
+    사용자 키워드마다 가장 관련 있는 문장을 RAG 스니펫으로 골라냅니다.
+    키워드와 무관한 공통 컨텍스트는 analyzer.context_artifact의 아티팩트가 담당합니다.
+    """
+
+    def __init__(self, sentences: list):
+        self.sentences = list(sentences)
+        self.sentence_index = CharNgramBM25Index(self.sentences)
+
+    def select_snippets(self, query: str, top_k: int = RAG_TOP_K) -> list:
+        """질의와 관련도가 높은 순서대로 최대 top_k개의 문장을 반환합니다."""
+        return [self.sentences[index] for index, _ in self.sentence_index.search(query, top_k=top_k)]
@@ -1,6 +1,27 @@
 import re
 
+# 모듈을 불러올 때 한 번만 컴파일 (프로세스 풀의 각 워커에서도 한 번씩만 컴파일됨)
+SENTENCE_BOUNDARY_PATTERN = re.compile(r'(?<=[\.?!다요])\s+')
+
 def split_sentences(text: str) -> list:
     
-    sentences = re.split(r'(?<=[\.?!다요])\s+', text)
-    return [s.strip() for s in sentences if s.strip()]
\ No newline at end of file
+    sentences = SENTENCE_BOUNDARY_PATTERN.split(text)
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def iter_sentences(text_chunks):
+    """
+    텍스트 조각들을 차례로 받아 문장을 하나씩 반환합니다. (split_sentences의 스트리밍 버전)
+    조각의 마지막 부분은 문장이 끝나지 않았을 수 있으므로 다음 조각과 이어 붙인 뒤에 분리합니다.
+    """
+    carry = ""
+    for chunk in text_chunks:
+        parts = SENTENCE_BOUNDARY_PATTERN.split(carry + chunk)
+        carry = parts.pop()
+        for part in parts:
+            part = part.strip()
+            if part:
+                yield part
+    carry = carry.strip()
+    if carry:
+        yield carry
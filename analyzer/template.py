@@ -1,49 +1,92 @@
 import re
-from openai import OpenAI
 import json
-from config import OPENAI_API_KEY
+from config import OPENAI_API_KEY, TEMPLATE_BATCH_MAX_TOKENS
+from analyzer.matcher import ParameterMatcher
+from utils.llm_cache import cached_chat_completion
+from utils.tokens import estimate_tokens
 
-def generate_template_from_segment(text_segment: str, known_parameters_map: dict) -> str:
+def _split_into_batches(text_segments: list, max_batch_tokens: int) -> list:
+    """세그먼트 인덱스를 토큰 예산을 넘지 않는 배치들로 나눕니다. (세그먼트 하나가 예산보다 커도 단독 배치로 보냄)"""
+    batches = []
+    current_batch = []
+    current_tokens = 0
+    for index, segment in enumerate(text_segments):
+        # 입력과 출력에 모두 등장하므로 2배로 계산
+        segment_tokens = 2 * estimate_tokens(segment) + 8
+        if current_batch and current_tokens + segment_tokens > max_batch_tokens:
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append(index)
+        current_tokens += segment_tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+def generate_templates_for_segments(text_segments: list, known_parameters_map: dict, max_batch_tokens: int = TEMPLATE_BATCH_MAX_TOKENS) -> list:
     """
-    주어진 텍스트 세그먼트(문장/문단)에서 known_parameters_map에 있는 값들을 해당 대표 키워드로 대체하여 템플릿을 생성합니다.
-    OpenAI API를 사용하여 문맥을 고려한 대체 작업을 수행합니다.
+    여러 텍스트 세그먼트에 번호를 붙여 토큰 예산 단위의 배치로 묶고, 배치당 한 번의 요청으로 템플릿을 생성합니다.
+    각 배치에는 해당 배치에 실제로 등장하는 파라미터만 포함합니다.
+    입력과 같은 순서·길이의 리스트를 반환하며, 결과를 받지 못한 세그먼트는 None입니다.
     """
     if not OPENAI_API_KEY:
         raise ValueError("API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    matcher = ParameterMatcher(known_parameters_map)
+    templated_segments = [None] * len(text_segments)
+
+    for batch in _split_into_batches(text_segments, max_batch_tokens):
+        batch_parameters_map = {}
+        for index in batch:
+            for _, _, value, keys in matcher.find_all(text_segments[index]):
+                for key in keys:
+                    values = batch_parameters_map.setdefault(key, [])
+                    if value not in values:
+                        values.append(value)
 
-    # known_parameters_map을 AI가 이해하기 쉬운 문자열 형태로 변환
-    param_list_str = json.dumps(known_parameters_map, ensure_ascii=False, indent=2)
+        segments_str = "\n".join(f"{number}. {text_segments[index]}" for number, index in enumerate(batch, start=1))
+        param_list_str = json.dumps(batch_parameters_map, ensure_ascii=False, separators=(',', ':'))
 
-    prompt = f"""
-    다음은 원본 텍스트의 한 부분과, 이 텍스트 내에서 대체될 수 있는 파라미터들의 목록입니다.
+        prompt = f"""
+    다음은 번호가 붙은 원본 텍스트 세그먼트 목록과, 이 텍스트들 내에서 대체될 수 있는 파라미터들의 목록입니다.
     파라미터 목록은 '대표 키워드': ['값1', '값2'] 형태의 JSON 객체입니다.
 
     [원본 텍스트 세그먼트]
-    {text_segment}
+    {segments_str}
 
     [파라미터 목록]
     {param_list_str}
 
     [요청]
-    원본 텍스트 세그먼트 내에서 '파라미터 목록'에 있는 '값'들을 찾아서 해당 '대표 키워드'로 대체해주세요.
-    예를 들어, '갤럭시S24'라는 값이 '제품명'이라는 대표 키워드에 속한다면, 원본 텍스트의 '갤럭시S24'를 '[제품명]'으로 대체해야 합니다.
-    대체된 결과만 출력해주세요. 다른 설명이나 추가적인 텍스트는 포함하지 마세요.
+    각 세그먼트에서 '파라미터 목록'에 있는 '값'들을 찾아서 해당 '대표 키워드'로 대체해주세요.
+    예를 들어, '갤럭시S24'라는 값이 '제품명'이라는 대표 키워드에 속한다면, '갤럭시S24'를 '[제품명]'으로 대체해야 합니다.
+    결과는 반드시 세그먼트 번호를 키로 하는 다음 JSON 형식으로만 반환해주세요.
+
+    {{
+      "1": "대체된 세그먼트1",
+      "2": "대체된 세그먼트2"
+    }}
     """
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-5-mini-2025-08-07", # 또는 gpt-3.5-turbo
-            messages=[
-                {"role": "system", "content": "You are a text templating assistant. Your task is to replace specific values in a given text segment with their corresponding category placeholders based on a provided parameter map. Output only the templated text."},
-                {"role": "user", "content": prompt}
-            ],
-            # temperature=0.1,
-        )
-        templated_text = response.choices[0].message.content.strip()
-        return templated_text
-
-    except Exception as e:
-        print(f"OpenAI API 호출 중 오류가 발생했습니다: {e}")
-        return None
\ No newline at end of file
+        try:
+            results = cached_chat_completion(
+                "gpt",
+                model="gpt-5-mini-2025-08-07",
+                messages=[
+                    {"role": "system", "content": "You are a text templating assistant. Your task is to replace specific values in numbered text segments with their corresponding category placeholders based on a provided parameter map. Return a JSON object mapping each segment number to its templated text."},
+                    {"role": "user", "content": prompt}
+                ],
+                parse=json.loads,
+                response_format={"type": "json_object"},
+            )
+        except Exception as e:
+            print(f"OpenAI API 호출 중 오류가 발생했습니다: {e}")
+            continue
+
+        for number, index in enumerate(batch, start=1):
+            templated_text = results.get(str(number))
+            if isinstance(templated_text, str) and templated_text.strip():
+                templated_segments[index] = templated_text.strip()
+
+    return templated_segments
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+class TermStatistics:
+    """
+    한 카테고리의 문서별 단어 빈도를 어휘 인덱스 기반의 NumPy 배열로 보관합니다.
+    문서별 빈도는 CSR 형태(indptr, indices, counts)로, 카테고리 전체 빈도와 문서 빈도는 어휘 길이의 uint32 배열로 저장합니다.
+    """
+
+    def __init__(self, names: list, vocabulary: list, indptr, indices, counts):
+        self.names = list(names)
+        self.vocabulary = list(vocabulary)
+        self.index = {word: i for i, word in enumerate(self.vocabulary)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.uint32)
+        self.counts = np.asarray(counts, dtype=np.uint32)
+
+        n_terms = len(self.vocabulary)
+        self.term_freq = np.bincount(self.indices, weights=self.counts, minlength=n_terms).astype(np.uint32)
+        self.doc_freq = np.bincount(self.indices, minlength=n_terms).astype(np.uint32)
+
+    @classmethod
+    def from_documents(cls, documents) -> "TermStatistics":
+        """
+        (문서 이름, {단어: 빈도}) 쌍들로 통계를 만듭니다. documents는 한 번만 순회하므로 제너레이터를 넘겨도 됩니다.
+        """
+        names, vocabulary, index = [], [], {}
+        indptr, indices, counts = [0], [], []
+        for name, word_counts in documents:
+            names.append(name)
+            for word, count in word_counts.items():
+                if word not in index:
+                    index[word] = len(vocabulary)
+                    vocabulary.append(word)
+                indices.append(index[word])
+                counts.append(count)
+            indptr.append(len(indices))
+        return cls(names, vocabulary, indptr, indices, counts)
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.names)
+
+    def idf(self):
+        """평활화한 역문서 빈도 log((1 + N) / (1 + df)) + 1 입니다."""
+        return np.log((1 + self.n_docs) / (1 + self.doc_freq.astype(np.float64))) + 1
+
+    def _top(self, scores, n: int) -> list:
+        if n <= 0 or not len(scores):
+            return []
+        n = min(n, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n]
+        # 점수 내림차순, 같은 점수는 어휘 순서로 정렬해 결과를 결정적으로 유지
+        ranked = top[np.lexsort((top, -scores[top]))]
+        return [(self.vocabulary[i], float(scores[i])) for i in ranked]
+
+    def top_terms(self, n: int) -> list:
+        """
+        카테고리 전체 빈도(로그 스케일)와 IDF를 곱한 TF-IDF 상위 n개 단어를 (단어, 점수) 리스트로 반환합니다.
+        모든 문서에 흔하게 나오는 단어보다, 자주 나오면서도 일부 문서에 집중된 단어가 위로 옵니다.
+        """
+        scores = np.log1p(self.term_freq.astype(np.float64)) * self.idf()
+        return self._top(scores, n)
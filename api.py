@@ -1,14 +1,50 @@
-from fastapi import FastAPI, HTTPException
+import json
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from main import run_manuscript_generation
-from mongodb_service import MongoDBService
-from llm.claude_service import get_claude_response
-from llm.gemini_service import get_gemini_response
-from utils.categorize_keyword_with_ai import categorize_keyword_with_ai
+from analyzer.manuscript_generator import generate_manuscript_with_ai_async, stream_manuscript_with_ai
+from analyzer.prompt_budget import PromptTooLargeError
+from mongodb_service import (
+    AsyncMongoDBService,
+    get_mongo_client,
+    close_mongo_client,
+    get_async_mongo_client,
+    close_async_mongo_client,
+)
+from llm.providers import acomplete, get_provider, aclose_clients, close_clients
+from llm.resilience import CircuitOpenError, DeadlineExceededError, deadline
+from batch_generation import generate_batch, unique_keywords
+from job_worker import JOB_KINDS, job_concurrency_key
+from utils.category_router import category_router
+from utils.analysis_snapshot import get_analysis_snapshot
+from config import (
+    API_REQUEST_DEADLINE_SECONDS,
+    GENERATION_DEFAULT_SERVICE,
+    GENERATION_BATCH_MAX_KEYWORDS,
+    GENERATION_BATCH_CONCURRENCY,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 앱 시작 시 공유 MongoClient(커넥션 풀)를 한 번 생성하고, 종료 시 닫습니다.
+    # 요청 경로는 이벤트 루프를 막지 않도록 비동기(motor) 클라이언트를 사용합니다.
+    get_mongo_client()
+    get_async_mongo_client()
+    yield
+    # LLM 제공자 클라이언트도 프로세스 동안 재사용하다가 종료 시 커넥션 풀을 닫습니다.
+    await aclose_clients()
+    close_clients()
+    close_async_mongo_client()
+    close_mongo_client()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,9 +53,57 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+
+def _deadline_seconds(request: Request) -> float:
+    """API_REQUEST_DEADLINE_SECONDS 또는 클라이언트가 X-Request-Timeout 헤더(초)로 준 더 짧은 마감 시간입니다."""
+    seconds = API_REQUEST_DEADLINE_SECONDS
+    try:
+        seconds = min(seconds, float(request.headers.get("x-request-timeout", seconds)))
+    except ValueError:
+        pass
+    return seconds
+
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """요청마다 LLM 호출 마감 시간을 적용합니다. (재시도 포함, 스트리밍 응답 본문까지 전파)"""
+    if request.url.path == "/generate/batch":
+        # 배치 생성은 키워드마다 마감 시간을 따로 적용
+        return await call_next(request)
+    with deadline(_deadline_seconds(request)):
+        return await call_next(request)
+
+
+def _llm_http_exception(e: Exception) -> HTTPException:
+    """서킷 브레이커 차단은 503, 마감 시간 초과는 504로 변환합니다."""
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(status_code=503, detail=str(e))
+    return HTTPException(status_code=504, detail=str(e))
+
 class GenerateRequest(BaseModel):
-    service: str
+    service: str = GENERATION_DEFAULT_SERVICE
     keyword: str
+    hedge: Optional[bool] = None
+
+
+def _validate_service(service: str):
+    """auto(제공자 자동 선택) 또는 사용 가능한 단일 서비스인지 확인합니다. 아니면 400을 반환합니다."""
+    if service == "auto":
+        return
+    try:
+        get_provider(service)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _validate_category(category: Optional[str]):
+    """지정한 카테고리가 카테고리 분류기가 쓰는 카테고리(카테고리 DB) 중 하나인지 확인합니다. 아니면 400을 반환합니다."""
+    if category is not None and category not in category_router.categories:
+        raise HTTPException(
+            status_code=400,
+            detail=f"지원하지 않는 카테고리입니다: {category} (사용 가능: {', '.join(category_router.categories)})",
+        )
 
 @app.get("/test")
 async def test_endpoint():
@@ -29,21 +113,25 @@ async def test_endpoint():
 @app.post("/generate/gpt")
 async def generate_manuscript_api(request: GenerateRequest):
     """
-    Generates text using the specified service (gpt, claude, or solar).
+    Generates text using the specified service (gpt, claude, gemini, or solar).
+    With service "auto", the fastest available provider is used with automatic failover (and optional hedging).
     """
     service = request.service.lower()
     keyword = request.keyword.strip()
     print(service, request)
 
-    category = categorize_keyword_with_ai(keyword=keyword)
+    _validate_service(service)
 
-    db_service = MongoDBService()
-    db_service.set_db_name(db_name=category)
+    try:
+        # 분류기·카테고리 AI 호출 실패도 아래의 오류 처리를 거치도록 try 안에서 분류
+        category = await category_router.route(keyword)
 
-    print(db_service.db._name)
+        db_service = AsyncMongoDBService(db_name=category)
 
-    try:
-        analysis_data = db_service.get_latest_analysis_data()
+        print(db_service.db.name)
+
+        snapshot = await get_analysis_snapshot(db_service)
+        analysis_data = snapshot["data"]
         unique_words = analysis_data.get("unique_words", [])
         sentences = analysis_data.get("sentences", [])
         expressions = analysis_data.get("expressions", {})
@@ -53,23 +141,26 @@ async def generate_manuscript_api(request: GenerateRequest):
         if not (unique_words and sentences and expressions and parameters):
             raise HTTPException(status_code=500, detail="MongoDB에 원고 생성을 위한 충분한 분석 데이터가 없습니다. 먼저 분석을 실행하고 저장해주세요.")
 
-        generated_manuscript = run_manuscript_generation(
+        generated_manuscript = await generate_manuscript_with_ai_async(
             unique_words=unique_words,
             sentences=sentences,
             expressions=expressions,
             parameters=parameters,
-            user_instructions=keyword
+            user_instructions=keyword,
+            retriever=snapshot["retriever"],
+            artifact=snapshot["artifact"],
+            service=service,
+            hedge=request.hedge
         )
         
         if generated_manuscript:
-            import time
             current_time = time.time()
             document = {
                 'content' : generated_manuscript,
                 'timestamp': current_time,
             }
             try: 
-                db_service.insert_document("manuscripts", document)
+                await db_service.insert_document("manuscripts", document)
                 document['_id'] = str(document['_id'])
 
                 return document
@@ -77,20 +168,135 @@ async def generate_manuscript_api(request: GenerateRequest):
                 print(f"데이터베이스에 저장 실패: {e}")
         else:
             raise HTTPException(status_code=500, detail="원고 생성에 실패했습니다. AI 모델 응답을 확인해주세요.")
+    except PromptTooLargeError as e:
+        # 요청을 보내기 전에 걸러낸 초과 프롬프트
+        raise HTTPException(status_code=413, detail=str(e))
+    except (CircuitOpenError, DeadlineExceededError) as e:
+        raise _llm_http_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"원고 생성 중 오류 발생: {e}")
-    finally:
-        if db_service:
-            db_service.close_connection()
+
+def _sse_event(event: str, data) -> str:
+    """Server-Sent Events 형식의 이벤트 문자열을 만듭니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/generate/gpt/stream")
+async def generate_manuscript_stream_api(request: GenerateRequest):
+    """
+    원고를 Server-Sent Events로 스트리밍합니다.
+    이벤트 순서: start → category → token(여러 번) → done(저장된 _id, 토큰 사용량) / 실패 시 error
+    """
+    service = request.service.lower()
+    keyword = request.keyword.strip()
+    _validate_service(service)
+
+    async def event_stream():
+        # 분류·데이터 조회 전에 바로 첫 바이트를 보냄
+        yield _sse_event("start", {"keyword": keyword})
+        try:
+            category = await category_router.route(keyword)
+            yield _sse_event("category", {"category": category})
+
+            db_service = AsyncMongoDBService(db_name=category)
+            snapshot = await get_analysis_snapshot(db_service)
+            analysis_data = snapshot["data"]
+            unique_words = analysis_data.get("unique_words", [])
+            sentences = analysis_data.get("sentences", [])
+            expressions = analysis_data.get("expressions", {})
+            parameters = analysis_data.get("parameters", {})
+
+            if not (unique_words and sentences and expressions and parameters):
+                yield _sse_event("error", {"detail": "MongoDB에 원고 생성을 위한 충분한 분석 데이터가 없습니다. 먼저 분석을 실행하고 저장해주세요."})
+                return
+
+            chunks = []
+            usage = None
+            async for kind, payload in stream_manuscript_with_ai(
+                unique_words=unique_words,
+                sentences=sentences,
+                expressions=expressions,
+                parameters=parameters,
+                user_instructions=keyword,
+                retriever=snapshot["retriever"],
+                artifact=snapshot["artifact"],
+                service=service
+            ):
+                if kind == "token":
+                    chunks.append(payload)
+                    yield _sse_event("token", {"text": payload})
+                else:
+                    usage = payload
+
+            generated_manuscript = "".join(chunks).strip()
+            if not generated_manuscript:
+                yield _sse_event("error", {"detail": "원고 생성에 실패했습니다. AI 모델 응답을 확인해주세요."})
+                return
+
+            # 스트림이 끝난 뒤 완성된 원고를 저장
+            document = {
+                'content': generated_manuscript,
+                'timestamp': time.time(),
+            }
+            await db_service.insert_document("manuscripts", document)
+            yield _sse_event("done", {"_id": str(document['_id']), "usage": usage})
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"원고 생성 중 오류 발생: {e}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class BatchGenerateRequest(BaseModel):
+    service: str = GENERATION_DEFAULT_SERVICE
+    keywords: List[str]
+    hedge: Optional[bool] = None
+    concurrency: Optional[int] = None
+
+
+@app.post("/generate/batch")
+async def generate_batch_api(request: BatchGenerateRequest, http_request: Request):
+    """
+    여러 키워드의 원고를 한 번에 생성하여 NDJSON(application/x-ndjson)으로 스트리밍합니다.
+    키워드를 카테고리별로 묶어 카테고리마다 분석 스냅샷을 한 번만 불러오고, 원고는 manuscripts에 묶음 단위로 저장합니다.
+    줄 형식은 batch_generation.generate_batch를 참고하세요. 마감 시간은 키워드마다 따로 적용됩니다.
+    """
+    service = request.service.lower()
+    _validate_service(service)
+    keywords = unique_keywords(request.keywords)
+    if not keywords:
+        raise HTTPException(status_code=400, detail="'keywords' 필드에 키워드가 하나 이상 필요합니다.")
+    if len(keywords) > GENERATION_BATCH_MAX_KEYWORDS:
+        raise HTTPException(status_code=400, detail=f"한 번에 생성할 수 있는 키워드는 최대 {GENERATION_BATCH_MAX_KEYWORDS}개입니다.")
+    # 동시 실행 수는 서버 설정값보다 크게 늘릴 수 없음
+    concurrency = max(1, min(request.concurrency or GENERATION_BATCH_CONCURRENCY, GENERATION_BATCH_CONCURRENCY))
+
+    async def ndjson_stream():
+        async for line in generate_batch(
+            keywords,
+            service=service,
+            hedge=request.hedge,
+            concurrency=concurrency,
+            deadline_seconds=_deadline_seconds(http_request),
+        ):
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/generate/gemini")
-def test_gemini_endpoint(prompt_data: GenerateRequest):
+async def test_gemini_endpoint(prompt_data: GenerateRequest):
     try:
         prompt = prompt_data.keyword
         if not prompt:
             raise HTTPException(status_code=400, detail="'prompt' 필드는 필수입니다.")
         
-        response = get_gemini_response(prompt)
+        result = await acomplete("gemini", [{"role": "user", "content": prompt}])
+        response = result["content"]
         
         if response:
             return {"response": response}
@@ -99,17 +305,20 @@ def test_gemini_endpoint(prompt_data: GenerateRequest):
             
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except (CircuitOpenError, DeadlineExceededError) as e:
+        raise _llm_http_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"서버 내부 오류: {e}")
 
 @app.post("/generate/claude")
-def test_claude_endpoint(req: GenerateRequest):
+async def test_claude_endpoint(req: GenerateRequest):
     try:
         prompt = req.keyword
         if not prompt:
             raise HTTPException(status_code=400, detail="'prompt' 필드는 필수입니다.")
         
-        response = get_claude_response(prompt)
+        result = await acomplete("claude", [{"role": "user", "content": prompt}], max_tokens=1024)
+        response = result["content"]
         
         if response:
             return {"content": response}
@@ -118,7 +327,66 @@ def test_claude_endpoint(req: GenerateRequest):
             
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except (CircuitOpenError, DeadlineExceededError) as e:
+        raise _llm_http_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"서버 내부 오류: {e}")
 
 
+class JobRequest(BaseModel):
+    kind: str = "generate"
+    priority: int = 0
+    # generate 작업
+    keyword: Optional[str] = None
+    service: str = GENERATION_DEFAULT_SERVICE
+    hedge: Optional[bool] = None
+    # analyze 작업
+    directory: str = "data"
+    full: bool = False
+    # 카테고리 DB 이름 (CATEGORIES 중 하나). 없으면 generate는 작업자가 분류하고 analyze는 기본 DB에 저장
+    category: Optional[str] = None
+
+
+@app.post("/jobs", status_code=202)
+async def create_job_api(request: JobRequest):
+    """
+    원고 생성(generate) 또는 분석(analyze) 작업을 큐에 넣고 작업 ID를 바로 반환합니다.
+    작업은 `blog-analyzer worker` 프로세스가 실행하며, 진행 상황과 결과는 GET /jobs/{job_id}로 확인합니다.
+    """
+    kind = request.kind.lower()
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 작업 종류입니다: {request.kind} (사용 가능: {', '.join(JOB_KINDS)})")
+    # category는 작업자가 그대로 DB 이름으로 쓰므로 알려진 카테고리만 허용
+    _validate_category(request.category)
+
+    if kind == "generate":
+        keyword = (request.keyword or "").strip()
+        if not keyword:
+            raise HTTPException(status_code=400, detail="'keyword' 필드는 필수입니다.")
+        service = request.service.lower()
+        _validate_service(service)
+        # 카테고리를 지정하지 않으면 작업자가 분류한 뒤 카테고리별 동시 실행 제한을 적용
+        category = request.category
+        payload = {"keyword": keyword, "service": service, "hedge": request.hedge, "category": category}
+    else:
+        # 서버 작업 디렉토리 밖의 경로는 분석하지 않음
+        directory = Path(request.directory).resolve()
+        if not directory.is_dir() or not directory.is_relative_to(Path.cwd().resolve()):
+            raise HTTPException(status_code=400, detail=f"분석할 수 없는 디렉토리입니다: {request.directory}")
+        category = request.category
+        payload = {"directory": str(directory), "full": request.full, "db_name": category}
+
+    job_id = await AsyncMongoDBService().enqueue_job(
+        kind, payload, job_concurrency_key(kind, category), priority=request.priority
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_api(job_id: str):
+    """작업 상태(queued, running, succeeded, failed)와 진행 상황, 결과 또는 오류를 반환합니다."""
+    job = await AsyncMongoDBService().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    job["job_id"] = job.pop("_id")
+    return job
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import time
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from config import (
+    API_REQUEST_DEADLINE_SECONDS,
+    GENERATION_DEFAULT_SERVICE,
+    GENERATION_BATCH_CONCURRENCY,
+    GENERATION_BATCH_INSERT_SIZE,
+    GENERATION_BATCH_FLUSH_SECONDS,
+)
+from llm.resilience import deadline
+from mongodb_service import AsyncMongoDBService
+from utils.analysis_snapshot import get_analysis_snapshot
+from utils.category_router import category_router
+
+
+def unique_keywords(keywords) -> list:
+    """앞뒤 공백을 지우고 빈 키워드와 중복 키워드를 뺀 목록을 입력 순서대로 반환합니다."""
+    seen = set()
+    result = []
+    for keyword in keywords:
+        keyword = (keyword or "").strip()
+        if keyword and keyword not in seen:
+            seen.add(keyword)
+            result.append(keyword)
+    return result
+
+
+def _error_line(keyword: str, category: str, detail: str) -> dict:
+    return {"type": "error", "keyword": keyword, "category": category, "detail": detail}
+
+
+async def _save_manuscripts(category: str, documents: list) -> list:
+    """
+    생성된 원고들을 카테고리 DB의 manuscripts에 한 번에 저장합니다.
+    결과 줄은 이미 보냈으므로, 저장에 실패한 원고의 오류 줄만 반환합니다.
+    순서 없이 삽입하므로 일부 문서가 실패해도 나머지는 저장되며, 실패한 문서만 오류로 알립니다.
+    """
+    def error_line(document, detail):
+        return {**_error_line(document["keyword"], category, f"데이터베이스에 저장 실패: {detail}"), "_id": str(document["_id"])}
+
+    try:
+        await AsyncMongoDBService(db_name=category).insert_many_documents("manuscripts", documents, ordered=False)
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        print(f"데이터베이스에 저장 실패: {len(write_errors)}/{len(documents)}개 문서")
+        return [error_line(documents[error["index"]], error.get("errmsg", e)) for error in write_errors]
+    except Exception as e:
+        # 연결 오류 등으로 어떤 문서가 저장되었는지 알 수 없으면 묶음 전체를 실패로 알림
+        print(f"데이터베이스에 저장 실패: {e}")
+        return [error_line(document, e) for document in documents]
+    return []
+
+
+async def generate_batch(
+    keywords: list,
+    service: str = GENERATION_DEFAULT_SERVICE,
+    hedge: bool = None,
+    concurrency: int = None,
+    deadline_seconds: float = API_REQUEST_DEADLINE_SECONDS,
+):
+    """
+    여러 키워드의 원고를 한 번에 생성하는 비동기 제너레이터입니다. NDJSON 한 줄에 해당하는 dict를 차례로 내보냅니다.
+    키워드를 카테고리별로 묶어 카테고리마다 분석 스냅샷을 한 번만 불러오고, 카테고리 분류와 원고 생성은 최대 concurrency개씩 동시에 실행합니다.
+    결과 줄은 원고가 끝나는 즉시 보내고, 저장은 따로 카테고리별로 GENERATION_BATCH_INSERT_SIZE개가 모이거나
+    GENERATION_BATCH_FLUSH_SECONDS가 지나면 한 번에 합니다. 저장에 실패하면 같은 _id의 오류 줄이 뒤따릅니다.
+    그동안 끝난 원고가 없으면 진행 상황 줄을 보내 스트림이 오래 멈춰 있지 않게 합니다.
+    마감 시간은 배치 전체가 아니라 키워드마다 따로 적용합니다.
+
+    첫 줄: {"type": "start", total}
+    줄 형식: {"type": "result", keyword, category, _id, content} / {"type": "error", keyword, category, detail[, _id]}
+             / {"type": "progress", done, total}
+    마지막 줄: {"type": "summary", total, succeeded, failed} (succeeded는 저장까지 끝난 원고 수)
+    """
+    from analyzer.manuscript_generator import generate_manuscript_with_ai_async
+
+    keywords = unique_keywords(keywords)
+    semaphore = asyncio.Semaphore(concurrency or GENERATION_BATCH_CONCURRENCY)
+    succeeded = failed = 0
+    yield {"type": "start", "total": len(keywords)}
+
+    async def route(keyword):
+        async with semaphore:
+            try:
+                return keyword, await category_router.route(keyword), None
+            except Exception as e:
+                return keyword, None, e
+
+    # 1. 카테고리별로 묶기 (분류가 오래 걸려도 진행 상황 줄로 연결을 유지)
+    groups = {}
+    route_tasks = [asyncio.create_task(route(keyword)) for keyword in keywords]
+    try:
+        pending = set(route_tasks)
+        while pending:
+            finished, pending = await asyncio.wait(pending, timeout=GENERATION_BATCH_FLUSH_SECONDS)
+            if pending:
+                yield {"type": "progress", "done": 0, "total": len(keywords)}
+    finally:
+        for task in route_tasks:
+            task.cancel()
+        await asyncio.gather(*route_tasks, return_exceptions=True)
+    for task in route_tasks:
+        keyword, category, error = task.result()
+        if error is not None:
+            failed += 1
+            yield _error_line(keyword, None, f"카테고리 분류 중 오류 발생: {error}")
+            continue
+        groups.setdefault(category, []).append(keyword)
+
+    # 2. 카테고리마다 스냅샷을 한 번만 불러온 뒤 키워드별 생성 작업을 시작
+    async def generate(keyword, category, snapshot):
+        async with semaphore:
+            try:
+                with deadline(deadline_seconds):
+                    content = await generate_manuscript_with_ai_async(
+                        **snapshot["data"],
+                        user_instructions=keyword,
+                        retriever=snapshot["retriever"],
+                        artifact=snapshot["artifact"],
+                        service=service,
+                        hedge=hedge,
+                    )
+            except Exception as e:
+                return keyword, category, None, f"원고 생성 중 오류 발생: {e}"
+        if not content:
+            return keyword, category, None, "원고 생성에 실패했습니다. AI 모델 응답을 확인해주세요."
+        return keyword, category, content, None
+
+    tasks = []
+    try:
+        for category, category_keywords in groups.items():
+            try:
+                snapshot = await get_analysis_snapshot(AsyncMongoDBService(db_name=category))
+                error = None if all(snapshot["data"].values()) else "MongoDB에 원고 생성을 위한 충분한 분석 데이터가 없습니다. 먼저 분석을 실행하고 저장해주세요."
+            except Exception as e:
+                error = f"분석 데이터 조회 중 오류 발생: {e}"
+            if error is not None:
+                failed += len(category_keywords)
+                for keyword in category_keywords:
+                    yield _error_line(keyword, category, error)
+                continue
+            tasks.extend(asyncio.create_task(generate(keyword, category, snapshot)) for keyword in category_keywords)
+
+        # 3. 끝나는 즉시 결과 줄을 보내고, 저장은 카테고리별로 모아 묶음 크기나 시간 간격에 맞춰 수행
+        buffers = {}
+        pending = set(tasks)
+        done_count = 0
+        last_flush = time.monotonic()
+
+        async def flush(category):
+            nonlocal succeeded, failed
+            documents, buffers[category] = buffers[category], []
+            errors = await _save_manuscripts(category, documents)
+            succeeded += len(documents) - len(errors)
+            failed += len(errors)
+            return errors
+
+        while pending:
+            finished, pending = await asyncio.wait(
+                pending, timeout=GENERATION_BATCH_FLUSH_SECONDS, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in finished:
+                keyword, category, content, error = task.result()
+                done_count += 1
+                if error is not None:
+                    failed += 1
+                    yield _error_line(keyword, category, error)
+                    continue
+                document = {"_id": ObjectId(), "keyword": keyword, "content": content, "timestamp": time.time()}
+                buffers.setdefault(category, []).append(document)
+                yield {"type": "result", "keyword": keyword, "category": category,
+                       "_id": str(document["_id"]), "content": content}
+                if len(buffers[category]) >= GENERATION_BATCH_INSERT_SIZE:
+                    for line in await flush(category):
+                        yield line
+
+            if not finished:
+                yield {"type": "progress", "done": done_count, "total": len(keywords)}
+            if time.monotonic() - last_flush >= GENERATION_BATCH_FLUSH_SECONDS:
+                last_flush = time.monotonic()
+                for category in [category for category, documents in buffers.items() if documents]:
+                    for line in await flush(category):
+                        yield line
+
+        for category in [category for category, documents in buffers.items() if documents]:
+            for line in await flush(category):
+                yield line
+    finally:
+        # 클라이언트 연결이 끊기는 등으로 중간에 멈추면 남은 생성 요청을 취소
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    yield {"type": "summary", "total": len(keywords), "succeeded": succeeded, "failed": failed}
+
+
+def read_keywords_file(file) -> list:
+    """한 줄에 키워드 하나씩 적힌 파일을 읽습니다. 빈 줄과 #으로 시작하는 줄은 건너뜁니다."""
+    return unique_keywords(line for line in file if not line.lstrip().startswith("#"))
+
+
+def run_batch_generation(keywords: list, output, service: str = None, hedge: bool = None, concurrency: int = None) -> dict:
+    """CLI `generate --keywords-file`의 진입점입니다. 결과를 output에 NDJSON으로 쓰고 요약 dict를 반환합니다."""
+    from llm.providers import aclose_clients
+
+    async def main():
+        summary = None
+        try:
+            async for line in generate_batch(
+                keywords, service=service or GENERATION_DEFAULT_SERVICE, hedge=hedge, concurrency=concurrency
+            ):
+                output.write(json.dumps(line, ensure_ascii=False) + "\n")
+                output.flush()
+                if line["type"] == "summary":
+                    summary = line
+        finally:
+            await aclose_clients()
+        return summary
+
+    return asyncio.run(main())
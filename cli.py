@@ -10,17 +10,38 @@ def cli():
     pass
 
 @cli.command()
-def analyze():
-    """Analyzes text files and saves the results to MongoDB."""
+@click.option('--directory', default="data", show_default=True, help='Directory of .txt files to analyze.')
+@click.option('--full', is_flag=True, default=False, help='Re-analyze every file, ignoring the manifest of processed files.')
+@click.option('--workers', type=click.IntRange(min=1), default=None, help='Worker processes for morpheme/sentence analysis. [default: CPU count]')
+def analyze(directory, full, workers):
+    """Analyzes new or changed text files and saves the results to MongoDB."""
     click.echo("Starting analysis...")
-    run_analysis()
+    run_analysis(directory, full=full, workers=workers)
     click.echo("Analysis finished and data saved to MongoDB.")
 
 @cli.command()
-@click.option('--keywords', required=True, help='Keywords for manuscript generation.')
+@click.option('--keywords', default=None, help='Keywords for manuscript generation.')
+@click.option('--keywords-file', type=click.File('r', encoding='utf-8'), default=None, help='File with one keyword per line. Generates a manuscript for each keyword in its category and saves them to MongoDB.')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default="manuscripts.ndjson", show_default=True, help='NDJSON results file for --keywords-file (use - for stdout).')
+@click.option('--concurrency', type=click.IntRange(min=1), default=None, help='Manuscripts to generate at the same time with --keywords-file. [default: GENERATION_BATCH_CONCURRENCY]')
 @click.option('--user-instructions', default="", help='User instructions for manuscript generation.')
-def generate(keywords, user_instructions):
+@click.option('--service', default=None, help='LLM service: gpt, claude, gemini, solar, or auto (fastest available, with failover). [default: GENERATION_DEFAULT_SERVICE]')
+def generate(keywords, keywords_file, output, concurrency, user_instructions, service):
     """Generates a manuscript based on the latest analysis data."""
+    if keywords_file is not None:
+        from batch_generation import read_keywords_file, run_batch_generation
+
+        batch_keywords = read_keywords_file(keywords_file)
+        if not batch_keywords:
+            raise click.UsageError("No keywords found in --keywords-file.")
+        click.echo(f"Generating manuscripts for {len(batch_keywords)} keywords...")
+        summary = run_batch_generation(batch_keywords, output, service=service, concurrency=concurrency)
+        if summary:
+            click.echo(f"Batch finished: {summary['succeeded']} succeeded, {summary['failed']} failed.")
+        return
+    if not keywords:
+        raise click.UsageError("Either --keywords or --keywords-file is required.")
+
     click.echo(f"Generating manuscript with keywords: {keywords}")
     # Note: This is a simplified version. In a real scenario, you'd fetch
     # the necessary data from MongoDB here, similar to how the API does.
@@ -32,7 +53,6 @@ def generate(keywords, user_instructions):
     from mongodb_service import MongoDBService
     db_service = MongoDBService()
     analysis_data = db_service.get_latest_analysis_data()
-    db_service.close_connection()
 
     if not analysis_data:
         click.echo("No analysis data found in MongoDB. Please run 'analyze' first.")
@@ -48,11 +68,21 @@ def generate(keywords, user_instructions):
         sentences=sentences,
         expressions=expressions,
         parameters=parameters,
-        user_instructions=user_instructions
+        user_instructions=user_instructions,
+        service=service
     )
     click.echo("Generated Manuscript:")
     click.echo(manuscript)
 
+@cli.command()
+@click.option('--concurrency', type=click.IntRange(min=1), default=None, help='Jobs to run at the same time. [default: JOB_WORKER_CONCURRENCY]')
+def worker(concurrency):
+    """Runs a background worker for jobs queued through POST /jobs."""
+    from job_worker import run_worker
+
+    click.echo("Starting job worker...")
+    run_worker(concurrency=concurrency)
+
 @cli.command()
 def serve():
     """Runs the FastAPI web server."""
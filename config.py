@@ -1,24 +1,131 @@
 import os
-import anthropic
 from dotenv import load_dotenv
-from openai import OpenAI
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+# 분석 결과 upsert 시 bulk_write 한 번에 보낼 연산 수
+MONGO_BULK_WRITE_CHUNK_SIZE = int(os.getenv("MONGO_BULK_WRITE_CHUNK_SIZE", "1000"))
+
+# API 서버의 카테고리별 분석 스냅샷 메모리 캐시
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "16"))
+ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "60"))
+# 캐시 전체의 대략적인 메모리 한도(바이트). 분석 데이터 문자열과 문장 검색 인덱스(BM25 행렬, n-gram 사전)를 함께 셈
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-solar_client = OpenAI(
-    api_key=UPSTAGE_API_KEY,
-    base_url="https://api.upstage.ai/v1/solar",
-    default_headers={
-        "Authorization": f"Bearer {UPSTAGE_API_KEY}"
-    }
-)
+# 분석 단계의 LLM 동시 호출 수와 초당 요청 수 제한
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "2"))
+
+# 형태소 분석·문장 분리(로컬 CPU 작업) 프로세스 수와 워커에 한 번에 넘길 파일 수 (0이면 CPU 코어 수)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0"))
+ANALYSIS_CHUNK_SIZE = int(os.getenv("ANALYSIS_CHUNK_SIZE", "64"))
+# 워커에 넘겨 결과를 기다리는 파일 크기 합의 상한(바이트). 큰 파일이 많아도 결과(문장 리스트)가 이만큼만 메모리에 쌓임
+ANALYSIS_MAX_PENDING_BYTES = int(os.getenv("ANALYSIS_MAX_PENDING_BYTES", str(256 * 1024 * 1024)))
+
+# 형태소 분석 백엔드: auto(okt → kiwi → regex 순서로 사용 가능한 것), okt(konlpy), kiwi(kiwipiepy), regex
+MORPHEME_BACKEND = os.getenv("MORPHEME_BACKEND", "auto").lower()
+# konlpy JVM 옵션 (프로세스당 한 번 시작). 추가 옵션은 공백으로 구분하여 MORPHEME_JVM_OPTIONS에 지정
+MORPHEME_JVM_MAX_HEAP = os.getenv("MORPHEME_JVM_MAX_HEAP", "1024m")
+MORPHEME_JVM_CODE_CACHE = os.getenv("MORPHEME_JVM_CODE_CACHE", "64m")
+MORPHEME_JVM_OPTIONS = os.getenv("MORPHEME_JVM_OPTIONS", "")
+# 품사 태깅 한 번에 이어 붙일 텍스트 길이(문자 수)
+MORPHEME_BATCH_CHARS = int(os.getenv("MORPHEME_BATCH_CHARS", "20000"))
+# 원고 생성 프롬프트에 넣을 단어 수 (카테고리 TF-IDF 상위)
+MORPHEME_TOP_N = int(os.getenv("MORPHEME_TOP_N", "300"))
+
+# 분석용 LLM 응답 디스크 캐시 (키: 모델 + 시스템 프롬프트 + 사용자 프롬프트의 해시)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# 키워드 → 카테고리 라우팅: 메모리 캐시 크기/TTL, 로컬 분류기 신뢰도 기준, 분류기 갱신 주기
+CATEGORY_ROUTER_CACHE_MAX_ENTRIES = int(os.getenv("CATEGORY_ROUTER_CACHE_MAX_ENTRIES", "10000"))
+CATEGORY_ROUTER_CACHE_TTL_SECONDS = float(os.getenv("CATEGORY_ROUTER_CACHE_TTL_SECONDS", str(24 * 3600)))
+# 키워드 n-gram 중 1위 카테고리 어휘에 있는 비율의 하한, 1위와 2위 유사도 차이((1위 - 2위) / 1위)의 하한
+# 중심 벡터는 어휘 전체의 n-gram을 담고 있어 코사인 유사도 자체는 어휘 크기에 따라 0.02~0.05 수준으로 작으므로 절대값 대신 이 두 기준을 씀
+CATEGORY_ROUTER_MIN_COVERAGE = float(os.getenv("CATEGORY_ROUTER_MIN_COVERAGE", "0.6"))
+CATEGORY_ROUTER_MIN_MARGIN = float(os.getenv("CATEGORY_ROUTER_MIN_MARGIN", "0.4"))
+CATEGORY_ROUTER_REFRESH_SECONDS = float(os.getenv("CATEGORY_ROUTER_REFRESH_SECONDS", "600"))
+
+# 원고 생성 프롬프트에 넣을 키워드 관련 문장(RAG 스니펫) 수
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+
+# 원고 생성 프롬프트의 최대 토큰 수와 섹션별 토큰 예산 (초과분은 관련도가 낮은 항목부터 잘라냄)
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "32000"))
+PROMPT_SECTION_BUDGETS = {
+    "rag_snippets": int(os.getenv("PROMPT_BUDGET_RAG_SNIPPETS", "2000")),
+    "sentences": int(os.getenv("PROMPT_BUDGET_SENTENCES", "6000")),
+    "expressions": int(os.getenv("PROMPT_BUDGET_EXPRESSIONS", "2400")),
+    "parameters": int(os.getenv("PROMPT_BUDGET_PARAMETERS", "1800")),
+    "words": int(os.getenv("PROMPT_BUDGET_WORDS", "1800")),
+    "ref": int(os.getenv("PROMPT_BUDGET_REF", "3000")),
+}
+
+# 배치 템플릿 생성 시 요청 하나에 담을 세그먼트의 토큰 예산
+TEMPLATE_BATCH_MAX_TOKENS = int(os.getenv("TEMPLATE_BATCH_MAX_TOKENS", "3000"))
+
+# LLM 제공자 HTTP 클라이언트 (llm.providers): 커넥션 풀 크기, keep-alive 유지 시간, 타임아웃
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+LLM_HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_READ_TIMEOUT_SECONDS", "600"))
+# Anthropic Messages API는 max_tokens가 필수이므로 지정하지 않았을 때 사용할 값
+LLM_ANTHROPIC_MAX_TOKENS = int(os.getenv("LLM_ANTHROPIC_MAX_TOKENS", "8192"))
+# 원고 생성의 제공자별 최대 출력 토큰 수 ("서비스=토큰 수"를 쉼표로 구분). 한글 약 3만 자 원고가 잘리지 않도록 claude는 32000
+# 지정하지 않은 OpenAI 호환 제공자는 모델의 최대값을 사용
+MANUSCRIPT_MAX_TOKENS = {
+    service.strip(): int(tokens)
+    for service, tokens in (item.split("=", 1) for item in os.getenv("MANUSCRIPT_MAX_TOKENS", "claude=32000").split(",") if item.strip())
+}
+
+# LLM 호출 재시도 (llm.resilience): 최대 시도 횟수(최소 1), 지수 백오프 기본/최대 대기 시간(초)
+LLM_RETRY_MAX_ATTEMPTS = max(1, int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "5")))
+LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "1"))
+LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "30"))
+# 제공자별 서킷 브레이커: 연속 실패 몇 번에 열지, 열린 뒤 몇 초 후 다시 시험할지
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+# API 서버 원고 생성 요청의 마감 시간(초). 재시도를 포함한 전체 LLM 호출이 이 안에 끝나야 함
+API_REQUEST_DEADLINE_SECONDS = float(os.getenv("API_REQUEST_DEADLINE_SECONDS", "300"))
+
+# 원고 생성 제공자 라우팅 (llm.routing): service가 auto일 때 후보 제공자(API 키가 있는 것만 사용)와 기본 서비스
+GENERATION_PROVIDERS = [s.strip() for s in os.getenv("GENERATION_PROVIDERS", "gpt,claude,gemini").split(",") if s.strip()]
+GENERATION_DEFAULT_SERVICE = os.getenv("GENERATION_DEFAULT_SERVICE", "auto")
+# 제공자별 응답 시간 EWMA 가중치, p95 계산용 최근 표본 수, 표본이 없을 때 가정하는 응답 시간(초)
+LLM_ROUTING_EWMA_ALPHA = float(os.getenv("LLM_ROUTING_EWMA_ALPHA", "0.2"))
+LLM_ROUTING_WINDOW = int(os.getenv("LLM_ROUTING_WINDOW", "200"))
+LLM_ROUTING_INITIAL_LATENCY_SECONDS = float(os.getenv("LLM_ROUTING_INITIAL_LATENCY_SECONDS", "60"))
+# 헤지 요청: 첫 제공자가 p95 응답 시간 안에 끝나지 않으면 다음 제공자에 같은 요청을 보냄
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "90"))
+
+# 작업 큐 (job_worker): 작업자 한 명의 동시 실행 수, 빈 큐 조회 간격(초), 임대 시간(초), 작업자 중단 시 최대 시도 횟수
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# 카테고리별로 동시에 실행할 원고 생성 작업 수 (분석 작업은 같은 DB를 갱신하므로 DB당 항상 하나씩)
+JOB_CATEGORY_MAX_RUNNING = int(os.getenv("JOB_CATEGORY_MAX_RUNNING", "2"))
+
+# 배치 원고 생성 (batch_generation): 요청당 최대 키워드 수, 동시에 생성할 원고 수, manuscripts에 한 번에 저장할 문서 수
+GENERATION_BATCH_MAX_KEYWORDS = int(os.getenv("GENERATION_BATCH_MAX_KEYWORDS", "500"))
+GENERATION_BATCH_CONCURRENCY = int(os.getenv("GENERATION_BATCH_CONCURRENCY", "8"))
+GENERATION_BATCH_INSERT_SIZE = int(os.getenv("GENERATION_BATCH_INSERT_SIZE", "20"))
+# 저장을 기다리는 원고를 모아두는 최대 시간(초). 이 시간 동안 끝난 원고가 없으면 진행 상황 줄을 보내 연결을 유지
+GENERATION_BATCH_FLUSH_SECONDS = float(os.getenv("GENERATION_BATCH_FLUSH_SECONDS", "2"))
+
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 CLAUDE_API_KEY = os.getenv('ANTHROPIC_API_KEY')
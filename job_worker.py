@@ -0,0 +1,256 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from config import (
+    MONGO_DB_NAME,
+    JOB_WORKER_CONCURRENCY,
+    JOB_POLL_INTERVAL_SECONDS,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_CATEGORY_MAX_RUNNING,
+)
+from mongodb_service import AsyncMongoDBService
+from utils.analysis_snapshot import get_analysis_snapshot
+from utils.category_router import category_router
+
+JOB_KINDS = ("generate", "analyze")
+# 카테고리가 아직 정해지지 않은 원고 생성 작업의 concurrency_key (작업자가 분류한 뒤 카테고리 키로 바꿈)
+UNROUTED_CONCURRENCY_KEY = "generate"
+
+
+class JobDeferred(Exception):
+    """카테고리를 분류해 보니 그 카테고리의 동시 실행 수가 이미 가득 차 작업을 큐로 되돌릴 때 사용합니다."""
+
+
+def job_concurrency_key(kind: str, category: str) -> str:
+    """동시 실행 수를 제한하는 단위입니다. (작업 종류 + 카테고리 DB)"""
+    if kind == "generate" and not category:
+        return UNROUTED_CONCURRENCY_KEY
+    return f"{kind}:{category or MONGO_DB_NAME}"
+
+
+def concurrency_limit(concurrency_key: str) -> float:
+    """
+    분석 작업은 같은 DB의 manifest와 분석 행을 갱신하므로 DB당 하나씩만, 원고 생성은 카테고리별 설정값만큼 실행합니다.
+    카테고리 분류 전의 원고 생성 작업은 분류한 뒤 카테고리 제한을 다시 확인하므로 제한하지 않습니다.
+    """
+    if concurrency_key == UNROUTED_CONCURRENCY_KEY:
+        return float("inf")
+    return 1 if concurrency_key.startswith("analyze:") else JOB_CATEGORY_MAX_RUNNING
+
+
+async def route_generate_job(job: dict):
+    """
+    카테고리 없이 들어온 원고 생성 작업의 카테고리를 분류해 작업 문서에 기록합니다.
+    그 카테고리에서 이미 제한만큼 실행 중이면 JobDeferred를 발생시켜 작업을 큐로 되돌립니다.
+    (분류 결과를 기록해 두었으므로 다시 가져올 때는 분류하지 않고 카테고리 제한에 따라 기다림)
+    """
+    payload = job["payload"]
+    payload["category"] = await category_router.route(payload["keyword"])
+    key = job_concurrency_key("generate", payload["category"])
+    db = AsyncMongoDBService()
+    if not await db.assign_job_category(job["_id"], job["worker_id"], payload["category"], key):
+        raise JobDeferred("카테고리를 기록하기 전에 임대를 잃었습니다.")
+    if (await db.running_job_counts()).get(key, 0) > concurrency_limit(key):
+        raise JobDeferred(f"{payload['category']} 카테고리의 원고 생성 작업이 가득 찼습니다.")
+
+
+async def run_generate_job(job: dict, report) -> dict:
+    """원고 생성 작업: 카테고리 분석 스냅샷으로 원고를 생성하고 manuscripts에 저장합니다."""
+    from analyzer.manuscript_generator import generate_manuscript_with_ai_async
+
+    payload = job["payload"]
+    if not payload.get("category"):
+        report(stage="route")
+        await route_generate_job(job)
+    db_service = AsyncMongoDBService(db_name=payload["category"])
+
+    report(stage="snapshot")
+    snapshot = await get_analysis_snapshot(db_service)
+    analysis_data = snapshot["data"]
+    if not all(analysis_data.get(key) for key in ("unique_words", "sentences", "expressions", "parameters")):
+        raise ValueError("MongoDB에 원고 생성을 위한 충분한 분석 데이터가 없습니다. 먼저 분석을 실행하고 저장해주세요.")
+
+    report(stage="generate")
+    generated_manuscript = await generate_manuscript_with_ai_async(
+        **analysis_data,
+        user_instructions=payload["keyword"],
+        retriever=snapshot["retriever"],
+        artifact=snapshot["artifact"],
+        service=payload["service"],
+        hedge=payload.get("hedge"),
+    )
+    if not generated_manuscript:
+        raise ValueError("원고 생성에 실패했습니다. AI 모델 응답을 확인해주세요.")
+
+    # 작업자가 저장 직후 중단되어 작업을 다시 실행해도 원고가 중복 저장되지 않도록 job_id 기준으로 저장
+    report(stage="save")
+    document = await db_service.upsert_document(
+        "manuscripts",
+        {"job_id": job["_id"]},
+        {"job_id": job["_id"], "content": generated_manuscript, "timestamp": time.time()},
+    )
+    return {"_id": str(document["_id"]), "category": payload["category"], "content": generated_manuscript}
+
+
+async def run_analyze_job(job: dict, report) -> dict:
+    """
+    분석 작업: 디렉토리를 증분 분석하여 저장합니다. (analyze_and_store를 스레드에서 실행)
+    작업자가 중단되었다가 다시 실행되면 manifest에 기록된 파일은 건너뛰므로 남은 파일부터 이어서 분석합니다.
+    """
+    from main import analyze_and_store
+
+    payload = job["payload"]
+    analysis = asyncio.ensure_future(asyncio.to_thread(
+        analyze_and_store,
+        payload["directory"],
+        full=payload.get("full", False),
+        workers=payload.get("workers"),
+        db_name=payload.get("db_name"),
+        progress=report,
+    ))
+    try:
+        return await asyncio.shield(analysis)
+    except asyncio.CancelledError:
+        # 스레드에서 실행 중인 분석은 중간에 멈출 수 없으므로, 같은 DB를 두 작업자가 동시에 갱신하지 않도록 끝날 때까지 기다림
+        print("진행 중인 분석이 끝날 때까지 기다립니다...")
+        await asyncio.gather(analysis, return_exceptions=True)
+        raise
+
+
+JOB_HANDLERS = {
+    "generate": run_generate_job,
+    "analyze": run_analyze_job,
+}
+
+
+class JobWorker:
+    """
+    MongoDB jobs 컬렉션에서 작업을 꺼내 실행하는 작업자입니다. 별도 브로커 없이 한 프로세스에서 여러 작업을 동시에 실행합니다.
+    작업을 가져오면 임대(lease)를 걸고 실행하는 동안 주기적으로 연장하며(진행 상황도 함께 기록),
+    작업자가 중단되어 임대가 만료된 작업은 다른(또는 다시 시작한) 작업자가 가져가 이어서 실행합니다.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = JOB_WORKER_CONCURRENCY,
+        poll_interval: float = JOB_POLL_INTERVAL_SECONDS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.db = AsyncMongoDBService()
+
+    async def _claim(self):
+        """카테고리별 동시 실행 제한을 지키면서 다음 작업을 가져옵니다. 없으면 None입니다."""
+        await self.db.fail_abandoned_jobs(self.max_attempts)
+        counts = await self.db.running_job_counts()
+        saturated = [key for key, count in counts.items() if count >= concurrency_limit(key)]
+        job = await self.db.claim_job(self.worker_id, self.lease_seconds, excluded_keys=saturated)
+        if job is None:
+            return None
+
+        # 여러 작업자가 동시에 같은 카테고리의 작업을 가져갔으면 제한을 넘긴 쪽이 되돌려 놓음
+        key = job["concurrency_key"]
+        if (await self.db.running_job_counts()).get(key, 0) > concurrency_limit(key):
+            await self.db.release_job(job["_id"], self.worker_id)
+            return None
+        return job
+
+    async def _execute(self, job: dict):
+        job_id = job["_id"]
+        progress = dict(job.get("progress") or {})
+
+        def report(**info):
+            # 분석 작업은 스레드에서 호출하므로 dict만 갱신하고, DB 기록은 임대 연장 루프가 맡음
+            progress.update(info, updated_at=time.time())
+
+        print(f"작업 시작: {job_id} ({job['kind']}, {job['attempts']}번째 시도)")
+        handler = asyncio.create_task(JOB_HANDLERS[job["kind"]](job, report))
+
+        async def heartbeat():
+            # 일시적인 DB 오류는 임대가 남아 있는 동안 계속 다시 시도하고, 임대가 만료되거나 잃으면 실행을 중단
+            lease_expires_at = job["lease_expires_at"]
+            while True:
+                await asyncio.sleep(min(self.lease_seconds / 3, 5))
+                requested_at = time.time()
+                try:
+                    renewed = await self.db.heartbeat_job(job_id, self.worker_id, self.lease_seconds, dict(progress))
+                except Exception as e:
+                    if time.time() < lease_expires_at:
+                        print(f"작업 {job_id}의 임대 연장 실패, 다시 시도합니다: {e}")
+                        continue
+                    print(f"작업 {job_id}의 임대를 연장하지 못한 채 만료되어 실행을 중단합니다: {e}")
+                    handler.cancel()
+                    return
+                if not renewed:
+                    print(f"작업 {job_id}의 임대를 잃어 실행을 중단합니다.")
+                    handler.cancel()
+                    return
+                lease_expires_at = requested_at + self.lease_seconds
+
+        heartbeat_task = asyncio.create_task(heartbeat())
+        try:
+            result = await handler
+        except asyncio.CancelledError:
+            if heartbeat_task.done():
+                # 임대를 잃은 작업은 가져간 작업자가 이어서 실행하므로 여기서는 기록하지 않음
+                return
+            # 작업자 종료로 취소된 작업은 임대 만료를 기다리지 않고 바로 다른 작업자가 가져가도록 되돌림
+            await asyncio.shield(self.db.release_job(job_id, self.worker_id))
+            raise
+        except JobDeferred as e:
+            print(f"작업 보류: {job_id}: {e}")
+            await self.db.release_job(job_id, self.worker_id)
+        except Exception as e:
+            print(f"작업 실패: {job_id}: {e}")
+            await self.db.finish_job(job_id, self.worker_id, "failed", progress=dict(progress), error=str(e))
+        else:
+            print(f"작업 완료: {job_id}")
+            await self.db.finish_job(job_id, self.worker_id, "succeeded", progress=dict(progress), result=result)
+        finally:
+            heartbeat_task.cancel()
+
+    async def run(self):
+        """작업자를 실행합니다. 큐가 비어 있으면 poll_interval마다 다시 확인합니다."""
+        await self.db.ensure_job_indexes()
+        print(f"작업자 시작: {self.worker_id} (동시 실행 {self.concurrency}개)")
+        running = set()
+        try:
+            while True:
+                if len(running) >= self.concurrency:
+                    await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                job = await self._claim()
+                if job is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                task = asyncio.create_task(self._execute(job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+
+def run_worker(concurrency: int = None):
+    """CLI `worker` 명령어의 진입점입니다. Ctrl+C로 종료하면 실행 중인 작업은 큐로 되돌립니다."""
+    from llm.providers import aclose_clients
+
+    async def main():
+        try:
+            await JobWorker(concurrency=concurrency or JOB_WORKER_CONCURRENCY).run()
+        finally:
+            await aclose_clients()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("작업자를 종료합니다.")
@@ -1,5 +1,4 @@
-import anthropic
-from config import CLAUDE_API_KEY
+from llm.providers import complete, get_provider
 
 def get_claude_response(prompt: str):
     """
@@ -11,22 +10,20 @@ def get_claude_response(prompt: str):
     Returns:
         str: 생성된 텍스트 응답
     """
-    if not CLAUDE_API_KEY:
-        raise ValueError("CLAUDE_API_KEY가 설정되지 않았습니다.")
+    get_provider("claude")  # API 키가 없으면 ValueError
 
-    client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
     print(prompt)
     try:
-        message = client.messages.create(
-            model='claude-opus-4-1-20250805',
-            max_tokens=1024,
-            messages=[
+        result = complete(
+            "claude",
+            [
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            max_tokens=1024,
         )
-        content = message.content[0].text
+        content = result["content"]
         
         return content
     except Exception as e:
         print(f"Claude API 호출 중 오류 발생: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -1,6 +1,5 @@
 
-from openai import OpenAI
-from config import GEMINI_API_KEY
+from llm.providers import complete
 
 
 def get_gemini_response(prompt: str):
@@ -13,11 +12,10 @@ def get_gemini_response(prompt: str):
     Returns:
         str: 생성된 텍스트 응답
     """
-    client = OpenAI(api_key=GEMINI_API_KEY)
     try:
-        response = client.chat.completions.create(
-            model='gemini-2.5-pro',
-            messages=[
+        result = complete(
+            "gemini",
+            [
                 {"role": "system", "content": ''},
                 {"role": "user", "content": f'''{prompt}'''}
             ],
@@ -25,6 +23,6 @@ def get_gemini_response(prompt: str):
             # top_p=1.0,
             # presence_penalty=0.0
         )
-        return response.choices[0].message.content
+        return result["content"]
     except Exception as e:
         return f"An error occurred: {e}"
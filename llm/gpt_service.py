@@ -1,9 +1,9 @@
-from config import openai_client
+from llm.providers import get_client
 def send_prompt_to_gpt(keyword):
     
     
     try:
-        response = openai_client.chat.completions.create(
+        response = get_client("gpt").chat.completions.create(
             model='gpt-4.1-2025-04-14',
             messages=[
                 {"role": "system", "content": ''},
@@ -0,0 +1,288 @@
+import threading
+import anthropic
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI
+from config import (
+    OPENAI_API_KEY,
+    ANTHROPIC_API_KEY,
+    GEMINI_API_KEY,
+    UPSTAGE_API_KEY,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_HTTP_CONNECT_TIMEOUT_SECONDS,
+    LLM_HTTP_READ_TIMEOUT_SECONDS,
+    LLM_ANTHROPIC_MAX_TOKENS,
+)
+from llm.resilience import call_with_retry, acall_with_retry
+
+try:
+    import h2  # noqa: F401  httpx의 HTTP/2 지원에 필요
+    HTTP2_AVAILABLE = True
+except ImportError:  # h2가 없으면 HTTP/1.1 keep-alive로 동작
+    HTTP2_AVAILABLE = False
+
+# 서비스 이름 -> 제공자 설정. kind가 openai인 제공자는 OpenAI 호환 API를 사용합니다.
+PROVIDERS = {
+    "gpt": {
+        "kind": "openai",
+        "api_key": OPENAI_API_KEY,
+        "base_url": None,
+        "default_model": "gpt-5-mini-2025-08-07",
+    },
+    "claude": {
+        "kind": "anthropic",
+        "api_key": ANTHROPIC_API_KEY,
+        "base_url": None,
+        "default_model": "claude-opus-4-1-20250805",
+    },
+    "gemini": {
+        "kind": "openai",
+        "api_key": GEMINI_API_KEY,
+        "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
+        "default_model": "gemini-2.5-pro",
+    },
+    "solar": {
+        "kind": "openai",
+        "api_key": UPSTAGE_API_KEY,
+        "base_url": "https://api.upstage.ai/v1/solar",
+        "default_model": "solar-pro",
+    },
+}
+
+# 응답이 최대 출력 토큰 수에 걸려 끝났음을 나타내는 finish_reason (Anthropic의 stop_reason "max_tokens"도 이 값으로 맞춤)
+TRUNCATED_FINISH_REASON = "length"
+
+
+class ResponseTruncatedError(Exception):
+    """응답이 최대 출력 토큰 수에 걸려 중간에 잘렸을 때 발생합니다."""
+    pass
+
+
+def ensure_complete(service: str, result: dict) -> dict:
+    """응답이 최대 출력 토큰 수에 걸려 잘렸으면 ResponseTruncatedError를 발생시킵니다. 아니면 result를 그대로 반환합니다."""
+    if result.get("finish_reason") == TRUNCATED_FINISH_REASON:
+        raise ResponseTruncatedError(f"'{service}' 응답이 최대 출력 토큰 수에 걸려 잘렸습니다.")
+    return result
+
+
+def _finish_reason(reason: str) -> str:
+    return TRUNCATED_FINISH_REASON if reason == "max_tokens" else reason
+
+
+_clients = {}
+_async_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _http_options() -> dict:
+    return {
+        "http2": HTTP2_AVAILABLE,
+        "limits": httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        "timeout": httpx.Timeout(LLM_HTTP_READ_TIMEOUT_SECONDS, connect=LLM_HTTP_CONNECT_TIMEOUT_SECONDS),
+    }
+
+
+def get_provider(service: str) -> dict:
+    """서비스 이름(gpt, claude, gemini, solar)의 제공자 설정을 반환합니다."""
+    provider = PROVIDERS.get(service.lower()) if service else None
+    if provider is None:
+        raise ValueError(f"지원하지 않는 서비스입니다: {service} (사용 가능: {', '.join(PROVIDERS)})")
+    if not provider["api_key"]:
+        raise ValueError(f"'{service}' 서비스의 API 키가 설정되지 않았습니다. .env 파일을 확인해주세요.")
+    return provider
+
+
+def _build_client(provider: dict, is_async: bool):
+    # SDK가 제공하는 기본 HTTP 클라이언트에 풀/타임아웃 설정만 덮어씀 (SDK 기본 동작은 유지)
+    # 재시도는 llm.resilience에서 서킷 브레이커·마감 시간과 함께 처리하므로 SDK 자체 재시도는 끔
+    if provider["kind"] == "anthropic":
+        sdk, client_class = anthropic, (anthropic.AsyncAnthropic if is_async else anthropic.Anthropic)
+        arguments = {"api_key": provider["api_key"]}
+    else:
+        sdk, client_class = openai, (AsyncOpenAI if is_async else OpenAI)
+        arguments = {"api_key": provider["api_key"], "base_url": provider["base_url"]}
+    http_client_class = sdk.DefaultAsyncHttpxClient if is_async else sdk.DefaultHttpxClient
+    return client_class(http_client=http_client_class(**_http_options()), max_retries=0, **arguments)
+
+
+def get_client(service: str):
+    """
+    서비스의 동기 클라이언트를 반환합니다. 프로세스당 한 번만 만들어 커넥션 풀(keep-alive)을 재사용합니다.
+    gpt/gemini/solar는 OpenAI 클라이언트, claude는 Anthropic 클라이언트입니다.
+    """
+    provider = get_provider(service)
+    with _clients_lock:
+        if service not in _clients:
+            _clients[service] = _build_client(provider, is_async=False)
+        return _clients[service]
+
+
+def get_async_client(service: str):
+    """서비스의 비동기 클라이언트를 반환합니다. API 서버의 이벤트 루프에서 재사용합니다."""
+    provider = get_provider(service)
+    with _clients_lock:
+        if service not in _async_clients:
+            _async_clients[service] = _build_client(provider, is_async=True)
+        return _async_clients[service]
+
+
+def close_clients():
+    """동기 클라이언트들의 커넥션 풀을 닫습니다."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_clients():
+    """비동기 클라이언트들의 커넥션 풀을 닫습니다. API 서버 종료 시 호출됩니다."""
+    with _clients_lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        await client.close()
+
+
+def _anthropic_arguments(messages: list, model: str, kwargs: dict) -> dict:
+    """OpenAI 형식의 messages를 Anthropic Messages API 인자로 바꿉니다. (system 메시지는 system 인자로 분리)"""
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system" and m["content"].strip())
+    arguments = {
+        "model": model,
+        "max_tokens": kwargs.pop("max_tokens", LLM_ANTHROPIC_MAX_TOKENS),
+        "messages": [m for m in messages if m["role"] != "system"],
+        **kwargs,
+    }
+    if system:
+        arguments["system"] = system
+    return arguments
+
+
+def _usage_dict(usage) -> dict:
+    """제공자별 usage 객체를 {"prompt_tokens", "completion_tokens", "total_tokens"} dict로 맞춥니다."""
+    if usage is None:
+        return None
+    if hasattr(usage, "input_tokens"):
+        prompt_tokens, completion_tokens = usage.input_tokens, usage.output_tokens
+    else:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _with_timeout(kwargs: dict, timeout: float) -> dict:
+    """마감 시간으로 줄인 이번 시도의 타임아웃이 있으면 요청 인자에 넣습니다."""
+    return kwargs if timeout is None else {**kwargs, "timeout": timeout}
+
+
+def _anthropic_result(message) -> dict:
+    return {
+        "content": "".join(block.text for block in message.content if block.type == "text"),
+        "usage": _usage_dict(message.usage),
+        "finish_reason": _finish_reason(message.stop_reason),
+    }
+
+
+def _openai_result(response) -> dict:
+    return {
+        # 거절·빈 응답이면 content가 None이므로 anthropic과 같이 빈 문자열로 맞춤
+        "content": response.choices[0].message.content or "",
+        "usage": _usage_dict(response.usage),
+        "finish_reason": response.choices[0].finish_reason,
+    }
+
+
+def complete(service: str, messages: list, model: str = None, **kwargs) -> dict:
+    """
+    서비스에 OpenAI 형식의 messages로 요청하고 {"content": 응답 텍스트, "usage": 토큰 사용량 dict, "finish_reason": 종료 이유}를 반환합니다.
+    finish_reason이 "length"이면 최대 출력 토큰 수에 걸려 잘린 응답입니다. (ensure_complete 참고)
+    일시적인 오류는 llm.resilience의 재시도·서킷 브레이커·마감 시간 규칙에 따라 다시 시도합니다.
+    """
+    provider = get_provider(service)
+    client = get_client(service)
+    model = model or provider["default_model"]
+    if provider["kind"] == "anthropic":
+        arguments = _anthropic_arguments(messages, model, kwargs)
+
+        def request(timeout):
+            # 긴 원고(큰 max_tokens)는 SDK가 비스트리밍 요청을 거부하므로 스트림으로 받아 최종 메시지를 모음
+            with client.messages.stream(**_with_timeout(arguments, timeout)) as stream:
+                return stream.get_final_message()
+
+        return _anthropic_result(call_with_retry(service, request))
+    arguments = {"model": model, "messages": messages, **kwargs}
+    response = call_with_retry(service, lambda timeout: client.chat.completions.create(**_with_timeout(arguments, timeout)))
+    return _openai_result(response)
+
+
+async def acomplete(service: str, messages: list, model: str = None, **kwargs) -> dict:
+    """complete의 비동기 버전입니다."""
+    provider = get_provider(service)
+    client = get_async_client(service)
+    model = model or provider["default_model"]
+    if provider["kind"] == "anthropic":
+        arguments = _anthropic_arguments(messages, model, kwargs)
+
+        async def request(timeout):
+            async with client.messages.stream(**_with_timeout(arguments, timeout)) as stream:
+                return await stream.get_final_message()
+
+        return _anthropic_result(await acall_with_retry(service, request))
+    arguments = {"model": model, "messages": messages, **kwargs}
+    response = await acall_with_retry(service, lambda timeout: client.chat.completions.create(**_with_timeout(arguments, timeout)))
+    return _openai_result(response)
+
+
+async def astream(service: str, messages: list, model: str = None, **kwargs):
+    """
+    응답을 스트리밍하는 비동기 제너레이터입니다.
+    ("token", 텍스트 조각)을 차례로 내보내고, ("finish", 종료 이유)와 ("usage", 토큰 사용량 dict 또는 None)을 마지막에 내보냅니다.
+    재시도는 스트림을 여는 단계에서만 합니다. (토큰을 내보낸 뒤에는 다시 시도하지 않음)
+    """
+    provider = get_provider(service)
+    client = get_async_client(service)
+    model = model or provider["default_model"]
+    if provider["kind"] == "anthropic":
+        arguments = {**_anthropic_arguments(messages, model, kwargs), "stream": True}
+        stream = await acall_with_retry(service, lambda timeout: client.messages.create(**_with_timeout(arguments, timeout)))
+        prompt_tokens = completion_tokens = 0
+        finish_reason = None
+        async for event in stream:
+            if event.type == "message_start":
+                prompt_tokens = event.message.usage.input_tokens
+            elif event.type == "content_block_delta" and event.delta.type == "text_delta":
+                yield "token", event.delta.text
+            elif event.type == "message_delta":
+                completion_tokens = event.usage.output_tokens
+                finish_reason = _finish_reason(event.delta.stop_reason)
+        yield "finish", finish_reason
+        yield "usage", {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return
+
+    arguments = {
+        "model": model, "messages": messages, "stream": True, "stream_options": {"include_usage": True}, **kwargs
+    }
+    stream = await acall_with_retry(service, lambda timeout: client.chat.completions.create(**_with_timeout(arguments, timeout)))
+    usage = finish_reason = None
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield "token", chunk.choices[0].delta.content
+        if chunk.choices and chunk.choices[0].finish_reason:
+            finish_reason = chunk.choices[0].finish_reason
+        if chunk.usage:
+            usage = _usage_dict(chunk.usage)
+    yield "finish", finish_reason
+    yield "usage", usage
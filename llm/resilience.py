@@ -0,0 +1,253 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+import anthropic
+import openai
+from config import (
+    LLM_RETRY_MAX_ATTEMPTS,
+    LLM_RETRY_BASE_DELAY_SECONDS,
+    LLM_RETRY_MAX_DELAY_SECONDS,
+    LLM_CIRCUIT_FAILURE_THRESHOLD,
+    LLM_CIRCUIT_RESET_SECONDS,
+    LLM_HTTP_READ_TIMEOUT_SECONDS,
+)
+from utils.concurrency import current_rate_limiter
+
+# 재시도할 HTTP 상태 코드 (요청 시간 초과, 충돌, 속도 제한, 서버 오류, Anthropic 과부하)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# 서킷 브레이커에 실패로 기록할 상태 코드 (제공자 장애). 429·409는 재시도만 하고 서킷에는 반영하지 않음
+CIRCUIT_FAILURE_STATUS_CODES = {408, 500, 502, 503, 504, 529}
+
+# 연결 실패와 타임아웃 (두 SDK 모두 APITimeoutError가 APIConnectionError의 하위 클래스)
+CONNECTION_ERRORS = (openai.APIConnectionError, anthropic.APIConnectionError)
+
+
+class CircuitOpenError(Exception):
+    """제공자의 서킷 브레이커가 열려 있어 요청을 보내지 않고 바로 실패할 때 발생합니다."""
+    pass
+
+
+class DeadlineExceededError(Exception):
+    """요청 마감 시간이 지났거나, 다음 재시도를 기다리면 마감 시간을 넘길 때 발생합니다."""
+    pass
+
+
+# 현재 요청의 마감 시각 (time.monotonic 기준). asyncio 태스크와 asyncio.to_thread로 전파됩니다.
+_deadline = contextvars.ContextVar("llm_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    with 블록 안의 LLM 호출에 마감 시간을 적용합니다. 바깥에 더 이른 마감 시간이 있으면 그것을 유지합니다.
+    각 시도의 타임아웃은 남은 시간으로 줄어들고, 남은 시간 안에 끝낼 수 없는 재시도는 하지 않습니다.
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> float:
+    """현재 마감 시간까지 남은 초를 반환합니다. 마감 시간이 없으면 None입니다."""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+def _attempt_timeout() -> float:
+    """이번 시도에 쓸 타임아웃입니다. 마감 시간이 이미 지났으면 DeadlineExceededError를 발생시킵니다."""
+    remaining = remaining_time()
+    if remaining is None:
+        return None
+    if remaining <= 0:
+        raise DeadlineExceededError("요청 마감 시간이 지났습니다.")
+    return min(remaining, LLM_HTTP_READ_TIMEOUT_SECONDS)
+
+
+def is_retryable(error: Exception) -> bool:
+    """연결 실패·타임아웃과 일시적인 HTTP 오류(429, 5xx 등)만 재시도 대상으로 봅니다."""
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def is_circuit_failure(error: Exception) -> bool:
+    """
+    제공자 장애로 볼 오류(연결 실패·타임아웃, 5xx)인지 확인합니다.
+    속도 제한(429)은 제공자가 정상 동작 중이라는 뜻이므로 Retry-After만큼 기다려 재시도할 뿐 서킷을 열지 않습니다.
+    """
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    return getattr(error, "status_code", None) in CIRCUIT_FAILURE_STATUS_CODES
+
+
+def retry_after_seconds(error: Exception) -> float:
+    """응답의 retry-after-ms 또는 Retry-After(초 또는 HTTP 날짜) 헤더가 있으면 기다릴 초를 반환합니다."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: float = None) -> float:
+    """
+    attempt번째 재시도 전 대기 시간입니다. 지수 백오프에 전체 지터(0 ~ 상한 사이 무작위)를 적용해
+    여러 작업이 같은 시각에 몰려 다시 속도 제한에 걸리지 않도록 하고, 서버가 Retry-After를 주면 그보다 짧게 기다리지 않습니다.
+    """
+    delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY_SECONDS, LLM_RETRY_BASE_DELAY_SECONDS * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, LLM_RETRY_MAX_DELAY_SECONDS))
+    return delay
+
+
+class CircuitBreaker:
+    """
+    제공자별 서킷 브레이커입니다. (스레드 안전)
+    제공자 장애(연결 실패·타임아웃, 5xx)가 failure_threshold번 연속되면 열림 상태가 되어 reset_seconds 동안 요청을 바로 실패시키고,
+    그 뒤 한 요청만 시험 삼아 보내(반열림) 성공하면 닫고 실패하면 다시 엽니다.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = LLM_CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = LLM_CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        """지금 요청을 보낼 수 있는 상태인지 상태를 바꾸지 않고 확인합니다. (제공자 선택용)"""
+        with self._lock:
+            return self.state == "closed" or time.monotonic() - self._opened_at >= self.reset_seconds
+
+    def before_call(self, holds_probe: bool = False) -> bool:
+        """
+        요청을 보내도 되는지 확인합니다. 열려 있으면 CircuitOpenError를 발생시킵니다.
+        이번 요청이 반열림 상태의 시험 요청이면 True를 반환하며, 그 요청의 재시도는 holds_probe=True로 다시 확인해
+        (429처럼 서킷에 기록하지 않는 오류로 재시도할 때) 자기 자신이 차단되지 않게 합니다.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return False
+            if holds_probe and self.state == "half_open":
+                return True
+            now = time.monotonic()
+            waited = now - self._opened_at
+            if waited >= self.reset_seconds:
+                # 열린 뒤 reset_seconds가 지났으면(또는 시험 요청이 결과 없이 끝났으면) 한 요청만 통과
+                self.state = "half_open"
+                self._opened_at = now
+                return True
+            retry_in = max(0.0, self.reset_seconds - waited)
+            raise CircuitOpenError(f"'{self.name}' 서비스가 일시적으로 차단되었습니다. 약 {retry_in:.0f}초 후 다시 시도해주세요.")
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"'{self.name}' 서비스 오류가 계속되어 {self.reset_seconds:.0f}초 동안 요청을 차단합니다.")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(service: str) -> CircuitBreaker:
+    """서비스별 서킷 브레이커를 반환합니다. (프로세스 전역)"""
+    with _breakers_lock:
+        if service not in _breakers:
+            _breakers[service] = CircuitBreaker(service)
+        return _breakers[service]
+
+
+def _handle_failure(service: str, breaker: CircuitBreaker, error: Exception, attempt: int) -> float:
+    """실패를 기록하고 다시 시도할 대기 시간을 반환합니다. 재시도하지 않을 오류이면 그대로 다시 발생시킵니다."""
+    if not is_retryable(error):
+        # 잘못된 요청·응답 파싱 오류 등은 제공자 상태를 알려주지 않으므로 서킷에 아무것도 기록하지 않음
+        # (반열림 상태의 시험 요청이면 reset_seconds 뒤 다시 시험함)
+        raise error
+    if is_circuit_failure(error):
+        breaker.record_failure()
+    if attempt + 1 >= LLM_RETRY_MAX_ATTEMPTS or breaker.state == "open":
+        # 마지막 시도였거나 이번 실패로 서킷이 열렸으면 기다리지 않고 원래 오류를 전달
+        raise error
+
+    delay = backoff_delay(attempt, retry_after_seconds(error))
+    remaining = remaining_time()
+    if remaining is not None and remaining <= delay:
+        raise DeadlineExceededError(f"요청 마감 시간 안에 '{service}' 서비스 재시도를 마칠 수 없습니다: {error}") from error
+    print(f"'{service}' API 호출 실패 ({error.__class__.__name__}), {delay:.1f}초 후 재시도합니다. ({attempt + 1}/{LLM_RETRY_MAX_ATTEMPTS})")
+    return delay
+
+
+def call_with_retry(service: str, request):
+    """
+    request(timeout)을 서비스의 서킷 브레이커, 재시도(지수 백오프 + 지터, Retry-After), 마감 시간과 함께 호출합니다.
+    timeout은 남은 마감 시간으로 줄인 이번 시도의 타임아웃이며, 마감 시간이 없으면 None입니다.
+    utils.concurrency.rate_limited로 속도 제한기가 지정되어 있으면 시도마다 토큰을 얻습니다.
+    """
+    breaker = get_circuit_breaker(service)
+    rate_limiter = current_rate_limiter()
+    holds_probe = False
+    for attempt in range(LLM_RETRY_MAX_ATTEMPTS):
+        if rate_limiter is not None:
+            # 재시도도 실제 API 호출이므로 시도마다 토큰을 얻음
+            rate_limiter.acquire()
+        timeout = _attempt_timeout()
+        holds_probe = breaker.before_call(holds_probe)
+        try:
+            result = request(timeout)
+        except Exception as e:
+            time.sleep(_handle_failure(service, breaker, e, attempt))
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall_with_retry(service: str, request):
+    """call_with_retry의 비동기 버전입니다. request(timeout)은 코루틴을 반환해야 합니다."""
+    breaker = get_circuit_breaker(service)
+    rate_limiter = current_rate_limiter()
+    holds_probe = False
+    for attempt in range(LLM_RETRY_MAX_ATTEMPTS):
+        if rate_limiter is not None:
+            await asyncio.to_thread(rate_limiter.acquire)
+        timeout = _attempt_timeout()
+        holds_probe = breaker.before_call(holds_probe)
+        try:
+            result = await request(timeout)
+        except Exception as e:
+            await asyncio.sleep(_handle_failure(service, breaker, e, attempt))
+            continue
+        breaker.record_success()
+        return result
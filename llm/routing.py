@@ -0,0 +1,221 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from config import (
+    GENERATION_PROVIDERS,
+    LLM_ROUTING_EWMA_ALPHA,
+    LLM_ROUTING_WINDOW,
+    LLM_ROUTING_INITIAL_LATENCY_SECONDS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+)
+from llm.providers import PROVIDERS, complete, acomplete, astream, ensure_complete
+from llm.resilience import get_circuit_breaker
+
+
+class LatencyTracker:
+    """
+    한 제공자의 응답 시간을 추적합니다. (스레드 안전)
+    EWMA는 제공자 순서를 정하는 데, 최근 window개 표본의 p95는 헤지 요청을 보낼 시점을 정하는 데 씁니다.
+    """
+
+    def __init__(self, alpha: float = LLM_ROUTING_EWMA_ALPHA, window: int = LLM_ROUTING_WINDOW):
+        self.alpha = alpha
+        self.ewma = None
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+            self.samples.append(seconds)
+
+    def record_failure(self):
+        """
+        실패를 EWMA에만 벌점으로 반영해, 방금 실패한 제공자가 다음 요청에서 먼저 선택되지 않도록 합니다.
+        (p95 표본에는 넣지 않음) 이후 성공하면 EWMA가 다시 내려갑니다.
+        """
+        with self._lock:
+            penalty = max(LLM_ROUTING_INITIAL_LATENCY_SECONDS, 2 * (self.ewma or 0.0))
+            self.ewma = penalty if self.ewma is None else self.alpha * penalty + (1 - self.alpha) * self.ewma
+
+    def estimate(self) -> float:
+        """예상 응답 시간입니다. 표본이 없으면 LLM_ROUTING_INITIAL_LATENCY_SECONDS를 가정합니다."""
+        return LLM_ROUTING_INITIAL_LATENCY_SECONDS if self.ewma is None else self.ewma
+
+    def percentile(self, q: float) -> float:
+        """최근 표본의 q 백분위수입니다. 표본이 LLM_HEDGE_MIN_SAMPLES개보다 적으면 None입니다."""
+        with self._lock:
+            samples = sorted(self.samples)
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+
+class GenerationRouter:
+    """
+    원고 생성 요청을 여러 제공자 중 하나로 보냅니다.
+    API 키가 있고 서킷이 열려 있지 않은 제공자를 응답 시간 EWMA가 짧은 순서로 고르고, 실패하면 다음 제공자로 넘깁니다.
+    최대 출력 토큰 수에 걸려 잘린 응답도 실패로 보고 다음 제공자로 넘깁니다.
+    헤지를 켜면 첫 제공자가 자신의 p95 응답 시간 안에 끝나지 않을 때 다음 제공자에 같은 요청을 보내,
+    먼저 온 정상 응답을 쓰고 나머지 요청은 취소합니다.
+    """
+
+    def __init__(self, services: list = GENERATION_PROVIDERS):
+        self.services = [service for service in services if service in PROVIDERS]
+        self.trackers = {service: LatencyTracker() for service in self.services}
+
+    def rank(self) -> list:
+        """지금 사용할 수 있는 제공자를 예상 응답 시간 순서로 반환합니다. (같으면 설정 순서)"""
+        available = [
+            service for service in self.services
+            if PROVIDERS[service]["api_key"] and get_circuit_breaker(service).is_available()
+        ]
+        return sorted(available, key=lambda service: self.trackers[service].estimate())
+
+    def _candidates(self) -> list:
+        candidates = self.rank()
+        if not candidates:
+            raise ValueError(f"원고 생성에 사용할 수 있는 서비스가 없습니다. (후보: {', '.join(self.services)})")
+        return candidates
+
+    def hedge_delay(self, service: str) -> float:
+        """service에 보낸 요청을 얼마나 기다린 뒤 헤지 요청을 보낼지 반환합니다. (p95, 표본이 적으면 기본값)"""
+        p95 = self.trackers[service].percentile(95)
+        return LLM_HEDGE_DEFAULT_DELAY_SECONDS if p95 is None else p95
+
+    def complete(self, messages: list, model_for=None, options_for=None, **kwargs) -> dict:
+        """
+        동기 버전입니다. 헤지 없이 제공자 순서대로 시도하고, 성공한 결과에 "service"를 붙여 반환합니다.
+        model_for(service)는 제공자별 모델 이름(None이면 기본 모델)을, options_for(service)는 제공자별 추가 요청 인자(max_tokens 등)를 반환합니다.
+        """
+        model_for = model_for or (lambda service: None)
+        options_for = options_for or (lambda service: {})
+        last_error = None
+        for service in self._candidates():
+            started_at = time.monotonic()
+            try:
+                result = ensure_complete(
+                    service, complete(service, messages, model=model_for(service), **options_for(service), **kwargs)
+                )
+            except Exception as e:
+                print(f"'{service}' 원고 생성 실패, 다음 서비스로 넘어갑니다: {e}")
+                self.trackers[service].record_failure()
+                last_error = e
+                continue
+            self.trackers[service].record(time.monotonic() - started_at)
+            if result["content"] and result["content"].strip():
+                return {**result, "service": service}
+        if last_error is not None:
+            raise last_error
+        return {"content": "", "usage": None, "service": None}
+
+    async def _timed_acomplete(self, service: str, messages: list, model: str, kwargs: dict) -> dict:
+        started_at = time.monotonic()
+        try:
+            result = ensure_complete(service, await acomplete(service, messages, model=model, **kwargs))
+        except asyncio.CancelledError:
+            # 헤지에서 진 요청은 적어도 이만큼 걸렸다는 것만 알 수 있으므로, 현재 추정치보다 짧게는 기록하지 않음
+            # (늦게 시작해 곧 취소된 백업 요청의 짧은 경과 시간이 EWMA를 끌어내려 다음에 가장 빠른 제공자로 뽑히지 않도록)
+            tracker = self.trackers[service]
+            tracker.record(max(time.monotonic() - started_at, tracker.estimate()))
+            raise
+        except Exception:
+            self.trackers[service].record_failure()
+            raise
+        self.trackers[service].record(time.monotonic() - started_at)
+        return result
+
+    async def acomplete(self, messages: list, model_for=None, options_for=None, hedge: bool = None, **kwargs) -> dict:
+        """
+        비동기 버전입니다. 성공한 결과에 "service"를 붙여 반환하고, 모든 제공자가 실패하면 마지막 오류를 발생시킵니다.
+        hedge가 None이면 LLM_HEDGE_ENABLED 설정을 따릅니다. 헤지 요청은 한 번만 보냅니다.
+        """
+        model_for = model_for or (lambda service: None)
+        options_for = options_for or (lambda service: {})
+        hedge = LLM_HEDGE_ENABLED if hedge is None else hedge
+        queue = self._candidates()
+        pending = {}
+        last_error, last_result = None, None
+
+        def launch():
+            service = queue.pop(0)
+            task = asyncio.create_task(
+                self._timed_acomplete(service, messages, model_for(service), {**options_for(service), **kwargs})
+            )
+            pending[task] = (service, time.monotonic())
+
+        launch()
+        hedged = False
+        try:
+            while pending:
+                timeout = None
+                if hedge and not hedged and queue and len(pending) == 1:
+                    service, started_at = next(iter(pending.values()))
+                    timeout = max(0.0, self.hedge_delay(service) - (time.monotonic() - started_at))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    print(f"'{service}' 응답이 p95({self.hedge_delay(service):.1f}초)보다 늦어 '{queue[0]}'에 헤지 요청을 보냅니다.")
+                    hedged = True
+                    launch()
+                    continue
+
+                for task in done:
+                    service, _ = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        print(f"'{service}' 원고 생성 실패: {e}")
+                        last_error = e
+                        continue
+                    if result["content"] and result["content"].strip():
+                        return {**result, "service": service}
+                    last_result = {**result, "service": service}
+
+                # 진행 중인 요청이 모두 실패했으면 다음 제공자로 넘김
+                if not pending and queue:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if last_error is not None:
+            raise last_error
+        return last_result
+
+    async def astream(self, messages: list, model_for=None, options_for=None, **kwargs):
+        """
+        스트리밍 버전입니다. 이벤트 형식은 llm.providers.astream과 같습니다.
+        첫 이벤트를 받기 전에 실패하면 다음 제공자로 넘어가며, 스트리밍에는 헤지를 적용하지 않습니다.
+        (토큰을 내보낸 뒤에는 잘린 응답도 다른 제공자로 넘길 수 없으므로 "finish" 이벤트로 호출자에게 알림)
+        """
+        model_for = model_for or (lambda service: None)
+        options_for = options_for or (lambda service: {})
+        last_error = None
+        for service in self._candidates():
+            started_at = time.monotonic()
+            stream = astream(service, messages, model=model_for(service), **options_for(service), **kwargs)
+            try:
+                first_event = await stream.__anext__()
+            except Exception as e:
+                print(f"'{service}' 스트림을 열지 못해 다음 서비스로 넘어갑니다: {e}")
+                self.trackers[service].record_failure()
+                last_error = e
+                await stream.aclose()
+                continue
+
+            print(f"원고 생성 서비스: {service}")
+            yield first_event
+            async for event in stream:
+                yield event
+            self.trackers[service].record(time.monotonic() - started_at)
+            return
+        if last_error is not None:
+            raise last_error
+
+
+generation_router = GenerationRouter()
@@ -2,161 +2,155 @@ import click
 from pathlib import Path
 from tqdm import tqdm
 import time # API 과호출 방지를 위한 지연 시간 추가
-from collections import Counter # For expressions
 from mongodb_service import MongoDBService
 
 # --- 분석 함수들 (기존 click 명령어에서 일반 함수로 변경) ---
 
-def run_morpheme_analysis(directory_path):
-    from analyzer.morpheme import analyze_morphemes
+def run_corpus_loading(directory_path):
+    """디렉토리의 .txt 파일을 한 번만 읽어 모든 분석 단계가 공유할 문서 목록을 반환합니다."""
+    from analyzer.corpus import load_corpus
 
-    p = Path(directory_path)
-    txt_files = list(p.glob('*.txt'))
-    if not txt_files:
+    documents = load_corpus(directory_path)
+    if not documents:
         click.echo("분석할 .txt 파일이 디렉토리에 없습니다.")
-        return set()
+        return []
 
-    click.echo(f"총 {len(txt_files)}개의 파일을 분석합니다...")
+    loaded_documents = []
+    for document in documents:
+        if not document["content"].strip():
+            click.echo(f"-> '{document['name']}': 내용이 없어 건너뜁니다.")
+            continue
+        loaded_documents.append(document)
 
-    all_unique_words = set() # 모든 파일의 고유 단어를 저장할 set
+    click.echo(f"총 {len(loaded_documents)}개의 파일을 불러왔습니다.")
+    return loaded_documents
 
-    for file_path in tqdm(txt_files, desc="형태소 분석 중", unit="파일"):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+def run_morpheme_analysis(directory_path, documents=None, workers=None):
+    from analyzer.pipeline import analyze_documents_locally
+    from config import ANALYSIS_WORKERS, ANALYSIS_CHUNK_SIZE
 
-        if not content.strip():
-            tqdm.write(f"-> '{file_path.name}': 내용이 없어 건너뜁니다.")
-            continue
+    if documents is None:
+        documents = run_corpus_loading(directory_path)
+    if not documents:
+        return set()
+
+    click.echo(f"총 {len(documents)}개의 파일을 분석합니다...")
 
-        morphemes = analyze_morphemes(content) # 단어 리스트 반환
-        all_unique_words.update(morphemes) # set에 단어 추가 (중복 자동 제거)
+    all_unique_words = set() # 모든 파일의 고유 단어를 저장할 set
+
+    # 형태소 분석은 순수 CPU 작업이므로 여러 프로세스에서 나눠 처리한 뒤 set으로 병합
+    results = analyze_documents_locally(documents, workers=workers or ANALYSIS_WORKERS, chunk_size=ANALYSIS_CHUNK_SIZE)
+    for _, words, _ in results:
+        all_unique_words.update(words) # set에 단어 추가 (중복 자동 제거)
     return all_unique_words
 
-def run_sentence_splitting(directory_path):
-    from analyzer.sentence import split_sentences
+def run_sentence_splitting(directory_path, documents=None, workers=None):
+    from analyzer.pipeline import analyze_documents_locally
+    from config import ANALYSIS_WORKERS, ANALYSIS_CHUNK_SIZE
 
-    p = Path(directory_path)
-    txt_files = list(p.glob('*.txt'))
-    if not txt_files:
-        click.echo("분석할 .txt 파일이 디렉토리에 없습니다.")
+    if documents is None:
+        documents = run_corpus_loading(directory_path)
+    if not documents:
         return []
 
-    click.echo(f"총 {len(txt_files)}개의 파일을 분석합니다...")
+    click.echo(f"총 {len(documents)}개의 파일을 분석합니다...")
 
     all_sentences = []
-    for file_path in tqdm(txt_files, desc="문장 분리 중", unit="파일"):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        if not content.strip():
-            tqdm.write(f"-> '{file_path.name}': 내용이 없어 건너뜁니다.")
-            continue
-
-        sentence_list = split_sentences(content)
+    results = analyze_documents_locally(documents, workers=workers or ANALYSIS_WORKERS, chunk_size=ANALYSIS_CHUNK_SIZE)
+    for _, _, sentence_list in results:
         all_sentences.extend(sentence_list)
     return all_sentences
 
-def run_expression_extraction(directory_path, n):
-    from analyzer.expression import extract_expressions_with_ai
-    from config import OPENAI_API_KEY
-
-    if not OPENAI_API_KEY:
-        click.echo("오류: OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
-        return {}
-
-    p = Path(directory_path)
-    txt_files = list(p.glob('*.txt'))
-    if not txt_files:
-        click.echo("분석할 .txt 파일이 디렉토리에 없습니다.")
-        return {}
-
-    final_grouped_expressions = {}
-    total_files = len(txt_files)
-
-    click.echo(f"총 {total_files}개의 파일을 AI로 분석하여 표현을 추출합니다...")
-
-    for file_path in tqdm(txt_files, desc="표현 추출 중", unit="파일"):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        if not content.strip():
-            tqdm.write(f"-> '{file_path.name}': 내용이 없어 건너뜁니다.")
-            continue
-
-        try:
-            individual_result = extract_expressions_with_ai(content)
-            
-            if individual_result:
-                for key, values in individual_result.items():
-                    if key not in final_grouped_expressions:
-                        final_grouped_expressions[key] = []
-                    for value in values:
-                        if value not in final_grouped_expressions[key]:
-                            final_grouped_expressions[key].append(value)
-                tqdm.write(f"-> '{file_path.name}': 분석 및 병합 완료.")
-            else:
-                tqdm.write(f"-> '{file_path.name}': AI 분석에 실패했습니다.")
-            
-            time.sleep(1) # 1초 지연
+def _merge_grouped_results(final_grouped_results, individual_result):
+    """'키': [값] 형태의 AI 결과를 순서를 유지하며 중복 없이 병합합니다."""
+    for key, values in individual_result.items():
+        merged_values = final_grouped_results.setdefault(key, [])
+        seen = set(merged_values)
+        for value in values:
+            if value not in seen:
+                seen.add(value)
+                merged_values.append(value)
+
+def _iter_ai_fan_out_per_document(documents, extract_func, desc, max_workers=None):
+    """
+    문서별 AI 추출 함수를 제한된 동시성과 토큰 버킷 속도 제한으로 병렬 실행하고,
+    문서 순서대로 (문서, 결과, 오류)를 하나씩 내보냅니다.
+    문서를 동시성의 몇 배 크기 구간으로 나누어 처리하므로 결과가 메모리에 쌓이지 않고,
+    본문이 없는 문서(fingerprint_file)는 호출 직전에 파일을 읽습니다.
+    """
+    from analyzer.corpus import read_document_text
+    from config import LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_SECOND
+    from utils.concurrency import TokenBucket, run_concurrently
+
+    max_workers = max_workers or LLM_MAX_CONCURRENCY
+    window = max(1, max_workers * 4)
+    rate_limiter = TokenBucket(LLM_REQUESTS_PER_SECOND)
+    progress = tqdm(total=len(documents), desc=desc, unit="파일")
+
+    def on_done(document, individual_result, error):
+        if error:
+            tqdm.write(f"-> '{document['name']}': 처리 중 오류 발생: {error}")
+        elif individual_result:
+            tqdm.write(f"-> '{document['name']}': 분석 완료.")
+        else:
+            tqdm.write(f"-> '{document['name']}': AI 분석에 실패했습니다.")
+        progress.update(1)
 
-        except Exception as e:
-            tqdm.write(f"-> '{file_path.name}': 처리 중 오류 발생: {e}")
+    try:
+        for start in range(0, len(documents), window):
+            yield from run_concurrently(
+                lambda document: extract_func(read_document_text(document)),
+                documents[start:start + window],
+                max_workers=max_workers,
+                rate_limiter=rate_limiter,
+                on_done=on_done,
+            )
+    finally:
+        progress.close()
 
-    return final_grouped_expressions
+def _run_ai_fan_out(documents, extract_func, desc, max_workers=None):
+    """문서별 AI 추출을 병렬 실행하고, 결과를 문서 순서대로 병합하여 반환합니다."""
+    results = _iter_ai_fan_out_per_document(documents, extract_func, desc, max_workers=max_workers)
 
+    final_grouped_results = {}
+    for _, individual_result, _ in results:
+        if individual_result:
+            _merge_grouped_results(final_grouped_results, individual_result)
+    return final_grouped_results
 
-def _get_grouped_parameters_from_dir(directory_path):
-    """주어진 디렉토리의 텍스트 파일들에서 AI를 이용해 개체를 추출하고 그룹화하여 반환합니다."""
-    from analyzer.parameter import extract_and_group_entities_with_ai
+def run_expression_extraction(directory_path, n, documents=None, max_workers=None):
+    from analyzer.expression import extract_expressions_with_ai
     from config import OPENAI_API_KEY
 
     if not OPENAI_API_KEY:
-        raise ValueError("API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
-
-    p = Path(directory_path)
-    txt_files = list(p.glob('*.txt'))
-    if not txt_files:
-        click.echo("분석할 .txt 파일이 디렉토리에 없습니다.")
+        click.echo("오류: OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
         return {}
 
-    final_grouped_results = {}
-    total_files = len(txt_files)
-
-    click.echo(f"총 {total_files}개의 파일을 AI로 분석하여 파라미터를 추출합니다...")
-
-    for file_path in tqdm(txt_files, desc="파라미터 추출 중", unit="파일"):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        if not content.strip():
-            tqdm.write(f"-> '{file_path.name}': 내용이 없어 건너뜁니다.")
-            continue
-
-        try:
-            individual_result = extract_and_group_entities_with_ai(content)
-            
-            if individual_result:
-                for key, values in individual_result.items():
-                    if key not in final_grouped_results:
-                        final_grouped_results[key] = []
-                    for value in values:
-                        if value not in final_grouped_results[key]:
-                            final_grouped_results[key].append(value)
-            
-            time.sleep(1) # API 과호출 방지를 위한 약간의 지연
+    if documents is None:
+        documents = run_corpus_loading(directory_path)
+    if not documents:
+        return {}
 
-        except Exception as e:
-            tqdm.write(f"-> '{file_path.name}': 파라미터 추출 중 오류 발생: {e}")
+    click.echo(f"총 {len(documents)}개의 파일을 AI로 분석하여 표현을 추출합니다...")
 
-    return final_grouped_results
+    return _run_ai_fan_out(documents, extract_expressions_with_ai, desc="표현 추출 중", max_workers=max_workers)
 
-def run_template_generation(directory_path):
-    from analyzer.template import generate_template_from_segment
+def run_template_generation(directory_path, documents=None, use_llm_fallback=False):
+    from analyzer.matcher import ParameterMatcher
+    from analyzer.template import generate_templates_for_segments
     from analyzer.sentence import split_sentences # 문장 분리 함수 임포트
 
-    # 1. 파라미터 추출을 위한 디렉토리 경로 입력받기
+    if documents is None:
+        documents = run_corpus_loading(directory_path)
+    if not documents:
+        return []
+
+    # 1. 파라미터 추출을 위한 디렉토리 경로 입력받기 (같은 디렉토리면 이미 읽은 문서를 재사용)
     param_dir = click.prompt("파라미터를 추출할 디렉토리 경로를 입력하세요 (예: data)", type=click.Path(exists=True, file_okay=False))
-    known_parameters_map = _get_grouped_parameters_from_dir(param_dir)
+    if Path(param_dir).resolve() == Path(directory_path).resolve():
+        known_parameters_map = run_parameters_analysis(param_dir, documents=documents)
+    else:
+        known_parameters_map = run_parameters_analysis(param_dir)
 
     if not known_parameters_map:
         click.echo("추출된 파라미터가 없어 템플릿을 생성할 수 없습니다.")
@@ -167,61 +161,50 @@ def run_template_generation(directory_path):
         click.echo(f"- {key}: {values}")
     click.echo("----------------------------------------")
 
-    # 2. 템플릿을 생성할 원고 디렉토리 분석
-    p = Path(directory_path)
-    txt_files = list(p.glob('*.txt'))
-    if not txt_files:
-        click.echo("분석할 .txt 파일이 디렉토리에 없습니다.")
-        return []
+    # 2. 템플릿을 생성할 원고 분석
+    click.echo(f"총 {len(documents)}개의 파일을 분석하여 템플릿을 생성합니다...")
 
-    click.echo(f"총 {len(txt_files)}개의 파일을 분석하여 템플릿을 생성합니다...")
-
-    all_templated_texts = []
-    for file_path in tqdm(txt_files, desc="템플릿 생성 중", unit="파일"):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        if not content.strip():
-            tqdm.write(f"-> '{file_path.name}': 내용이 없어 건너뜁니다.")
-            continue
+    # 파라미터 맵의 모든 값으로 매처를 한 번만 구축
+    matcher = ParameterMatcher(known_parameters_map)
 
+    all_templated_segments = []
+    ambiguous_positions = [] # (문서 인덱스, 문장 인덱스, 원본 문장)
+    for document_index, document in enumerate(tqdm(documents, desc="템플릿 생성 중", unit="파일")):
         # 원고를 문장 단위로 분리
-        sentences = split_sentences(content)
+        sentences = split_sentences(document["content"])
         templated_segments = []
 
-        for sentence in sentences:
-            # 문장 내에 known_parameters_map의 어떤 값이라도 포함되어 있는지 확인
-            has_param_value = False
-            for key, values in known_parameters_map.items():
-                for value in values:
-                    if value in sentence:
-                        has_param_value = True
-                        break
-                if has_param_value:
-                    break
-            
-            if has_param_value:
-                # 파라미터가 포함된 문장만 AI에 요청
-                try:
-                    templated_segment = generate_template_from_segment(sentence, known_parameters_map)
-                    if templated_segment:
-                        templated_segments.append(templated_segment)
-                        time.sleep(0.5) # API 과호출 방지를 위한 약간의 지연
-                    else:
-                        templated_segments.append(sentence) # AI 실패 시 원본 유지
-                except Exception as e:
-                    tqdm.write(f"-> '{file_path.name}' 문장 '{sentence[:20]}...' 템플릿 생성 중 오류: {e}")
-                    templated_segments.append(sentence) # 오류 발생 시 원본 유지
-            else:
-                templated_segments.append(sentence) # 파라미터 없는 문장은 그대로 유지
-        
+        for sentence_index, sentence in enumerate(sentences):
+            # 값 -> [대표 키워드] 치환은 로컬에서 수행
+            templated_segment, ambiguous = matcher.template(sentence)
+            if ambiguous:
+                ambiguous_positions.append((document_index, sentence_index, sentence))
+            templated_segments.append(templated_segment)
+
+        all_templated_segments.append(templated_segments)
+
+    if use_llm_fallback and ambiguous_positions:
+        # 겹치거나 여러 키워드에 속하는 값이 있는 모호한 문장만 모아 배치로 AI에 요청
+        click.echo(f"모호한 문장 {len(ambiguous_positions)}개를 AI로 템플릿화합니다...")
+        try:
+            ai_segments = generate_templates_for_segments(
+                [sentence for _, _, sentence in ambiguous_positions], known_parameters_map
+            )
+            for (document_index, sentence_index, _), ai_segment in zip(ambiguous_positions, ai_segments):
+                if ai_segment:
+                    all_templated_segments[document_index][sentence_index] = ai_segment
+        except Exception as e:
+            click.echo(f"AI 템플릿 생성 중 오류 발생: {e}")
+
+    all_templated_texts = []
+    for document, templated_segments in zip(documents, all_templated_segments):
         final_templated_text = ' '.join(templated_segments) # 문장들을 다시 합침
-        all_templated_texts.append({"file_name": file_path.name, "templated_text": final_templated_text})
+        all_templated_texts.append({"file_name": document["name"], "templated_text": final_templated_text})
     return all_templated_texts
 
 
 
-def run_parameters_analysis(directory_path):
+def run_parameters_analysis(directory_path, documents=None, max_workers=None):
     from analyzer.parameter import extract_and_group_entities_with_ai
     from config import OPENAI_API_KEY
 
@@ -229,115 +212,25 @@ def run_parameters_analysis(directory_path):
         click.echo("오류: OpenAI API 키가 설정되지 않았습니다. .env 파일을 생성하고 OPENAI_API_KEY를 입력해주세요.")
         return {}
 
-    p = Path(directory_path)
-    txt_files = list(p.glob('*.txt'))
-    if not txt_files:
-        click.echo("분석할 .txt 파일이 디렉토리에 없습니다.")
+    if documents is None:
+        documents = run_corpus_loading(directory_path)
+    if not documents:
         return {}
 
-    final_grouped_results = {}
-    total_files = len(txt_files)
-
-    click.echo(f"총 {total_files}개의 파일을 분석합니다...")
-
-    for file_path in tqdm(txt_files, desc="파일 분석 중", unit="파일"):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        if not content.strip():
-            tqdm.write(f"-> '{file_path.name}': 내용이 없어 건너뜁니다.")
-            continue
-
-        try:
-            individual_result = extract_and_group_entities_with_ai(content)
-            
-            if individual_result:
-                for key, values in individual_result.items():
-                    if key not in final_grouped_results:
-                        final_grouped_results[key] = []
-                    for value in values:
-                        if value not in final_grouped_results[key]:
-                            final_grouped_results[key].append(value)
-                tqdm.write(f"-> '{file_path.name}': 분석 및 병합 완료.")
-            else:
-                tqdm.write(f"-> '{file_path.name}': AI 분석에 실패했습니다.")
-            
-            time.sleep(1) # 1초 지연
+    click.echo(f"총 {len(documents)}개의 파일을 분석합니다...")
 
-        except Exception as e:
-            tqdm.write(f"-> '{file_path.name}': 처리 중 오류 발생: {e}")
-
-    return final_grouped_results
+    return _run_ai_fan_out(documents, extract_and_group_entities_with_ai, desc="파일 분석 중", max_workers=max_workers)
 
-def run_build_library(directory_path):
+def run_build_library(directory_path, workers=None):
     from analyzer.library import build_sentence_library
+    from config import ANALYSIS_WORKERS
     
-    library = build_sentence_library(directory_path)
+    library = build_sentence_library(directory_path, workers=workers or ANALYSIS_WORKERS)
     return library
 
-def _get_unique_words_from_dir(directory_path):
-    from analyzer.morpheme import analyze_morphemes
-    p = Path(directory_path)
-    txt_files = list(p.glob('*.txt'))
-    if not txt_files:
-        return set()
-    all_unique_words = set()
-    for file_path in txt_files:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        if content.strip():
-            morphemes = analyze_morphemes(content)
-            all_unique_words.update(morphemes)
-    return all_unique_words
-
-def _get_sentences_from_dir(directory_path):
-    from analyzer.sentence import split_sentences
-    p = Path(directory_path)
-    txt_files = list(p.glob('*.txt'))
-    if not txt_files:
-        return []
-    all_sentences = []
-    for file_path in txt_files:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        if content.strip():
-            all_sentences.extend(split_sentences(content))
-    return all_sentences
-
-def _get_expressions_from_dir(directory_path, n):
-    from analyzer.expression import extract_expressions_with_ai
-    from config import OPENAI_API_KEY
-
-    if not OPENAI_API_KEY:
-        raise ValueError("API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
-
-    p = Path(directory_path)
-    txt_files = list(p.glob('*.txt'))
-    if not txt_files:
-        return {}
-
-    final_grouped_expressions = {}
-    for file_path in txt_files:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        if content.strip():
-            try:
-                individual_result = extract_expressions_with_ai(content)
-                if individual_result:
-                    for key, values in individual_result.items():
-                        if key not in final_grouped_expressions:
-                            final_grouped_expressions[key] = []
-                        for value in values:
-                            if value not in final_grouped_expressions[key]:
-                                final_grouped_expressions[key].append(value)
-                time.sleep(1)
-            except Exception as e:
-                print(f"표현 추출 중 오류 발생: {e}")
-    return final_grouped_expressions
-
-def run_manuscript_generation(unique_words: list, sentences: list, expressions: dict, parameters: dict, user_instructions: str = ""):
+def run_manuscript_generation(unique_words: list, sentences: list, expressions: dict, parameters: dict, user_instructions: str = "", service: str = None):
     from analyzer.manuscript_generator import generate_manuscript_with_ai
-    from config import OPENAI_API_KEY
+    from config import OPENAI_API_KEY, GENERATION_DEFAULT_SERVICE
 
     if not OPENAI_API_KEY:
         click.echo("오류: OpenAI API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
@@ -355,7 +248,8 @@ def run_manuscript_generation(unique_words: list, sentences: list, expressions:
             sentences=sentences,
             expressions=expressions,
             parameters=parameters,
-            user_instructions=user_instructions
+            user_instructions=user_instructions,
+            service=(service or GENERATION_DEFAULT_SERVICE).lower()
         )
         return generated_manuscript
 
@@ -364,66 +258,187 @@ def run_manuscript_generation(unique_words: list, sentences: list, expressions:
         return None
 
 
-def save_analysis_to_mongodb(directory_path):
+def run_document_analysis(db_service, documents, timestamp, max_workers=None, workers=None):
+    """
+    문서별로 형태소·문장·표현·파라미터 분석을 수행하고, 각 행에 출처 파일명(sources)을 붙여 MongoDB에 upsert합니다.
+    파일은 조각 단위로 스트리밍하여 처리하고, 행은 SourcedBatchWriter로 일정 개수씩 나누어 쓰므로
+    코퍼스 크기와 관계없이 메모리 사용량이 일정합니다.
+    workers는 형태소 분석·문장 분리 프로세스 수, max_workers는 AI 호출 동시성입니다.
+    반환값: ({컬렉션 이름: {"new", "existing", "failed"}}, AI 분석에 실패한 파일명 set)
+    """
+    from analyzer.expression import extract_expressions_with_ai
+    from analyzer.parameter import extract_and_group_entities_with_ai
+    from analyzer.pipeline import iter_analyze_files
+    from config import ANALYSIS_WORKERS, ANALYSIS_CHUNK_SIZE
+    from mongodb_service import SourcedBatchWriter
+
+    failed_names = set()
+    counts = {}
+
+    # 형태소 분석·문장 분리는 여러 프로세스에서 나눠 처리 (AI 단계는 스레드 풀에서 별도로 실행)
+    word_counts_buffer = []
+    with SourcedBatchWriter(db_service, "morphemes", timestamp) as word_writer, \
+            SourcedBatchWriter(db_service, "sentences", timestamp) as sentence_writer:
+        local_results = iter_analyze_files(documents, workers=workers or ANALYSIS_WORKERS, chunk_size=ANALYSIS_CHUNK_SIZE)
+        for name, word_counts, sentences in tqdm(local_results, total=len(documents), desc="형태소 분석·문장 분리 중", unit="파일"):
+            for word in word_counts:
+                word_writer.add({"word": word, "sources": [name]})
+            for sentence in sentences:
+                sentence_writer.add({"sentence": sentence, "sources": [name]})
+            # 파일별 단어 빈도는 TF-IDF 통계용으로 따로 저장
+            word_counts_buffer.append((name, word_counts))
+            if len(word_counts_buffer) >= ANALYSIS_CHUNK_SIZE:
+                db_service.save_morpheme_counts(word_counts_buffer, timestamp)
+                word_counts_buffer = []
+        db_service.save_morpheme_counts(word_counts_buffer, timestamp)
+    counts["morphemes"] = word_writer.counts
+    counts["sentences"] = sentence_writer.counts
+
+    ai_steps = (
+        ("expressions", "expression", extract_expressions_with_ai, "표현 추출 중"),
+        ("parameters", "parameter", extract_and_group_entities_with_ai, "파일 분석 중"),
+    )
+    for collection_name, field, extract_func, desc in ai_steps:
+        with SourcedBatchWriter(db_service, collection_name, timestamp) as writer:
+            for document, individual_result, error in _iter_ai_fan_out_per_document(
+                documents, extract_func, desc, max_workers=max_workers
+            ):
+                if error or not individual_result:
+                    failed_names.add(document["name"])
+                    continue
+                for category, values in individual_result.items():
+                    for value in values:
+                        writer.add({"category": category, field: value, "sources": [document["name"]]})
+        counts[collection_name] = writer.counts
+
+    return counts, failed_names
+
+def _manifest_entry(document, processed_at):
+    return {
+        "_id": document["name"],
+        "size": document["size"],
+        "mtime": document["mtime"],
+        "content_hash": document["content_hash"],
+        "processed_at": processed_at,
+    }
+
+def analyze_and_store(directory_path, full=False, workers=None, db_name=None, progress=None) -> dict:
+    """
+    디렉토리를 분석하여 결과를 MongoDB에 저장합니다. (입력을 묻지 않으며, 오류는 그대로 발생시킴)
+    MongoDB의 manifest(파일명, 크기, 수정 시각, 내용 해시)와 비교하여 새로 추가되거나 내용이 바뀐 파일만 분석하고,
+    바뀌거나 삭제된 파일에서 나온 이전 행은 철회합니다. 각 행은 키 기준으로 upsert되며 출처 파일은 출처 컬렉션에 기록됩니다.
+    full=True이면 manifest를 무시하고 모든 파일을 다시 분석합니다. workers는 형태소 분석·문장 분리 프로세스 수,
+    db_name은 저장할 DB(기본 MONGO_DB_NAME)입니다. progress(stage=..., **정보)는 단계가 바뀔 때마다 호출됩니다.
+    반환값: {"timestamp", "added", "changed", "deleted", "retracted", "analyzed", "failed", "counts", "artifact_hash"}
+    (추가·변경·삭제된 파일이 없으면 retracted가 0이고 아무것도 저장하지 않음)
+    """
+    from analyzer.context_artifact import build_category_artifact
+    from analyzer.corpus import scan_corpus_changes
+    from mongodb_service import ANALYSIS_COLLECTIONS
+
+    report = progress or (lambda **info: None)
+    db_service = MongoDBService(db_name=db_name)
+    db_service.ensure_analysis_indexes()
+    click.echo("MongoDB 연결 성공.")
+    current_time = time.time()
+
+    # 0. 이전에 처리한 파일 목록과 비교하여 분석할 파일만 고름
+    report(stage="scan")
+    manifest = db_service.get_manifest()
+    changes = scan_corpus_changes(directory_path, {} if full else manifest)
+    click.echo(
+        f"추가 {len(changes['added'])}개, 변경 {len(changes['changed'])}개, 삭제 {len(changes['deleted'])}개, "
+        f"변경 없음 {len(changes['unchanged']) + len(changes['touched'])}개"
+    )
+
+    # 수정 시각만 바뀌고 내용이 같은 파일은 다시 분석하지 않고 manifest만 갱신
+    db_service.save_manifest_entries([_manifest_entry(document, current_time) for document in changes["touched"]])
+
+    # full 모드에서는 디스크에 없는 manifest 항목도 삭제된 파일로 처리
+    documents_to_analyze = changes["added"] + changes["changed"]
+    present_names = {document["name"] for document in documents_to_analyze + changes["touched"]} | set(changes["unchanged"])
+    deleted_names = sorted(set(manifest) - present_names)
+    retracted_names = [document["name"] for document in documents_to_analyze] + deleted_names
+    summary = {
+        "timestamp": current_time,
+        "added": len(changes["added"]),
+        "changed": len(changes["changed"]),
+        "deleted": len(deleted_names),
+        "retracted": len(retracted_names),
+        "analyzed": 0,
+        "failed": [],
+        "counts": {},
+        "artifact_hash": None,
+    }
+    if not retracted_names:
+        click.echo("새로 분석할 파일이 없습니다. 기존 분석 결과를 그대로 사용합니다.")
+        return summary
+
+    # 1. 바뀌거나 삭제된 파일의 이전 분석 결과를 철회
+    report(stage="retract", files=len(retracted_names))
+    removed = db_service.retract_sources(retracted_names)
+    db_service.delete_manifest_entries(deleted_names)
+    if any(removed.values()):
+        click.echo("철회된 행: " + ", ".join(f"{name} {count}개" for name, count in removed.items()))
+
+    # 2. 새로 추가되거나 바뀐 파일만 분석하여 upsert
+    analyzable_documents = [document for document in documents_to_analyze if document["size"] > 0]
+    failed_names = set()
+    if analyzable_documents:
+        click.echo(f"총 {len(analyzable_documents)}개의 파일을 분석합니다...")
+        report(stage="analyze", files=len(analyzable_documents))
+        counts, failed_names = run_document_analysis(db_service, analyzable_documents, current_time, workers=workers)
+        for collection_name in ANALYSIS_COLLECTIONS:
+            click.echo(
+                f"{collection_name}: 새 행 {counts[collection_name]['new']}개, "
+                f"기존 행 {counts[collection_name]['existing']}개, 실패 {counts[collection_name]['failed']}개"
+            )
+        summary["counts"] = counts
+    summary["analyzed"] = len(analyzable_documents)
+    summary["failed"] = sorted(failed_names)
+
+    # AI 분석에 실패한 파일은 manifest에 남기지 않아 다음 실행 때 다시 분석
+    db_service.save_manifest_entries([
+        _manifest_entry(document, current_time)
+        for document in documents_to_analyze if document["name"] not in failed_names
+    ])
+    if failed_names:
+        click.echo(f"AI 분석에 실패한 파일 {len(failed_names)}개는 다음 실행 때 다시 분석합니다: {', '.join(sorted(failed_names))}")
+
+    # 분석 데이터가 갱신되었음을 기록 (API 서버의 스냅샷 캐시 무효화용)
+    # 현재 분석 결과는 source_count로 조회하므로 기존 행의 timestamp는 다시 쓰지 않음
+    db_service.set_analysis_version(current_time)
+
+    # 원고 생성 프롬프트의 고정 컨텍스트 아티팩트를 미리 만들어 저장 (API 서버가 요청마다 다시 직렬화하지 않도록)
+    report(stage="artifact")
+    latest_data = db_service.get_latest_analysis_data()
+    if all(latest_data.values()):
+        artifact = build_category_artifact(latest_data, db_service.iter_morpheme_counts(), version=current_time)
+        db_service.save_context_artifact(artifact)
+        summary["artifact_hash"] = artifact["content_hash"]
+        click.echo(f"컨텍스트 아티팩트 저장 완료. (약 {artifact['prefix_tokens']} 토큰, hash {artifact['content_hash'][:12]})")
+    return summary
+
+def save_analysis_to_mongodb(directory_path, full=False, workers=None):
+    """
+    디렉토리를 분석하여 결과를 MongoDB에 저장하고(analyze_and_store), 원하면 원고도 생성해 저장합니다. (CLI 대화형)
+    full=True이면 manifest를 무시하고 모든 파일을 다시 분석합니다. workers는 형태소 분석·문장 분리 프로세스 수입니다.
+    """
     try:
-        db_service = MongoDBService()
-        click.echo("MongoDB 연결 성공.")
-        current_time = time.time()
-
-        # 1. 형태소 분석 결과 저장
-        click.echo("형태소 분석 결과를 MongoDB에 저장 중...")
-        unique_words = run_morpheme_analysis(directory_path)
-        if unique_words:
-            word_documents = [{"timestamp": current_time, "word": word} for word in unique_words]
-            db_service.insert_many_documents("morphemes", word_documents)
-            click.echo(f"고유 단어 {len(unique_words)}개 저장 완료.")
-        else:
-            click.echo("저장할 고유 단어가 없습니다.")
-
-        # 2. 문장 분리 결과 저장
-        click.echo("문장 분리 결과를 MongoDB에 저장 중...")
-        sentences = run_sentence_splitting(directory_path)
-        if sentences:
-            sentence_documents = [{"timestamp": current_time, "sentence": sentence} for sentence in sentences]
-            db_service.insert_many_documents("sentences", sentence_documents)
-            click.echo(f"문장 {len(sentences)}개 저장 완료.")
-        else:
-            click.echo("저장할 문장이 없습니다.")
-
-        # 3. 표현 라이브러리 추출 결과 저장
-        click.echo("표현 라이브러리 추출 결과를 MongoDB에 저장 중...")
-        expressions = run_expression_extraction(directory_path, n=2)
-        if expressions:
-            expression_documents = []
-            for category, expr_list in expressions.items():
-                for expr in expr_list:
-                    expression_documents.append({"timestamp": current_time, "category": category, "expression": expr})
-            db_service.insert_many_documents("expressions", expression_documents)
-            click.echo(f"표현 그룹 {len(expression_documents)}개 저장 완료.")
-        else:
-            click.echo("저장할 표현이 없습니다.")
-
-        # 4. 파라미터 추출 결과 저장
-        click.echo("파라미터 추출 결과를 MongoDB에 저장 중...")
-        parameters = run_parameters_analysis(directory_path)
-        if parameters:
-            parameter_documents = []
-            for category, param_list in parameters.items():
-                for param in param_list:
-                    parameter_documents.append({"timestamp": current_time, "category": category, "parameter": param})
-            db_service.insert_many_documents("parameters", parameter_documents)
-            click.echo(f"파라미터 그룹 {len(parameter_documents)}개 저장 완료.")
-        else:
-            click.echo("저장할 파라미터가 없습니다.")
+        summary = analyze_and_store(directory_path, full=full, workers=workers)
+        if not summary["retracted"]:
+            return
 
-        # 5. 원고 생성 결과 저장 (선택 사항)
+        # 3. 원고 생성 결과 저장 (선택 사항)
         generate_manuscript = click.confirm("원고 생성 결과를 MongoDB에 저장하시겠습니까? (AI 호출 필요)", default=False)
         if generate_manuscript:
             click.echo("원고 생성 중...")
             user_instructions = click.prompt("원고 작성에 대한 추가 지시사항을 입력하세요 (예: '친근한 어조로 작성하고, 마지막에 구매 유도 문구를 넣어주세요.')", type=str, default="")
-            manuscript = run_manuscript_generation(unique_words=list(unique_words), sentences=sentences, expressions=expressions, parameters=parameters, user_instructions=user_instructions)
+            db_service = MongoDBService()
+            latest_data = db_service.get_latest_analysis_data()
+            manuscript = run_manuscript_generation(user_instructions=user_instructions, **latest_data)
             if manuscript:
-                db_service.insert_document("manuscripts", {"timestamp": current_time, "content": manuscript})
+                db_service.insert_document("manuscripts", {"timestamp": summary["timestamp"], "content": manuscript})
                 click.echo("원고 저장 완료.")
                 click.echo("\n=========================================")
                 click.echo("          ✨ 생성된 블로그 원고 ✨")
@@ -437,10 +452,10 @@ def save_analysis_to_mongodb(directory_path):
 
     except Exception as e:
         click.echo(f"MongoDB 저장 중 오류 발생: {e}")
-    finally:
-        if 'db_service' in locals() and db_service.client:
-            db_service.close_connection()
-            click.echo("MongoDB 연결 종료.")
+
+def run_analysis(directory_path="data", full=False, workers=None):
+    """CLI `analyze` 명령어의 진입점: 디렉토리를 분석하여 결과를 MongoDB에 저장합니다. (기본은 증분 분석)"""
+    save_analysis_to_mongodb(directory_path, full=full, workers=workers)
 
 # --- 메인 CLI 진입점 (대화형) ---
 @click.command()
@@ -483,7 +498,8 @@ def cli():
 
         elif choice in ('4', 'template'):
             directory = click.prompt("생성할 디렉토리 경로를 입력하세요 (예: data)", type=click.Path(exists=True, file_okay=False))
-            run_template_generation(directory)
+            use_llm_fallback = click.confirm("모호한 문장은 AI로 템플릿을 생성하시겠습니까? (AI 호출 필요)", default=False)
+            run_template_generation(directory, use_llm_fallback=use_llm_fallback)
 
         elif choice in ('5', 'parameters'):
             directory = click.prompt("분석할 디렉토리 경로를 입력하세요 (예: data)", type=click.Path(exists=True, file_okay=False))
@@ -494,7 +510,6 @@ def cli():
             run_build_library(directory)
 
         elif choice in ('7', 'manuscript'):
-            db_service = None
             try:
                 db_service = MongoDBService()
                 analysis_data = db_service.get_latest_analysis_data()
@@ -546,13 +561,11 @@ def cli():
                         click.echo("원고 생성에 실패했습니다.")
             except Exception as e:
                 click.echo(f"원고 생성 중 오류 발생: {e}")
-            finally:
-                if db_service:
-                    db_service.close_connection()
 
         elif choice in ('8', 'save-to-mongodb'):
             directory = click.prompt("MongoDB에 저장할 분석 데이터가 있는 디렉토리 경로를 입력하세요 (예: data)", type=click.Path(exists=True, file_okay=False))
-            save_analysis_to_mongodb(directory)
+            full = click.confirm("이전에 처리한 파일도 모두 다시 분석하시겠습니까? (아니오: 추가·변경된 파일만 분석)", default=False)
+            save_analysis_to_mongodb(directory, full=full)
 
         else:
             click.echo("잘못된 선택입니다. 다시 시도해주세요.")
@@ -1,12 +1,131 @@
-from pymongo import MongoClient
-from config import MONGO_URI, MONGO_DB_NAME
+import asyncio
+import atexit
+import threading
+import time
+import uuid
+from collections import Counter
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, MongoClient, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from config import (
+    MONGO_URI,
+    MONGO_DB_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_BULK_WRITE_CHUNK_SIZE,
+)
+
+ANALYSIS_COLLECTIONS = ("morphemes", "sentences", "expressions", "parameters")
+ANALYSIS_META_COLLECTION = "analysis_meta"
+CONTEXT_ARTIFACT_COLLECTION = "context_artifacts"
+MANIFEST_COLLECTION = "analysis_manifest"
+MORPHEME_COUNTS_COLLECTION = "morpheme_counts"
+KEYWORD_CATEGORY_COLLECTION = "keyword_categories"
+JOB_COLLECTION = "jobs"
+
+# 분석 컬렉션별로 한 행을 식별하는 키 필드
+ANALYSIS_KEY_FIELDS = {
+    "morphemes": ("word",),
+    "sentences": ("sentence",),
+    "expressions": ("category", "expression"),
+    "parameters": ("category", "parameter"),
+}
+
+# 분석 행이 어느 파일에서 나왔는지 기록하는 컬렉션의 접미사. ("morphemes" -> "morphemes_sources")
+# 한 문서가 (키 필드, source) 한 쌍이며, 분석 행은 출처 파일 수만 source_count로 가짐
+SOURCES_COLLECTION_SUFFIX = "_sources"
+
+# 현재 분석 결과(어느 파일에든 속한 행). source_count 인덱스로 조회
+SOURCED_ROWS_QUERY = {"source_count": {"$gt": 0}}
+
+LATEST_TIMESTAMP_QUERY = {"timestamp": {"$exists": True}}
+LATEST_TIMESTAMP_OPTIONS = {"projection": {"_id": 0, "timestamp": 1}, "sort": [("timestamp", -1)]}
+
+def _sources_collection_name(collection_name: str) -> str:
+    return collection_name + SOURCES_COLLECTION_SUFFIX
+
+def _key_of(document: dict, key_fields: tuple) -> dict:
+    return {field: document[field] for field in key_fields}
+
+def _latest_values_pipeline(live_query: dict, field: str) -> list:
+    """현재 분석 결과에서 field 값을 처음 저장된 순서대로 중복 없이 가져오는 집계 파이프라인."""
+    return [
+        {"$match": {**live_query, field: {"$exists": True}}},
+        {"$project": {field: 1}},
+        {"$group": {"_id": f"${field}", "first_id": {"$min": "$_id"}}},
+        {"$sort": {"first_id": 1}},
+    ]
+
+def _latest_grouped_pipeline(live_query: dict, field: str) -> list:
+    """현재 분석 결과에서 category별로 field 값을 중복 없이 묶는 집계 파이프라인."""
+    return [
+        {"$match": {**live_query, "category": {"$nin": [None, ""]}, field: {"$nin": [None, ""]}}},
+        {"$project": {"_id": 0, "category": 1, field: 1}},
+        {"$group": {"_id": "$category", "values": {"$addToSet": f"${field}"}}},
+        {"$sort": {"_id": 1}},
+    ]
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+_shared_async_client = None
+
+def get_mongo_client() -> MongoClient:
+    """
+    프로세스 전체에서 공유하는 MongoClient를 반환합니다. 처음 호출될 때 한 번만 생성됩니다.
+    MongoClient는 스레드 안전한 커넥션 풀이므로 요청마다 새로 만들지 않고 재사용합니다.
+    """
+    global _shared_client
+    if not MONGO_URI or not MONGO_DB_NAME:
+        raise ValueError("MongoDB URI or DB Name is not configured in .env")
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = MongoClient(MONGO_URI, **_mongo_client_options())
+            atexit.register(close_mongo_client)
+    return _shared_client
+
+def close_mongo_client():
+    """공유 MongoClient를 닫습니다. 서버 종료 시 또는 프로세스 종료 시 호출됩니다."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is not None:
+            _shared_client.close()
+            _shared_client = None
+
+def _mongo_client_options() -> dict:
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+    }
+
+def get_async_mongo_client() -> AsyncIOMotorClient:
+    """
+    API 서버의 이벤트 루프에서 사용할 공유 비동기(motor) 클라이언트를 반환합니다.
+    실행 중인 이벤트 루프 안에서 처음 호출될 때 한 번만 생성됩니다.
+    """
+    global _shared_async_client
+    if not MONGO_URI or not MONGO_DB_NAME:
+        raise ValueError("MongoDB URI or DB Name is not configured in .env")
+    if _shared_async_client is None:
+        _shared_async_client = AsyncIOMotorClient(MONGO_URI, **_mongo_client_options())
+    return _shared_async_client
+
+def close_async_mongo_client():
+    """공유 비동기 클라이언트를 닫습니다."""
+    global _shared_async_client
+    if _shared_async_client is not None:
+        _shared_async_client.close()
+        _shared_async_client = None
 
 class MongoDBService:
-    def __init__(self):
-        if not MONGO_URI or not MONGO_DB_NAME:
-            raise ValueError("MongoDB URI or DB Name is not configured in .env")
-        self.client = MongoClient(MONGO_URI)
-        self.db = self.client[MONGO_DB_NAME]
+    def __init__(self, db_name: str = None):
+        self.client = get_mongo_client()
+        self.db = self.client[db_name or MONGO_DB_NAME]
 
     def insert_document(self, collection_name: str, document: dict):
         """단일 문서를 지정된 컬렉션에 삽입합니다."""
@@ -40,63 +159,573 @@ class MongoDBService:
         return result.deleted_count
 
     def close_connection(self):
-        """MongoDB 연결을 닫습니다."""
-        self.client.close()
+        """
+        공유 커넥션 풀은 프로세스 단위로 관리되므로 여기서는 닫지 않습니다.
+        풀을 닫으려면 close_mongo_client()를 사용하세요.
+        """
+        pass
 
 
-    def get_latest_analysis_data(self):
-        """MongoDB에서 최신 분석 데이터를 가져옵니다."""
-        unique_words = []
-        sentences = []
-        expressions = {}
-        parameters = {}
-
-        # 형태소
-        morpheme_docs = self.find_documents(collection_name='morphemes')
-        if morpheme_docs:
-            unique_words = [doc["word"] for doc in morpheme_docs if "word" in doc]
-        else:
-            unique_words = []
-
-        # 문장
-        sentence_docs = self.find_documents(collection_name='sentences')
-        if sentence_docs:
-            sentences = [doc["sentence"] for doc in sentence_docs if "sentence" in doc]
-        else:
-            sentences = []
-
-        # 표현
-        expression_docs = self.find_documents(
-            collection_name='expressions',
+    def ensure_analysis_indexes(self):
+        """
+        분석 결과 컬렉션에 이전 방식(배치) 조회용 (timestamp, category) 인덱스, 현재 결과 조회용 source_count 인덱스,
+        키 필드 유니크 인덱스를 만들고, 출처 컬렉션에 (source, 키 필드) 유니크 인덱스를 만듭니다.
+        sources 배열을 쓰던 이전 행은 처음 한 번만 출처 컬렉션으로 옮깁니다.
+        """
+        self._migrate_source_arrays()
+        for collection_name in ANALYSIS_COLLECTIONS:
+            key_fields = ANALYSIS_KEY_FIELDS[collection_name]
+            self.db[collection_name].create_index([("timestamp", -1), ("category", 1)])
+            self.db[collection_name].create_index("source_count")
+            self._ensure_unique_key_index(collection_name)
+            self.db[_sources_collection_name(collection_name)].create_index(
+                [("source", 1)] + [(field, 1) for field in key_fields], unique=True
+            )
+
+    def _ensure_unique_key_index(self, collection_name: str):
+        """
+        파일에 속한(source_count가 있는) 행에 키 필드 기준 유니크 인덱스를 만들어 같은 내용이 중복 저장되지 않도록 합니다.
+        파일 단위로 관리하지 않는 이전 방식의 행에는 중복이 남아 있을 수 있으므로 부분 인덱스로 제외합니다.
+        """
+        key_fields = ANALYSIS_KEY_FIELDS[collection_name]
+        try:
+            self.db[collection_name].create_index(
+                [(field, 1) for field in key_fields],
+                name="_".join(key_fields) + "_sourced_unique",
+                unique=True,
+                partialFilterExpression={"source_count": {"$exists": True}},
+            )
+        except OperationFailure as e:
+            print(f"'{collection_name}' 유니크 인덱스 생성 실패 (중복 행 정리 필요): {e}")
+
+    def _migrate_source_arrays(self):
+        """
+        행마다 sources 배열(파일명 목록)을 갖던 이전 형식을 출처 컬렉션 + source_count로 옮깁니다.
+        파일 수만큼 커지는 배열 때문에 upsert가 점점 느려지던 문제를 없애기 위한 것으로, DB마다 한 번만 실행됩니다.
+        """
+        meta = self.db[ANALYSIS_META_COLLECTION]
+        if meta.find_one({"_id": "source_counts_migrated"}) is not None:
+            return
+        for collection_name in ANALYSIS_COLLECTIONS:
+            key_fields = ANALYSIS_KEY_FIELDS[collection_name]
+            collection = self.db[collection_name]
+            sources_collection = self.db[_sources_collection_name(collection_name)]
+            cursor = collection.find(
+                {"sources": {"$exists": True}, "source_count": {"$exists": False}},
+                {**{field: 1 for field in key_fields}, "sources": 1},
+            )
+            memberships, row_updates = [], []
+            for document in cursor:
+                if not document["sources"]:
+                    # 어느 파일에도 속하지 않는 행은 철회가 끝나지 않은 행이므로 삭제
+                    row_updates.append(DeleteOne({"_id": document["_id"]}))
+                    continue
+                key = _key_of(document, key_fields)
+                memberships.extend(
+                    UpdateOne({**key, "source": source}, {"$setOnInsert": {**key, "source": source}}, upsert=True)
+                    for source in set(document["sources"])
+                )
+                row_updates.append(UpdateOne(
+                    {"_id": document["_id"]},
+                    {"$set": {"source_count": len(set(document["sources"]))}, "$unset": {"sources": ""}},
+                ))
+                if len(row_updates) >= MONGO_BULK_WRITE_CHUNK_SIZE:
+                    if memberships:
+                        sources_collection.bulk_write(memberships, ordered=False)
+                    collection.bulk_write(row_updates, ordered=False)
+                    memberships, row_updates = [], []
+            if memberships:
+                sources_collection.bulk_write(memberships, ordered=False)
+            if row_updates:
+                collection.bulk_write(row_updates, ordered=False)
+            # sources 배열용 이전 인덱스 정리
+            for index_name in ("sources_1", "_".join(key_fields) + "_unique"):
+                try:
+                    collection.drop_index(index_name)
+                except OperationFailure:
+                    pass
+        meta.update_one({"_id": "source_counts_migrated"}, {"$set": {"timestamp": time.time()}}, upsert=True)
+
+    def get_manifest(self) -> dict:
+        """이전 분석에서 처리한 파일 목록을 {파일명: {"size", "mtime", "content_hash", ...}} 형태로 반환합니다."""
+        return {doc["_id"]: doc for doc in self.db[MANIFEST_COLLECTION].find()}
+
+    def save_manifest_entries(self, entries: list):
+        """처리한 파일들의 manifest 항목을 파일명(_id) 기준으로 저장합니다."""
+        if not entries:
+            return
+        self.db[MANIFEST_COLLECTION].bulk_write(
+            [ReplaceOne({"_id": entry["_id"]}, entry, upsert=True) for entry in entries], ordered=False
         )
-        for doc in expression_docs:
-            category = doc.get("category")
-            expression = doc.get("expression")
-            if category and expression:
-                expressions.setdefault(category, [])
-                if expression not in expressions[category]:
-                    expressions[category].append(expression)
-
-        # 파라미터
-        parameter_docs = self.find_documents(
-            collection_name='parameters',
+
+    def delete_manifest_entries(self, names: list):
+        """manifest에서 파일 항목들을 제거합니다."""
+        if names:
+            self.db[MANIFEST_COLLECTION].delete_many({"_id": {"$in": list(names)}})
+
+    def retract_sources(self, names: list) -> dict:
+        """
+        주어진 파일들의 출처 기록을 지우고 해당 행의 source_count를 줄인 뒤, 더 이상 어느 파일에도 속하지 않는 행은 삭제합니다.
+        변경되거나 삭제된 파일의 이전 분석 결과를 되돌릴 때 사용하며, 컬렉션별 삭제된 행 수를 반환합니다.
+        출처 컬렉션의 source 인덱스로 해당 파일의 행만 찾으므로 코퍼스 전체를 훑지 않습니다.
+        """
+        removed = {}
+        if not names:
+            return removed
+        names = list(names)
+        for collection_name in ANALYSIS_COLLECTIONS:
+            key_fields = ANALYSIS_KEY_FIELDS[collection_name]
+            collection = self.db[collection_name]
+            sources_collection = self.db[_sources_collection_name(collection_name)]
+            pipeline = [
+                {"$match": {"source": {"$in": names}}},
+                {"$group": {"_id": {field: f"${field}" for field in key_fields}, "count": {"$sum": 1}}},
+            ]
+            removed[collection_name] = 0
+            batch = []
+            for doc in sources_collection.aggregate(pipeline, allowDiskUse=True):
+                batch.append((doc["_id"], doc["count"]))
+                if len(batch) >= MONGO_BULK_WRITE_CHUNK_SIZE:
+                    removed[collection_name] += self._decrement_source_counts(collection, batch)
+                    batch = []
+            if batch:
+                removed[collection_name] += self._decrement_source_counts(collection, batch)
+            sources_collection.delete_many({"source": {"$in": names}})
+        self.db[MORPHEME_COUNTS_COLLECTION].delete_many({"_id": {"$in": names}})
+        return removed
+
+    def _decrement_source_counts(self, collection, batch: list) -> int:
+        """(키, 뺄 출처 수) 목록만큼 행의 source_count를 줄이고, 0이 된 행을 삭제한 뒤 삭제한 행 수를 반환합니다."""
+        collection.bulk_write(
+            [UpdateOne({**key, "source_count": {"$exists": True}}, {"$inc": {"source_count": -count}}) for key, count in batch],
+            ordered=False,
         )
-        for doc in parameter_docs:
-            category = doc.get("category")
-            parameter = doc.get("parameter")
-            if category and parameter:
-                parameters.setdefault(category, [])
-                if parameter not in parameters[category]:
-                    parameters[category].append(parameter)
+        return collection.delete_many(
+            {"$or": [key for key, _ in batch], "source_count": {"$lte": 0}}
+        ).deleted_count
+
+    def save_morpheme_counts(self, entries: list, timestamp: float):
+        """
+        파일별 단어 빈도를 저장합니다. entries는 (파일명, {단어: 빈도}) 리스트이며,
+        파일당 문서 하나에 words/counts 배열을 나란히 담습니다.
+        """
+        if not entries:
+            return
+        operations = [
+            ReplaceOne(
+                {"_id": name},
+                {"_id": name, "words": list(word_counts), "counts": list(word_counts.values()), "timestamp": timestamp},
+                upsert=True,
+            )
+            for name, word_counts in entries
+        ]
+        self.db[MORPHEME_COUNTS_COLLECTION].bulk_write(operations, ordered=False)
 
+    def iter_morpheme_counts(self):
+        """저장된 파일별 단어 빈도를 (파일명, {단어: 빈도}) 형태로 하나씩 반환합니다."""
+        for doc in self.db[MORPHEME_COUNTS_COLLECTION].find().sort("_id", 1):
+            yield doc["_id"], dict(zip(doc["words"], doc["counts"]))
+
+    def upsert_sourced_documents(self, collection_name: str, documents: list, timestamp: float, chunk_size: int = None) -> dict:
+        """
+        documents의 각 항목(키 필드와 sources 파일명 리스트)에 대해 (키, 파일명) 출처 기록을 추가하고,
+        새로 추가된 출처 수만큼 키 필드(ANALYSIS_KEY_FIELDS)가 같은 행의 source_count를 늘립니다. (행이 없으면 새로 만듦)
+        행에는 파일명 목록을 담지 않으므로 많은 파일에 나오는 단어라도 upsert 비용이 일정합니다.
+        chunk_size개씩 순서 없는(unordered) bulk_write로 보내며, {"new", "existing", "failed"} 행 수를 반환합니다.
+        """
+        counts = {"new": 0, "existing": 0, "failed": 0}
+        if not documents:
+            return counts
+        key_fields = ANALYSIS_KEY_FIELDS[collection_name]
+        memberships = [
+            (_key_of(document, key_fields), source)
+            for document in documents for source in document["sources"]
+        ]
+        chunk_size = chunk_size or MONGO_BULK_WRITE_CHUNK_SIZE
+        collection = self.db[collection_name]
+        sources_collection = self.db[_sources_collection_name(collection_name)]
+        for start in range(0, len(memberships), chunk_size):
+            chunk = memberships[start:start + chunk_size]
+            try:
+                result = sources_collection.bulk_write(
+                    [UpdateOne({**key, "source": source}, {"$setOnInsert": {**key, "source": source}}, upsert=True)
+                     for key, source in chunk],
+                    ordered=False,
+                ).bulk_api_result
+            except BulkWriteError as e:
+                result = e.details
+                counts["failed"] += len(result.get("writeErrors", []))
+
+            # 이미 기록된 출처(같은 파일 안의 중복 등)는 세지 않음
+            added = Counter()
+            for upserted in result.get("upserted", []):
+                key, _ = chunk[upserted["index"]]
+                added[tuple(key[field] for field in key_fields)] += 1
+            if not added:
+                continue
+            operations = [
+                UpdateOne(
+                    {**dict(zip(key_fields, key_values)), "source_count": {"$exists": True}},
+                    {"$inc": {"source_count": count}, "$set": {"timestamp": timestamp}},
+                    upsert=True,
+                )
+                for key_values, count in added.items()
+            ]
+            try:
+                result = collection.bulk_write(operations, ordered=False).bulk_api_result
+            except BulkWriteError as e:
+                # 순서 없는 쓰기이므로 실패한 연산을 제외한 나머지는 반영됨
+                result = e.details
+                counts["failed"] += len(result.get("writeErrors", []))
+            counts["new"] += result.get("nUpserted", 0)
+            counts["existing"] += result.get("nMatched", 0)
+        return counts
+
+    def _get_latest_timestamp(self, collection_name: str):
+        """컬렉션에서 가장 최근 분석 배치의 timestamp를 반환합니다."""
+        doc = self.db[collection_name].find_one(LATEST_TIMESTAMP_QUERY, **LATEST_TIMESTAMP_OPTIONS)
+        return doc["timestamp"] if doc else None
+
+    def _live_query(self, collection_name: str):
+        """
+        현재 분석 결과를 고르는 조건입니다. 파일 단위로 관리하는 행(source_count > 0)이 있으면 그 행 전체,
+        없으면(증분 분석 이전의 DB) 가장 최근 배치입니다. 분석 결과가 없으면 None입니다.
+        """
+        if self.db[collection_name].find_one(SOURCED_ROWS_QUERY, {"_id": 1}) is not None:
+            return SOURCED_ROWS_QUERY
+        latest_timestamp = self._get_latest_timestamp(collection_name)
+        return None if latest_timestamp is None else {"timestamp": latest_timestamp}
+
+    def _aggregate_latest_values(self, collection_name: str, field: str) -> list:
+        """현재 분석 결과에서 field 값을 처음 저장된 순서대로 중복 없이 가져옵니다."""
+        live_query = self._live_query(collection_name)
+        if live_query is None:
+            return []
+        pipeline = _latest_values_pipeline(live_query, field)
+        return [doc["_id"] for doc in self.db[collection_name].aggregate(pipeline, allowDiskUse=True)]
+
+    def _aggregate_latest_grouped(self, collection_name: str, field: str) -> dict:
+        """현재 분석 결과에서 category별로 field 값을 중복 없이 묶어 {category: [값]} 형태로 가져옵니다."""
+        live_query = self._live_query(collection_name)
+        if live_query is None:
+            return {}
+        pipeline = _latest_grouped_pipeline(live_query, field)
         return {
-            "unique_words": unique_words,
-            "sentences": sentences,
-            "expressions": expressions,
-            "parameters": parameters
+            doc["_id"]: sorted(doc["values"])
+            for doc in self.db[collection_name].aggregate(pipeline, allowDiskUse=True)
+        }
+
+    def set_analysis_version(self, timestamp: float):
+        """분석 결과가 갱신되었음을 알리는 버전 문서를 기록합니다."""
+        self.db[ANALYSIS_META_COLLECTION].update_one(
+            {"_id": "version"}, {"$set": {"timestamp": timestamp}}, upsert=True
+        )
+
+    def get_analysis_version(self):
+        """마지막 분석 저장 시각(버전)을 반환합니다. 기록이 없으면 None을 반환합니다."""
+        doc = self.db[ANALYSIS_META_COLLECTION].find_one({"_id": "version"})
+        return doc.get("timestamp") if doc else None
+
+    def save_context_artifact(self, artifact: dict):
+        """미리 만들어 둔 원고 생성 프롬프트 컨텍스트 아티팩트를 저장합니다. (카테고리당 최신 1개)"""
+        self.db[CONTEXT_ARTIFACT_COLLECTION].replace_one({"_id": "latest"}, artifact, upsert=True)
+
+    def get_context_artifact(self):
+        """저장된 컨텍스트 아티팩트를 반환합니다. 없으면 None을 반환합니다."""
+        return self.db[CONTEXT_ARTIFACT_COLLECTION].find_one({"_id": "latest"})
+
+    def get_latest_analysis_data(self):
+        """MongoDB에서 가장 최근 분석 배치의 데이터를 서버 측 집계로 가져옵니다."""
+        return {
+            "unique_words": self._aggregate_latest_values("morphemes", "word"),
+            "sentences": self._aggregate_latest_values("sentences", "sentence"),
+            "expressions": self._aggregate_latest_grouped("expressions", "expression"),
+            "parameters": self._aggregate_latest_grouped("parameters", "parameter"),
         }
+
     def set_db_name(self, db_name: str):
         """MongoDB의 데이터베이스 이름을 변경합니다."""
         if not db_name:
             raise ValueError("새 DB 이름은 비어 있을 수 없습니다.")
-        self.db = self.client[db_name]
\ No newline at end of file
+        self.db = self.client[db_name]
+
+
+class SourcedBatchWriter:
+    """
+    분석 행을 하나씩 받아 batch_size개가 모일 때마다 upsert_sourced_documents로 보내는 쓰기 버퍼입니다.
+    메모리에는 최대 batch_size개의 행만 유지하므로, 코퍼스 크기와 관계없이 사용량이 일정합니다.
+    with 블록을 벗어나면 남은 행을 보냅니다.
+    """
+
+    def __init__(self, db_service: "MongoDBService", collection_name: str, timestamp: float, batch_size: int = None):
+        self.db_service = db_service
+        self.collection_name = collection_name
+        self.timestamp = timestamp
+        self.batch_size = batch_size or MONGO_BULK_WRITE_CHUNK_SIZE
+        self.counts = {"new": 0, "existing": 0, "failed": 0}
+        self._buffer = []
+
+    def add(self, document: dict):
+        self._buffer.append(document)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        counts = self.db_service.upsert_sourced_documents(
+            self.collection_name, self._buffer, self.timestamp, chunk_size=self.batch_size
+        )
+        for key, count in counts.items():
+            self.counts[key] += count
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+        return False
+
+
+class AsyncMongoDBService:
+    """API 서버용 비동기 MongoDB 서비스입니다. 공유 motor 클라이언트에서 DB 핸들을 얻습니다."""
+
+    def __init__(self, db_name: str = None):
+        self.client = get_async_mongo_client()
+        self.db = self.client[db_name or MONGO_DB_NAME]
+
+    async def insert_document(self, collection_name: str, document: dict):
+        """단일 문서를 지정된 컬렉션에 삽입합니다."""
+        result = await self.db[collection_name].insert_one(document)
+        return result.inserted_id
+
+    async def insert_many_documents(self, collection_name: str, documents: list, ordered: bool = True):
+        """
+        여러 문서를 지정된 컬렉션에 한 번에 삽입합니다.
+        ordered=False이면 실패한 문서가 있어도 나머지를 계속 삽입하고, 실패한 문서는 BulkWriteError에 담깁니다.
+        """
+        if not documents:
+            return []
+        result = await self.db[collection_name].insert_many(documents, ordered=ordered)
+        return result.inserted_ids
+
+    async def get_analysis_version(self):
+        """마지막 분석 저장 시각(버전)을 반환합니다. 기록이 없으면 None을 반환합니다."""
+        doc = await self.db[ANALYSIS_META_COLLECTION].find_one({"_id": "version"})
+        return doc.get("timestamp") if doc else None
+
+    async def get_context_artifact(self):
+        """저장된 컨텍스트 아티팩트를 반환합니다. 없으면 None을 반환합니다."""
+        return await self.db[CONTEXT_ARTIFACT_COLLECTION].find_one({"_id": "latest"})
+
+    async def get_vocabulary(self) -> list:
+        """최신 분석 배치의 고유 단어 목록을 반환합니다. (키워드 카테고리 분류기용)"""
+        return await self._aggregate_latest_values("morphemes", "word")
+
+    async def get_keyword_category(self, keyword: str):
+        """이전에 분류한 키워드의 카테고리 문서를 반환합니다. 없으면 None을 반환합니다."""
+        return await self.db[KEYWORD_CATEGORY_COLLECTION].find_one({"_id": keyword})
+
+    async def save_keyword_category(self, keyword: str, category: str, source: str, confidence: float = None):
+        """키워드 분류 결과를 저장합니다. source는 분류한 방법(classifier, llm)입니다."""
+        await self.db[KEYWORD_CATEGORY_COLLECTION].replace_one(
+            {"_id": keyword},
+            {"_id": keyword, "category": category, "source": source, "confidence": confidence, "timestamp": time.time()},
+            upsert=True,
+        )
+
+    async def _get_latest_timestamp(self, collection_name: str):
+        doc = await self.db[collection_name].find_one(LATEST_TIMESTAMP_QUERY, **LATEST_TIMESTAMP_OPTIONS)
+        return doc["timestamp"] if doc else None
+
+    async def _live_query(self, collection_name: str):
+        if await self.db[collection_name].find_one(SOURCED_ROWS_QUERY, {"_id": 1}) is not None:
+            return SOURCED_ROWS_QUERY
+        latest_timestamp = await self._get_latest_timestamp(collection_name)
+        return None if latest_timestamp is None else {"timestamp": latest_timestamp}
+
+    async def _aggregate_latest_values(self, collection_name: str, field: str) -> list:
+        live_query = await self._live_query(collection_name)
+        if live_query is None:
+            return []
+        pipeline = _latest_values_pipeline(live_query, field)
+        return [doc["_id"] async for doc in self.db[collection_name].aggregate(pipeline, allowDiskUse=True)]
+
+    async def _aggregate_latest_grouped(self, collection_name: str, field: str) -> dict:
+        live_query = await self._live_query(collection_name)
+        if live_query is None:
+            return {}
+        pipeline = _latest_grouped_pipeline(live_query, field)
+        return {
+            doc["_id"]: sorted(doc["values"])
+            async for doc in self.db[collection_name].aggregate(pipeline, allowDiskUse=True)
+        }
+
+    async def get_morpheme_counts(self) -> list:
+        """MongoDBService.iter_morpheme_counts의 비동기 버전입니다. (파일명, {단어: 빈도}) 리스트를 파일명 순서로 반환합니다."""
+        return [
+            (doc["_id"], dict(zip(doc["words"], doc["counts"])))
+            async for doc in self.db[MORPHEME_COUNTS_COLLECTION].find().sort("_id", 1)
+        ]
+
+    async def get_latest_analysis_data(self):
+        """MongoDBService.get_latest_analysis_data의 비동기 버전입니다. 네 컬렉션을 동시에 조회합니다."""
+        unique_words, sentences, expressions, parameters = await asyncio.gather(
+            self._aggregate_latest_values("morphemes", "word"),
+            self._aggregate_latest_values("sentences", "sentence"),
+            self._aggregate_latest_grouped("expressions", "expression"),
+            self._aggregate_latest_grouped("parameters", "parameter"),
+        )
+        return {
+            "unique_words": unique_words,
+            "sentences": sentences,
+            "expressions": expressions,
+            "parameters": parameters,
+        }
+
+    async def upsert_document(self, collection_name: str, query: dict, document: dict) -> dict:
+        """query에 맞는 문서를 document로 교체하거나 새로 삽입하고, 저장된 문서를 반환합니다."""
+        return await self.db[collection_name].find_one_and_replace(
+            query, document, upsert=True, return_document=ReturnDocument.AFTER
+        )
+
+    # --- 작업 큐 (job_worker) ---
+
+    async def ensure_job_indexes(self):
+        """작업을 꺼낼 때 쓰는 (status, priority, created_at) 인덱스와 만료된 작업 조회용 인덱스를 생성합니다."""
+        await self.db[JOB_COLLECTION].create_index([("status", 1), ("priority", -1), ("created_at", 1)])
+        await self.db[JOB_COLLECTION].create_index([("status", 1), ("lease_expires_at", 1)])
+
+    async def enqueue_job(self, kind: str, payload: dict, concurrency_key: str, priority: int = 0) -> str:
+        """
+        작업을 queued 상태로 추가하고 작업 ID를 반환합니다.
+        priority가 클수록 먼저 처리되며, 같은 concurrency_key의 작업은 동시에 실행되는 수가 제한됩니다.
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        await self.db[JOB_COLLECTION].insert_one({
+            "_id": job_id,
+            "kind": kind,
+            "payload": payload,
+            "concurrency_key": concurrency_key,
+            "priority": priority,
+            "status": "queued",
+            "attempts": 0,
+            "progress": {},
+            "result": None,
+            "error": None,
+            "worker_id": None,
+            "lease_expires_at": None,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+        })
+        return job_id
+
+    async def get_job(self, job_id: str):
+        """작업 문서를 반환합니다. 없으면 None을 반환합니다."""
+        return await self.db[JOB_COLLECTION].find_one({"_id": job_id})
+
+    async def fail_abandoned_jobs(self, max_attempts: int) -> int:
+        """
+        작업자가 중단되어 임대(lease)가 만료된 실행 중 작업 가운데 max_attempts번 시도한 작업을 실패로 처리합니다.
+        (같은 작업이 작업자를 계속 죽이는 경우 무한히 다시 시도하지 않도록)
+        """
+        now = time.time()
+        result = await self.db[JOB_COLLECTION].update_many(
+            {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": max_attempts}},
+            {"$set": {
+                "status": "failed",
+                "error": f"작업자가 중단되어 {max_attempts}번 시도 후 실패 처리되었습니다.",
+                "finished_at": now,
+                "updated_at": now,
+            }},
+        )
+        return result.modified_count
+
+    async def running_job_counts(self) -> dict:
+        """임대가 유효한 실행 중 작업 수를 {concurrency_key: 개수}로 반환합니다."""
+        pipeline = [
+            {"$match": {"status": "running", "lease_expires_at": {"$gte": time.time()}}},
+            {"$group": {"_id": "$concurrency_key", "count": {"$sum": 1}}},
+        ]
+        return {doc["_id"]: doc["count"] async for doc in self.db[JOB_COLLECTION].aggregate(pipeline)}
+
+    async def claim_job(self, worker_id: str, lease_seconds: float, excluded_keys=()):
+        """
+        우선순위가 가장 높고 오래된 작업 하나를 원자적으로 running 상태로 바꾸어 반환합니다. 없으면 None입니다.
+        queued 작업뿐 아니라 임대가 만료된 running 작업(작업자가 중단된 작업)도 다시 가져와 이어서 실행합니다.
+        excluded_keys의 concurrency_key를 가진 작업은 건너뜁니다.
+        """
+        now = time.time()
+        query = {"$or": [{"status": "queued"}, {"status": "running", "lease_expires_at": {"$lt": now}}]}
+        if excluded_keys:
+            query["concurrency_key"] = {"$nin": list(excluded_keys)}
+        return await self.db[JOB_COLLECTION].find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": "running",
+                    "worker_id": worker_id,
+                    "lease_expires_at": now + lease_seconds,
+                    "started_at": now,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", -1), ("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def release_job(self, job_id: str, worker_id: str):
+        """가져온 작업을 실행하지 않고(또는 작업자 종료로) queued 상태로 되돌립니다. 시도 횟수도 되돌립니다."""
+        await self.db[JOB_COLLECTION].update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": "running"},
+            {
+                "$set": {"status": "queued", "worker_id": None, "lease_expires_at": None, "updated_at": time.time()},
+                "$inc": {"attempts": -1},
+            },
+        )
+
+    async def assign_job_category(self, job_id: str, worker_id: str, category: str, concurrency_key: str) -> bool:
+        """작업자가 분류한 카테고리와 그에 맞는 concurrency_key를 실행 중인 작업에 기록합니다. 임대를 잃었으면 False를 반환합니다."""
+        result = await self.db[JOB_COLLECTION].update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": {"payload.category": category, "concurrency_key": concurrency_key, "updated_at": time.time()}},
+        )
+        return result.matched_count == 1
+
+    async def heartbeat_job(self, job_id: str, worker_id: str, lease_seconds: float, progress: dict = None) -> bool:
+        """
+        실행 중인 작업의 임대를 연장하고 진행 상황을 기록합니다.
+        다른 작업자가 작업을 가져갔으면(임대를 잃었으면) False를 반환합니다.
+        """
+        now = time.time()
+        values = {"lease_expires_at": now + lease_seconds, "updated_at": now}
+        if progress is not None:
+            values["progress"] = progress
+        result = await self.db[JOB_COLLECTION].update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": "running"}, {"$set": values}
+        )
+        return result.matched_count == 1
+
+    async def finish_job(self, job_id: str, worker_id: str, status: str, progress: dict = None,
+                         result=None, error: str = None) -> bool:
+        """작업을 succeeded 또는 failed 상태로 끝내고 결과나 오류를 기록합니다. 임대를 잃었으면 False를 반환합니다."""
+        now = time.time()
+        values = {
+            "status": status,
+            "result": result,
+            "error": error,
+            "lease_expires_at": None,
+            "finished_at": now,
+            "updated_at": now,
+        }
+        if progress is not None:
+            values["progress"] = progress
+        update = await self.db[JOB_COLLECTION].update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": "running"}, {"$set": values}
+        )
+        return update.matched_count == 1
@@ -0,0 +1,196 @@
+"""
+테스트용 인메모리 MongoDB 대역입니다. MongoDBService가 분석 행을 upsert·철회할 때 쓰는 연산만 구현합니다.
+(mongomock은 현재 pymongo의 bulk_write 연산 형식을 받지 못해 사용하지 않음)
+"""
+import copy
+import itertools
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+_ids = itertools.count(1)
+
+
+def _matches_condition(value, condition) -> bool:
+    if not isinstance(condition, dict) or not any(key.startswith("$") for key in condition):
+        return value == condition
+    for operator, operand in condition.items():
+        if operator == "$exists":
+            if (value is not _MISSING) != operand:
+                return False
+        elif operator == "$in":
+            if value not in operand:
+                return False
+        elif operator == "$nin":
+            if value is not _MISSING and value in operand or value is _MISSING and None in operand:
+                return False
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            if value is _MISSING or value is None:
+                return False
+            compare = {"$gt": value > operand, "$gte": value >= operand, "$lt": value < operand, "$lte": value <= operand}
+            if not compare[operator]:
+                return False
+        else:
+            raise NotImplementedError(operator)
+    return True
+
+
+_MISSING = object()
+
+
+def matches(document: dict, query: dict) -> bool:
+    for field, condition in (query or {}).items():
+        if field == "$or":
+            if not any(matches(document, sub_query) for sub_query in condition):
+                return False
+        elif not _matches_condition(document.get(field, _MISSING), condition):
+            return False
+    return True
+
+
+def _apply_update(document: dict, update: dict, inserting: bool):
+    for operator, values in update.items():
+        if operator == "$set" or (operator == "$setOnInsert" and inserting):
+            document.update(copy.deepcopy(values))
+        elif operator == "$inc":
+            for field, amount in values.items():
+                document[field] = document.get(field, 0) + amount
+        elif operator != "$setOnInsert":
+            raise NotImplementedError(operator)
+
+
+class _Result:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+class _Cursor(list):
+    def sort(self, key, direction=1):
+        return _Cursor(sorted(self, key=lambda document: document[key], reverse=direction == -1))
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    def _find(self, query):
+        return [document for document in self.documents if matches(document, query)]
+
+    def find(self, query=None, projection=None):
+        return _Cursor(copy.deepcopy(self._find(query)))
+
+    def find_one(self, query=None, projection=None, sort=None):
+        found = self.find(query)
+        for key, direction in reversed(sort or []):
+            found = found.sort(key, direction)
+        return found[0] if found else None
+
+    def insert_one(self, document):
+        document.setdefault("_id", next(_ids))
+        self.documents.append(copy.deepcopy(document))
+        return _Result(inserted_id=document["_id"])
+
+    def delete_many(self, query):
+        kept = [document for document in self.documents if not matches(document, query)]
+        deleted = len(self.documents) - len(kept)
+        self.documents = kept
+        return _Result(deleted_count=deleted)
+
+    def update_one(self, query, update, upsert=False):
+        found = self._find(query)
+        if found:
+            _apply_update(found[0], update, inserting=False)
+            return _Result(matched_count=1, upserted_id=None)
+        if not upsert:
+            return _Result(matched_count=0, upserted_id=None)
+        document = {field: value for field, value in query.items() if not field.startswith("$") and not isinstance(value, dict)}
+        _apply_update(document, update, inserting=True)
+        return _Result(matched_count=0, upserted_id=self.insert_one(document).inserted_id)
+
+    def bulk_write(self, operations, ordered=True):
+        result = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0, "upserted": [], "writeErrors": []}
+        for index, operation in enumerate(operations):
+            if isinstance(operation, UpdateOne):
+                update = self.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+                if update.upserted_id is not None:
+                    result["nUpserted"] += 1
+                    result["upserted"].append({"index": index, "_id": update.upserted_id})
+                else:
+                    result["nMatched"] += update.matched_count
+                    result["nModified"] += update.matched_count
+            elif isinstance(operation, ReplaceOne):
+                found = self._find(operation._filter)
+                if found:
+                    found[0].clear()
+                    found[0].update(copy.deepcopy(operation._doc))
+                    result["nMatched"] += 1
+                elif operation._upsert:
+                    self.insert_one(copy.deepcopy(operation._doc))
+                    result["nUpserted"] += 1
+            elif isinstance(operation, DeleteOne):
+                found = self._find(operation._filter)
+                if found:
+                    self.documents.remove(found[0])
+                    result["nRemoved"] += 1
+            else:
+                raise NotImplementedError(type(operation).__name__)
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return _Result(bulk_api_result=result)
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        documents = copy.deepcopy(self.documents)
+        for stage in pipeline:
+            (operator, spec), = stage.items()
+            if operator == "$match":
+                documents = [document for document in documents if matches(document, spec)]
+            elif operator == "$project":
+                continue
+            elif operator == "$group":
+                documents = self._group(documents, spec)
+            elif operator == "$sort":
+                for key, direction in reversed(list(spec.items())):
+                    documents.sort(key=lambda document: document[key], reverse=direction == -1)
+            else:
+                raise NotImplementedError(operator)
+        return iter(documents)
+
+    @staticmethod
+    def _group(documents, spec):
+        def evaluate(expression, document):
+            if isinstance(expression, dict):
+                return {key: evaluate(value, document) for key, value in expression.items()}
+            if isinstance(expression, str) and expression.startswith("$"):
+                return document.get(expression[1:])
+            return expression
+
+        groups = {}
+        for document in documents:
+            group_id = evaluate(spec["_id"], document)
+            key = repr(group_id)
+            group = groups.setdefault(key, {"_id": group_id})
+            for field, accumulator in spec.items():
+                if field == "_id":
+                    continue
+                (operator, expression), = accumulator.items()
+                value = evaluate(expression, document)
+                if operator == "$sum":
+                    group[field] = group.get(field, 0) + value
+                elif operator == "$min":
+                    group[field] = value if field not in group else min(group[field], value)
+                elif operator == "$addToSet":
+                    values = group.setdefault(field, [])
+                    if value not in values:
+                        values.append(value)
+                else:
+                    raise NotImplementedError(operator)
+        return list(groups.values())
+
+
+class FakeDatabase(dict):
+    def __init__(self, name: str = "test"):
+        super().__init__()
+        self.name = name
+
+    def __missing__(self, collection_name):
+        collection = self[collection_name] = FakeCollection()
+        return collection
@@ -0,0 +1,135 @@
+import pytest
+import llm.resilience as resilience
+from llm.resilience import CircuitBreaker, CircuitOpenError, call_with_retry
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt, retry_after=None: 0)
+    monkeypatch.setattr(resilience, "_breakers", {})
+
+
+def elapse_reset(breaker: CircuitBreaker):
+    breaker._opened_at -= breaker.reset_seconds
+
+
+def failing_requests(*outcomes):
+    """outcomes를 차례로 발생시키거나 반환하는 request(timeout)와 호출 횟수 목록을 반환합니다."""
+    calls = []
+
+    def request(timeout):
+        outcome = outcomes[len(calls)]
+        calls.append(timeout)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return request, calls
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("svc", failure_threshold=3, reset_seconds=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("svc", failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = CircuitBreaker("svc", failure_threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    elapse_reset(breaker)
+
+    assert breaker.before_call() is True
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    # 시험 요청을 가진 쪽의 재시도는 막지 않음
+    assert breaker.before_call(holds_probe=True) is True
+
+
+def test_probe_success_closes_and_failure_reopens():
+    breaker = CircuitBreaker("svc", failure_threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    elapse_reset(breaker)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    elapse_reset(breaker)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call(holds_probe=True)
+
+
+def test_server_errors_open_the_circuit_and_stop_retrying(monkeypatch):
+    monkeypatch.setattr(resilience, "get_circuit_breaker", lambda service: breaker)
+    breaker = CircuitBreaker("svc", failure_threshold=2, reset_seconds=60)
+    request, calls = failing_requests(StatusError(503), StatusError(503), "ok")
+
+    with pytest.raises(StatusError):
+        call_with_retry("svc", request)
+    assert len(calls) == 2
+    assert breaker.state == "open"
+
+
+def test_rate_limits_are_retried_without_opening_the_circuit(monkeypatch):
+    monkeypatch.setattr(resilience, "get_circuit_breaker", lambda service: breaker)
+    breaker = CircuitBreaker("svc", failure_threshold=1, reset_seconds=60)
+    request, calls = failing_requests(StatusError(429), StatusError(429), "ok")
+
+    assert call_with_retry("svc", request) == "ok"
+    assert len(calls) == 3
+    assert breaker.state == "closed"
+
+
+def test_half_open_probe_keeps_retrying_after_a_rate_limit(monkeypatch):
+    monkeypatch.setattr(resilience, "get_circuit_breaker", lambda service: breaker)
+    breaker = CircuitBreaker("svc", failure_threshold=1, reset_seconds=60)
+    breaker.record_failure()
+    elapse_reset(breaker)
+    request, calls = failing_requests(StatusError(429), "ok")
+
+    assert call_with_retry("svc", request) == "ok"
+    assert len(calls) == 2
+    assert breaker.state == "closed"
+
+
+def test_non_retryable_errors_are_not_recorded(monkeypatch):
+    monkeypatch.setattr(resilience, "get_circuit_breaker", lambda service: breaker)
+    breaker = CircuitBreaker("svc", failure_threshold=1, reset_seconds=60)
+    request, calls = failing_requests(StatusError(400))
+
+    with pytest.raises(StatusError):
+        call_with_retry("svc", request)
+    assert len(calls) == 1
+    assert breaker.state == "closed"
+
+
+def test_last_error_is_raised_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(resilience, "LLM_RETRY_MAX_ATTEMPTS", 2)
+    request, calls = failing_requests(StatusError(429), StatusError(429), "ok")
+
+    with pytest.raises(StatusError):
+        call_with_retry("svc", request)
+    assert len(calls) == 2
@@ -0,0 +1,32 @@
+import os
+from analyzer.corpus import fingerprint_file, scan_corpus_changes
+
+
+def manifest_of(*paths) -> dict:
+    manifest = {}
+    for path in paths:
+        document = fingerprint_file(path)
+        manifest[document["name"]] = {key: document[key] for key in ("size", "mtime", "content_hash")}
+    return manifest
+
+
+def test_scan_corpus_changes(tmp_path):
+    same, touched, changed, deleted = (tmp_path / name for name in ("same.txt", "touched.txt", "changed.txt", "deleted.txt"))
+    for path in (same, touched, changed, deleted):
+        path.write_text(f"{path.stem} 본문", encoding="utf-8")
+    manifest = manifest_of(same, touched, changed, deleted)
+
+    deleted.unlink()
+    os.utime(touched, (0, touched.stat().st_mtime + 10))
+    changed.write_text("내용이 바뀐 본문", encoding="utf-8")
+    (tmp_path / "added.txt").write_text("새 파일", encoding="utf-8")
+    (tmp_path / "ignored.md").write_text("txt가 아닌 파일", encoding="utf-8")
+
+    changes = scan_corpus_changes(tmp_path, manifest)
+
+    assert [document["name"] for document in changes["added"]] == ["added.txt"]
+    assert [document["name"] for document in changes["changed"]] == ["changed.txt"]
+    assert [document["name"] for document in changes["touched"]] == ["touched.txt"]
+    assert changes["unchanged"] == ["same.txt"]
+    assert changes["deleted"] == ["deleted.txt"]
+    assert "content" not in changes["added"][0]
@@ -0,0 +1,25 @@
+from analyzer.matcher import ParameterMatcher
+
+
+def test_find_all_reports_overlapping_values():
+    matcher = ParameterMatcher({"지역": ["서울", "서울역"], "역": ["울역"]})
+    found = {(start, end, value) for start, end, value, _ in matcher.find_all("서울역 앞")}
+    assert found == {(0, 2, "서울"), (0, 3, "서울역"), (1, 3, "울역")}
+
+
+def test_template_prefers_leftmost_longest_match():
+    matcher = ParameterMatcher({"지역": ["서울", "서울역"], "상품": ["커피"]})
+    assert matcher.template("서울역 커피 맛집") == ("[지역] [상품] 맛집", False)
+
+
+def test_template_flags_ambiguous_values():
+    shared = ParameterMatcher({"지역": ["강남"], "상호": ["강남"]})
+    assert shared.template("강남 맛집") == ("[지역] 맛집", True)
+
+    overlapping = ParameterMatcher({"지역": ["서울역"], "역": ["역앞"]})
+    assert overlapping.template("서울역앞") == ("[지역]앞", True)
+
+
+def test_text_without_values_is_unchanged():
+    matcher = ParameterMatcher({"지역": ["서울", ""]})
+    assert matcher.template("부산 맛집") == ("부산 맛집", False)
@@ -0,0 +1,61 @@
+import pytest
+import analyzer.prompt_budget as prompt_budget
+from analyzer.prompt_budget import MESSAGE_OVERHEAD_TOKENS, PromptAssembler, PromptTooLargeError, token_ratio
+
+
+@pytest.fixture(autouse=True)
+def char_tokens(monkeypatch):
+    # 토크나이저 대신 글자 수를 토큰 수로 사용
+    monkeypatch.setattr(prompt_budget, "count_tokens", len)
+    monkeypatch.setattr(prompt_budget, "token_usage_log", prompt_budget.deque(maxlen=1000))
+
+
+def join(items):
+    return "".join(items)
+
+
+def test_section_budget_trims_trailing_items():
+    assembler = PromptAssembler(max_tokens=100, ratio=1.0)
+    assembler.add("snippets", ["aaaa", "bbbb", "cccc"], join, budget=9)
+    rendered, report = assembler.build()
+    assert rendered == {"snippets": "aaaabbbb"}
+    assert report["trimmed_items"] == {"snippets": 1}
+    assert report["predicted_prompt_tokens"] == 8 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_lowest_priority_section_is_trimmed_to_fit():
+    assembler = PromptAssembler(max_tokens=20 + 2 * MESSAGE_OVERHEAD_TOKENS, ratio=1.0)
+    assembler.add("system", ["s" * 10], join, required=True, priority=10)
+    assembler.add("context", ["aaaa", "bbbb", "cccc"], join, priority=1)
+    rendered, report = assembler.build()
+    assert rendered["context"] == "aaaabbbb"
+    assert report["predicted_prompt_tokens"] == 18 + 2 * MESSAGE_OVERHEAD_TOKENS
+
+
+def test_required_sections_that_do_not_fit_raise():
+    assembler = PromptAssembler(max_tokens=10, ratio=1.0)
+    assembler.add("system", ["s" * 20], join, required=True)
+    with pytest.raises(PromptTooLargeError):
+        assembler.build()
+
+
+def test_ratio_scales_counts_but_not_counted_tokens():
+    assembler = PromptAssembler(max_tokens=100, ratio=1.5)
+    assembler.add("system", ["s" * 10], join, required=True)
+    _, report = assembler.build()
+    assert report["section_tokens"] == {"system": 15}
+    assert report["counted_prompt_tokens"] == 10 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_token_ratio_needs_enough_samples_and_is_clamped():
+    log = prompt_budget.token_usage_log
+    log.extend({"prompt_tokens": 150, "counted_prompt_tokens": 100} for _ in range(prompt_budget.TOKEN_RATIO_MIN_SAMPLES - 1))
+    assert token_ratio() == 1.0
+    log.append({"prompt_tokens": 150, "counted_prompt_tokens": 100})
+    assert token_ratio() == 1.5
+
+    log.extend({"prompt_tokens": 1000, "counted_prompt_tokens": 100} for _ in range(100))
+    assert token_ratio() == prompt_budget.TOKEN_RATIO_MAX
+    log.clear()
+    log.extend({"prompt_tokens": 50, "counted_prompt_tokens": 100} for _ in range(50))
+    assert token_ratio() == 1.0
@@ -0,0 +1,23 @@
+from analyzer.retrieval import CharNgramBM25Index, ContextRetriever, char_ngrams
+
+
+def test_char_ngrams_stay_inside_words():
+    assert char_ngrams("가나다 라마") == ["가나", "나다", "가나다", "라마"]
+
+
+def test_search_ranks_relevant_documents_first():
+    index = CharNgramBM25Index(["강아지 사료 추천", "고양이 모래 후기", "강아지 간식과 사료"])
+    ranked = [row for row, _ in index.search("강아지 사료")]
+    assert sorted(ranked[:2]) == [0, 2]
+    assert 1 not in ranked
+    assert index.search("자동차") == []
+
+
+def test_select_snippets_respects_top_k():
+    retriever = ContextRetriever(["커피 원두 추천", "원두 보관법", "녹차 효능"])
+    assert retriever.select_snippets("원두", top_k=1) in (["커피 원두 추천"], ["원두 보관법"])
+    assert set(retriever.select_snippets("원두", top_k=5)) == {"커피 원두 추천", "원두 보관법"}
+
+
+def test_empty_index():
+    assert ContextRetriever([]).select_snippets("원두") == []
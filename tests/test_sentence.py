@@ -0,0 +1,16 @@
+from analyzer.sentence import iter_sentences, split_sentences
+
+
+def test_sentence_cut_by_a_chunk_boundary_is_carried_over():
+    text = "첫 문장입니다. 두 번째 문장이에요! 마지막 문장"
+    chunks = [text[i:i + 5] for i in range(0, len(text), 5)]
+    assert list(iter_sentences(chunks)) == split_sentences(text)
+
+
+def test_chunk_ending_exactly_at_a_boundary():
+    assert list(iter_sentences(["좋습니다. ", "정말 좋다.", "  "])) == ["좋습니다.", "정말 좋다."]
+
+
+def test_empty_input():
+    assert list(iter_sentences([])) == []
+    assert list(iter_sentences(["", "   "])) == []
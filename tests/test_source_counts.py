@@ -0,0 +1,103 @@
+import re
+import click
+import pytest
+import main
+from mongodb_service import ANALYSIS_COLLECTIONS, MANIFEST_COLLECTION, MongoDBService
+from tests.fake_mongo import FakeDatabase
+
+
+@pytest.fixture
+def db_service():
+    service = MongoDBService.__new__(MongoDBService)
+    service.db = FakeDatabase()
+    return service
+
+
+def source_counts(db_service, collection_name="morphemes", field="word") -> dict:
+    return {document[field]: document["source_count"] for document in db_service.db[collection_name].documents}
+
+
+def test_upsert_counts_each_source_once(db_service):
+    documents = [
+        {"word": "사과", "sources": ["a.txt"]},
+        {"word": "사과", "sources": ["a.txt"]},
+        {"word": "바나나", "sources": ["a.txt", "b.txt"]},
+    ]
+    counts = db_service.upsert_sourced_documents("morphemes", documents, timestamp=1.0, chunk_size=2)
+    assert counts == {"new": 2, "existing": 0, "failed": 0}
+    assert source_counts(db_service) == {"사과": 1, "바나나": 2}
+
+    # 이미 기록된 (키, 파일) 쌍은 다시 세지 않음
+    counts = db_service.upsert_sourced_documents("morphemes", documents, timestamp=2.0)
+    assert counts == {"new": 0, "existing": 0, "failed": 0}
+    assert source_counts(db_service) == {"사과": 1, "바나나": 2}
+
+    counts = db_service.upsert_sourced_documents("morphemes", [{"word": "사과", "sources": ["c.txt"]}], timestamp=3.0)
+    assert counts == {"new": 0, "existing": 1, "failed": 0}
+    assert source_counts(db_service) == {"사과": 2, "바나나": 2}
+
+
+def test_retract_removes_rows_left_without_sources(db_service):
+    db_service.upsert_sourced_documents("morphemes", [
+        {"word": "사과", "sources": ["a.txt"]},
+        {"word": "바나나", "sources": ["a.txt", "b.txt"]},
+    ], timestamp=1.0)
+    db_service.upsert_sourced_documents("expressions", [
+        {"category": "맛", "expression": "달다", "sources": ["a.txt"]},
+    ], timestamp=1.0)
+
+    removed = db_service.retract_sources(["a.txt"])
+
+    assert removed == {"morphemes": 1, "sentences": 0, "expressions": 1, "parameters": 0}
+    assert source_counts(db_service) == {"바나나": 1}
+    assert [document["source"] for document in db_service.db["morphemes_sources"].documents] == ["b.txt"]
+    assert db_service.db["expressions"].documents == []
+
+
+def fake_document_analysis(db_service, documents, timestamp, max_workers=None, workers=None):
+    """AI 호출 없이 공백으로 나눈 단어와 줄 단위 문장만 저장하는 run_document_analysis 대역입니다."""
+    counts = {collection_name: {"new": 0, "existing": 0, "failed": 0} for collection_name in ANALYSIS_COLLECTIONS}
+    for document in documents:
+        text = document["path"].read_text(encoding="utf-8")
+        words = [{"word": word, "sources": [document["name"]]} for word in sorted(set(re.findall(r"\S+", text)))]
+        sentences = [{"sentence": line, "sources": [document["name"]]} for line in text.splitlines() if line]
+        counts["morphemes"] = db_service.upsert_sourced_documents("morphemes", words, timestamp)
+        counts["sentences"] = db_service.upsert_sourced_documents("sentences", sentences, timestamp)
+    return counts, set()
+
+
+@pytest.fixture
+def analyze(db_service, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "MongoDBService", lambda db_name=None: db_service)
+    monkeypatch.setattr(db_service, "ensure_analysis_indexes", lambda: None)
+    monkeypatch.setattr(main, "run_document_analysis", fake_document_analysis)
+    monkeypatch.setattr(click, "echo", lambda *args, **kwargs: None)
+    return lambda: main.analyze_and_store(tmp_path)
+
+
+def test_manifest_round_trip(analyze, db_service, tmp_path):
+    (tmp_path / "a.txt").write_text("사과 바나나", encoding="utf-8")
+    (tmp_path / "b.txt").write_text("바나나 포도", encoding="utf-8")
+
+    summary = analyze()
+    assert (summary["added"], summary["retracted"]) == (2, 2)
+    assert source_counts(db_service) == {"사과": 1, "바나나": 2, "포도": 1}
+    assert {document["_id"] for document in db_service.db[MANIFEST_COLLECTION].documents} == {"a.txt", "b.txt"}
+
+    # 바뀐 파일이 없으면 아무것도 철회하거나 다시 쓰지 않음
+    assert analyze()["retracted"] == 0
+
+    # 내용이 바뀐 파일은 이전 행을 철회한 뒤 다시 분석
+    (tmp_path / "a.txt").write_text("체리 바나나 멜론", encoding="utf-8")
+    summary = analyze()
+    assert (summary["changed"], summary["retracted"]) == (1, 1)
+    assert source_counts(db_service) == {"바나나": 2, "포도": 1, "체리": 1, "멜론": 1}
+
+    # 삭제된 파일의 행과 manifest 항목은 제거
+    (tmp_path / "b.txt").unlink()
+    summary = analyze()
+    assert summary["deleted"] == 1
+    assert source_counts(db_service) == {"바나나": 1, "체리": 1, "멜론": 1}
+    assert source_counts(db_service, "sentences", "sentence") == {"체리 바나나 멜론": 1}
+    assert [document["_id"] for document in db_service.db[MANIFEST_COLLECTION].documents] == ["a.txt"]
+    assert db_service.get_latest_analysis_data()["unique_words"] == ["바나나", "멜론", "체리"]
@@ -0,0 +1,97 @@
+import asyncio
+import sys
+from analyzer.context_artifact import build_category_artifact, is_artifact_current
+from analyzer.retrieval import ContextRetriever
+from config import (
+    ANALYSIS_CACHE_MAX_ENTRIES,
+    ANALYSIS_CACHE_TTL_SECONDS,
+    ANALYSIS_CACHE_MAX_BYTES,
+)
+from mongodb_service import AsyncMongoDBService
+from utils.ttl_cache import TTLCache
+
+
+def _strings_bytes(strings) -> int:
+    return sum(sys.getsizeof(string) for string in strings)
+
+
+def _snapshot_weight(entry: dict) -> int:
+    """
+    스냅샷이 차지하는 대략적인 메모리(바이트)를 계산합니다. 문장 검색 인덱스의 BM25 행렬과 n-gram 사전도 포함합니다.
+    TTL이 지나 같은 스냅샷을 다시 저장할 때 또 세지 않도록 결과를 항목에 기록해 둡니다.
+    """
+    if "nbytes" in entry:
+        return entry["nbytes"]
+    data = entry["data"]
+    weight = _strings_bytes(data["unique_words"]) + _strings_bytes(data["sentences"])
+    for grouped in (data["expressions"], data["parameters"]):
+        weight += sum(sys.getsizeof(key) + _strings_bytes(values) for key, values in grouped.items())
+    if entry.get("retriever") is not None:
+        # 문장 문자열은 data와 공유하므로 목록 자체와 인덱스만 더함
+        retriever = entry["retriever"]
+        weight += sys.getsizeof(retriever.sentences) + retriever.sentence_index.nbytes
+    if entry.get("artifact"):
+        weight += sys.getsizeof(entry["artifact"]["prefix"])
+    entry["nbytes"] = weight
+    return weight
+
+
+# 카테고리 DB 이름 -> {"version": 분석 버전, "data": 분석 스냅샷, "retriever": 문장 검색 인덱스, "artifact": 고정 컨텍스트 아티팩트}
+analysis_snapshot_cache = TTLCache(
+    max_entries=ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS,
+    max_weight=ANALYSIS_CACHE_MAX_BYTES,
+    weigher=_snapshot_weight,
+)
+# 카테고리 DB 이름 -> 진행 중인 스냅샷 로드 작업 (같은 카테고리의 동시 캐시 미스가 DB 조회와 인덱스 구축을 한 번만 하도록)
+_loading = {}
+
+
+async def get_analysis_snapshot(db_service: AsyncMongoDBService) -> dict:
+    """
+    카테고리의 분석 스냅샷, 문장 검색 인덱스, 컨텍스트 아티팩트를 캐시에서 가져옵니다.
+    캐시에 없으면 같은 카테고리에 대해 이미 진행 중인 로드 작업이 있을 때 그 결과를 함께 기다립니다.
+    """
+    cache_key = db_service.db.name
+    entry = analysis_snapshot_cache.get(cache_key)
+    if entry is not None:
+        return entry
+
+    task = _loading.get(cache_key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.create_task(_load_analysis_snapshot(db_service, cache_key))
+        _loading[cache_key] = task
+
+        def forget(done):
+            if _loading.get(cache_key) is done:
+                del _loading[cache_key]
+
+        task.add_done_callback(forget)
+    # 기다리던 요청 하나가 취소되어도 다른 요청이 기다리는 로드 작업은 계속 진행
+    return await asyncio.shield(task)
+
+
+async def _load_analysis_snapshot(db_service: AsyncMongoDBService, cache_key: str) -> dict:
+    """
+    아티팩트는 analyze 단계에서 저장된 것을 그대로 쓰고, 없거나 분석 버전과 맞지 않을 때만 새로 만듭니다.
+    TTL이 지나면 버전 문서만 확인하여, 분석이 다시 실행되지 않았다면 DB 조회 없이 캐시를 재사용합니다.
+    """
+    version = await db_service.get_analysis_version()
+    stale_entry = analysis_snapshot_cache.get_stale(cache_key)
+    if stale_entry is not None and version is not None and stale_entry["version"] == version:
+        analysis_snapshot_cache.set(cache_key, stale_entry)
+        return stale_entry
+
+    data = await db_service.get_latest_analysis_data()
+    entry = {"version": version, "data": data, "retriever": None, "artifact": None}
+    if all(data.values()):
+        # 검색 인덱스·아티팩트 구축은 CPU 작업이므로 이벤트 루프 밖에서 수행
+        entry["retriever"] = await asyncio.to_thread(ContextRetriever, data["sentences"])
+        artifact = await db_service.get_context_artifact()
+        if not is_artifact_current(artifact, version):
+            # analyze 단계와 같은 TF-IDF 상위 단어로 만들어야 접두부(content_hash)가 같아짐
+            morpheme_counts = await db_service.get_morpheme_counts()
+            artifact = await asyncio.to_thread(build_category_artifact, data, morpheme_counts, version=version)
+        entry["artifact"] = artifact
+        analysis_snapshot_cache.set(cache_key, entry)
+    return entry
@@ -1,20 +1,15 @@
-from openai import OpenAI
 from config import OPENAI_API_KEY
+from utils.llm_cache import cached_chat_completion, cached_chat_completion_async
 
-def categorize_keyword_with_ai(keyword: str) -> str:
-    """
-    주어진 키워드를 AI를 사용하여 분석하고, 가장 적합한 카테고리를 반환합니다.
-    """
-    if not OPENAI_API_KEY:
-        raise ValueError("API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
-    client = OpenAI(api_key=OPENAI_API_KEY)
+# 카테고리 목록 예시입니다. 필요에 따라 수정하거나 확장할 수 있습니다.
+CATEGORIES = [
+    "hospital", "legalese", "beauty-treatment", "functional-food",
+    "startup", "home-appliances", "other"
+]
 
-    # 카테고리 목록 예시입니다. 필요에 따라 수정하거나 확장할 수 있습니다.
-    categories = [
-        "hospital", "legalese", "beauty-treatment", "functional-food", 
-        "startup", "home-appliances", "other"
-    ]
+CATEGORIZE_MODEL = "o3-2025-04-16"
 
+def _build_messages(keyword: str) -> list:
     prompt = f"""
     다음 키워드가 어떤 카테고리에 가장 적합한지 아래 목록에서 하나만 골라주세요.
     다른 설명 없이 카테고리 이름만 정확하게 반환해야 합니다.
@@ -23,26 +18,53 @@ def categorize_keyword_with_ai(keyword: str) -> str:
     {keyword}
 
     [카테고리 목록]
-    {', '.join(categories)}
+    {', '.join(CATEGORIES)}
+    """
+    return [
+        {"role": "system", "content": "You are a keyword categorization expert."},
+        {"role": "user", "content": prompt}
+    ]
+
+def _normalize_category(category: str) -> str:
+    # AI가 목록에 없는 답변을 할 경우를 대비한 안전장치
+    if category not in CATEGORIES:
+        return "기타"
+    return category
+
+def categorize_keyword_with_ai(keyword: str) -> str:
+    """
+    주어진 키워드를 AI를 사용하여 분석하고, 가장 적합한 카테고리를 반환합니다.
     """
+    if not OPENAI_API_KEY:
+        raise ValueError("API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
 
     try:
-        response = client.chat.completions.create(
-            model="o3-2025-04-16",
-            messages=[
-                {"role": "system", "content": "You are a keyword categorization expert."},
-                {"role": "user", "content": prompt}
-            ],
+        category = cached_chat_completion(
+            "gpt",
+            model=CATEGORIZE_MODEL,
+            messages=_build_messages(keyword),
             # temperature=0.0,
         )
-        
-        category = response.choices[0].message.content.strip()
-        
-        # AI가 목록에 없는 답변을 할 경우를 대비한 안전장치
-        if category not in categories:
-            return "기타"
-            
-        return category
+        return _normalize_category(category)
+
+    except Exception as e:
+        print(f"OpenAI API 호출 중 오류가 발생했습니다: {e}")
+        return "기타" # 오류 발생 시 기본값 반환
+
+async def categorize_keyword_with_ai_async(keyword: str) -> str:
+    """
+    categorize_keyword_with_ai의 비동기 버전입니다. API 서버의 이벤트 루프를 막지 않습니다.
+    """
+    if not OPENAI_API_KEY:
+        raise ValueError("API 키가 설정되지 않았습니다. .env 파일에 OPENAI_API_KEY를 추가해주세요.")
+
+    try:
+        category = await cached_chat_completion_async(
+            "gpt",
+            model=CATEGORIZE_MODEL,
+            messages=_build_messages(keyword),
+        )
+        return _normalize_category(category)
 
     except Exception as e:
         print(f"OpenAI API 호출 중 오류가 발생했습니다: {e}")
@@ -50,5 +72,5 @@ def categorize_keyword_with_ai(keyword: str) -> str:
 
 
 
-# model='gpt-5-mini-2025-08-07',        
-            # model='gpt-5-2025-08-07',
\ No newline at end of file
+# model='gpt-5-mini-2025-08-07',
+            # model='gpt-5-2025-08-07',
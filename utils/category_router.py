@@ -0,0 +1,156 @@
+import asyncio
+import re
+import time
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from analyzer.retrieval import char_ngrams
+from config import (
+    CATEGORY_ROUTER_CACHE_MAX_ENTRIES,
+    CATEGORY_ROUTER_CACHE_TTL_SECONDS,
+    CATEGORY_ROUTER_MIN_COVERAGE,
+    CATEGORY_ROUTER_MIN_MARGIN,
+    CATEGORY_ROUTER_REFRESH_SECONDS,
+)
+from mongodb_service import AsyncMongoDBService
+from utils.categorize_keyword_with_ai import CATEGORIES, categorize_keyword_with_ai_async
+from utils.ttl_cache import TTLCache
+
+
+def normalize_keyword(keyword: str) -> str:
+    """캐시 키로 쓸 수 있도록 키워드의 대소문자와 공백을 정리합니다."""
+    return re.sub(r"\s+", " ", keyword.strip().lower())
+
+
+class CentroidClassifier:
+    """
+    카테고리별 분석 어휘로 만든 문자 n-gram TF-IDF 중심 벡터에 키워드를 코사인 유사도로 매칭하는 분류기입니다.
+    여러 카테고리에 공통으로 나오는 n-gram은 IDF로 가중치를 낮춥니다.
+    """
+
+    def __init__(self, vocabularies: dict):
+        self.labels = [label for label, words in vocabularies.items() if words]
+        self.ngram_index = {}
+        rows, cols, values = [], [], []
+        for row, label in enumerate(self.labels):
+            counts = Counter(ngram for word in vocabularies[label] for ngram in char_ngrams(word))
+            for ngram, count in counts.items():
+                rows.append(row)
+                cols.append(self.ngram_index.setdefault(ngram, len(self.ngram_index)))
+                values.append(count)
+
+        shape = (len(self.labels), len(self.ngram_index))
+        term_freq = sparse.csr_matrix((np.asarray(values, dtype=np.float32), (rows, cols)), shape=shape)
+        doc_freq = np.bincount(term_freq.indices, minlength=shape[1])
+        self.idf = (np.log((1 + shape[0]) / (1 + doc_freq)) + 1).astype(np.float32)
+
+        term_freq.data = np.log1p(term_freq.data) * self.idf[term_freq.indices]
+        norms = np.sqrt(np.asarray(term_freq.multiply(term_freq).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        self.centroids = sparse.diags(1 / norms) @ term_freq
+
+    def predict(self, text: str) -> tuple:
+        """
+        (카테고리, 차이, 포함 비율)을 반환합니다. 비교할 카테고리가 둘 미만이거나 매칭되는 n-gram이 없으면 (None, 0.0, 0.0)입니다.
+        차이는 (1위 유사도 - 2위 유사도) / 1위 유사도로, 1위가 2위보다 확실히 높을수록 1에 가까워집니다.
+        포함 비율은 키워드의 n-gram 중 1위 카테고리 어휘에 나오는 것의 비율입니다.
+        """
+        ngrams = char_ngrams(text)
+        counts = Counter(self.ngram_index[g] for g in ngrams if g in self.ngram_index)
+        # 카테고리가 하나뿐이면 2위와 비교할 수 없어 차이가 항상 1이 되므로 분류하지 않음
+        if not counts or len(self.labels) < 2:
+            return None, 0.0, 0.0
+        columns = np.fromiter(counts.keys(), dtype=np.int64)
+        query = np.log1p(np.fromiter(counts.values(), dtype=np.float32)) * self.idf[columns]
+        query /= np.linalg.norm(query)
+        scores = np.asarray(self.centroids[:, columns] @ query).ravel()
+
+        order = np.argsort(-scores)
+        best, second = float(scores[order[0]]), float(scores[order[1]])
+        if best <= 0:
+            return None, 0.0, 0.0
+        present = self.centroids[order[0], columns].toarray().ravel() > 0
+        coverage = float(np.fromiter(counts.values(), dtype=np.float32)[present].sum()) / len(ngrams)
+        return self.labels[order[0]], (best - second) / best, coverage
+
+
+class CategoryRouter:
+    """
+    키워드를 카테고리로 라우팅합니다. 다음 순서로 확인하고, 앞 단계에서 정해지면 뒤 단계는 건너뜁니다.
+    1. 메모리 LRU/TTL 캐시  2. MongoDB에 저장된 이전 분류 결과
+    3. 로컬 중심 벡터 분류기 (어휘가 있는 카테고리가 둘 이상이고, 포함 비율과 1·2위 차이가 기준 이상일 때)
+    4. LLM 분류 (categorize_keyword_with_ai_async)
+    분류기는 각 카테고리 DB의 최신 분석 어휘로 만들며, refresh_seconds마다 다시 만듭니다.
+    """
+
+    def __init__(
+        self,
+        categories: list = CATEGORIES,
+        min_coverage: float = CATEGORY_ROUTER_MIN_COVERAGE,
+        min_margin: float = CATEGORY_ROUTER_MIN_MARGIN,
+        refresh_seconds: float = CATEGORY_ROUTER_REFRESH_SECONDS,
+    ):
+        self.categories = list(categories)
+        self.min_coverage = min_coverage
+        self.min_margin = min_margin
+        self.refresh_seconds = refresh_seconds
+        self.cache = TTLCache(max_entries=CATEGORY_ROUTER_CACHE_MAX_ENTRIES, ttl_seconds=CATEGORY_ROUTER_CACHE_TTL_SECONDS)
+        self.classifier = None
+        self._classifier_built_at = 0.0
+        self._classifier_lock = asyncio.Lock()
+
+    async def _get_classifier(self) -> CentroidClassifier:
+        """분류기를 반환합니다. 만든 지 refresh_seconds가 지났으면 카테고리 어휘를 다시 불러와 새로 만듭니다."""
+        if self.classifier is not None and time.monotonic() - self._classifier_built_at < self.refresh_seconds:
+            return self.classifier
+        async with self._classifier_lock:
+            if self.classifier is None or time.monotonic() - self._classifier_built_at >= self.refresh_seconds:
+                vocabularies = await asyncio.gather(
+                    *(AsyncMongoDBService(db_name=category).get_vocabulary() for category in self.categories)
+                )
+                # 벡터 구축은 CPU 작업이므로 이벤트 루프 밖에서 수행
+                self.classifier = await asyncio.to_thread(
+                    CentroidClassifier, dict(zip(self.categories, vocabularies))
+                )
+                self._classifier_built_at = time.monotonic()
+        return self.classifier
+
+    async def route(self, keyword: str) -> str:
+        """키워드의 카테고리를 반환합니다."""
+        key = normalize_keyword(keyword)
+        category = self.cache.get(key)
+        if category is not None:
+            return category
+
+        meta_db = AsyncMongoDBService()
+        stored = await meta_db.get_keyword_category(key)
+        if stored is not None:
+            self.cache.set(key, stored["category"])
+            return stored["category"]
+
+        try:
+            classifier = await self._get_classifier()
+            label, confidence, coverage = classifier.predict(key)
+        except Exception as e:
+            print(f"로컬 카테고리 분류 중 오류가 발생했습니다: {e}")
+            label, confidence, coverage = None, 0.0, 0.0
+
+        if label is not None and coverage >= self.min_coverage and confidence >= self.min_margin:
+            category, source = label, "classifier"
+        else:
+            # 로컬 분류기가 확신하지 못할 때만 LLM에 요청
+            category, source = await categorize_keyword_with_ai_async(keyword=keyword), "llm"
+
+        print(f"키워드 카테고리 분류: '{keyword}' -> {category} ({source}, 신뢰도 {confidence:.2f})")
+        if category not in self.categories:
+            # LLM 호출 실패 등으로 생긴 기본값은 저장하지 않고 다음 요청에서 다시 분류
+            return category
+        self.cache.set(key, category)
+        try:
+            await meta_db.save_keyword_category(key, category, source, confidence)
+        except Exception as e:
+            print(f"키워드 분류 결과 저장 실패: {e}")
+        return category
+
+
+category_router = CategoryRouter()
@@ -0,0 +1,84 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+
+class TokenBucket:
+    """
+    초당 `rate`개의 토큰을 채우는 토큰 버킷 속도 제한기입니다. (스레드 안전)
+    고정 `time.sleep` 대신 API 호출 전에 `acquire()`를 호출하여 전체 호출 속도를 제한합니다.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate는 0보다 커야 합니다.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0):
+        """토큰을 얻을 때까지 대기합니다."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+# 현재 작업에 적용할 속도 제한기. llm.resilience가 API 호출을 시도할 때마다 토큰을 얻습니다.
+_rate_limiter = contextvars.ContextVar("rate_limiter", default=None)
+
+
+@contextmanager
+def rate_limited(rate_limiter: TokenBucket):
+    """with 블록 안의 LLM API 호출(재시도 포함)마다 rate_limiter의 토큰을 얻도록 합니다."""
+    token = _rate_limiter.set(rate_limiter)
+    try:
+        yield
+    finally:
+        _rate_limiter.reset(token)
+
+
+def current_rate_limiter():
+    """현재 작업에 지정된 속도 제한기를 반환합니다. 없으면 None입니다."""
+    return _rate_limiter.get()
+
+
+def run_concurrently(func, items: list, max_workers: int, rate_limiter: TokenBucket = None, on_done=None) -> list:
+    """
+    items의 각 항목에 func를 최대 max_workers개까지 동시에 실행합니다.
+    완료 순서와 관계없이 입력 순서대로 (item, result, error) 튜플 리스트를 반환하므로
+    결과 병합이 항상 결정적입니다. on_done(item, result, error)은 각 작업이 끝날 때마다 호출됩니다.
+    rate_limiter는 작업 단위가 아니라 실제 API 호출(재시도 포함)마다 적용되므로, 캐시 적중은 토큰을 쓰지 않습니다.
+    """
+    def call(item):
+        if rate_limiter is None:
+            return func(item)
+        with rate_limited(rate_limiter):
+            return func(item)
+
+    results = [None] * len(items)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(call, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = None, e
+            results[index] = (items[index], result, error)
+            if on_done:
+                on_done(items[index], result, error)
+    return results
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from config import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES
+from llm.providers import complete, acomplete
+
+
+class LLMResponseCache:
+    """
+    (모델, 시스템 프롬프트, 사용자 프롬프트)의 해시를 키로 LLM 응답을 저장하는 SQLite 기반 영구 캐시입니다.
+    TTL이 지난 항목은 무시되며, 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 제거합니다.
+    전체 크기는 저장·삭제할 때마다 누적해서 관리하므로, 한도를 넘었을 때만 테이블을 정리합니다.
+    """
+
+    # 한도를 넘으면 이 비율까지 줄여, 한도 근처에서 저장할 때마다 정리하지 않도록 함
+    EVICT_TARGET_RATIO = 0.9
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses (created_at)")
+        self._conn.commit()
+        self._total_bytes = 0
+        with self._lock:
+            self._evict(time.time())
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, **options) -> str:
+        """요청 내용을 정규화하여 SHA-256 키를 만듭니다."""
+        payload = json.dumps([model, system_prompt, user_prompt, options], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """캐시된 응답을 반환합니다. 없거나 만료되었으면 None을 반환합니다."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds and created_at + self.ttl_seconds < now:
+                self._delete_keys([key])
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str):
+        """응답을 저장하고 필요하면 크기 기준으로 오래된 항목을 제거합니다."""
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            if self.max_bytes and self._total_bytes > self.max_bytes:
+                self._evict(now)
+            self._conn.commit()
+
+    def _delete_keys(self, keys: list):
+        placeholders = ",".join("?" * len(keys))
+        freed = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM responses WHERE key IN ({placeholders})", keys).fetchone()[0]
+        self._conn.execute(f"DELETE FROM responses WHERE key IN ({placeholders})", keys)
+        self._total_bytes -= freed
+
+    def _evict(self, now: float):
+        """
+        만료된 항목을 지우고, 전체 크기가 한도를 넘으면 가장 오래 사용하지 않은 항목부터 한도의 EVICT_TARGET_RATIO까지 지웁니다.
+        캐시를 열 때와 누적 크기가 한도를 넘었을 때만 호출됩니다.
+        """
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        # 다른 프로세스(API 서버, 작업자)도 같은 파일에 쓰므로 정리할 때는 실제 크기로 다시 맞춤
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if not self.max_bytes or self._total_bytes <= self.max_bytes:
+            return
+        excess = self._total_bytes - self.max_bytes * self.EVICT_TARGET_RATIO
+        keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if excess <= 0:
+                break
+            keys.append(key)
+            excess -= size
+        for start in range(0, len(keys), 500):
+            self._delete_keys(keys[start:start + 500])
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """프로세스 전역 LLM 응답 캐시를 반환합니다. 캐시가 비활성화되어 있으면 None을 반환합니다."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES)
+    return _cache
+
+
+def _make_request_key(model: str, messages: list, options: dict) -> str:
+    system_prompt = "\n".join(m["content"] for m in messages if m["role"] == "system")
+    user_prompt = "\n".join(m["content"] for m in messages if m["role"] != "system")
+    return LLMResponseCache.make_key(model, system_prompt, user_prompt, **options)
+
+
+def cached_chat_completion(service: str, model: str, messages: list, parse=None, **kwargs):
+    """
+    llm.providers.complete 호출을 캐시로 감쌉니다. (재시도·서킷 브레이커는 complete가 처리)
+    응답 본문은 parse(content)가 성공한 경우에만 저장되며, parse 결과를 반환합니다.
+    """
+    parse = parse or (lambda content: content)
+    cache = get_llm_cache()
+    key = _make_request_key(model, messages, kwargs)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return parse(cached)
+
+    content = complete(service, messages, model=model, **kwargs)["content"].strip()
+    result = parse(content)
+    if cache is not None:
+        cache.set(key, content)
+    return result
+
+
+async def cached_chat_completion_async(service: str, model: str, messages: list, parse=None, **kwargs):
+    """
+    cached_chat_completion의 비동기 버전입니다.
+    SQLite 조회·저장(디스크 I/O와 분석 스레드와 공유하는 잠금)은 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+    """
+    parse = parse or (lambda content: content)
+    cache = await asyncio.to_thread(get_llm_cache)
+    key = _make_request_key(model, messages, kwargs)
+    if cache is not None:
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return parse(cached)
+
+    content = (await acomplete(service, messages, model=model, **kwargs))["content"].strip()
+    result = parse(content)
+    if cache is not None:
+        await asyncio.to_thread(cache.set, key, content)
+    return result
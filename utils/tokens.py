@@ -0,0 +1,44 @@
+try:
+    import tiktoken
+except ImportError:  # tiktoken이 없으면 추정치로 대체
+    tiktoken = None
+
+# gpt-4o / gpt-4.1 / gpt-5 계열이 사용하는 인코딩
+DEFAULT_ENCODING = "o200k_base"
+
+_encodings = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 텍스트의 토큰 수를 보수적으로 추정합니다.
+    ASCII는 약 4자당 1토큰, 한글 등 비 ASCII 문자는 1자당 1토큰으로 계산합니다.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def _get_encoding(encoding_name: str):
+    """인코딩을 한 번만 불러옵니다. 불러오지 못하면(미설치, 오프라인 등) None을 반환합니다."""
+    if encoding_name not in _encodings:
+        try:
+            _encodings[encoding_name] = tiktoken.get_encoding(encoding_name) if tiktoken else None
+        except Exception as e:
+            print(f"tiktoken 인코딩을 불러오지 못해 토큰 수를 추정합니다: {e}")
+            _encodings[encoding_name] = None
+    return _encodings[encoding_name]
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """
+    tiktoken으로 텍스트의 토큰 수를 로컬에서 정확히 셉니다.
+    tiktoken을 사용할 수 없으면 estimate_tokens의 추정치를 반환합니다.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    LRU + TTL 메모리 캐시입니다. (스레드 안전)
+    항목 수가 max_entries를, 또는 weigher로 계산한 총 무게가 max_weight를 넘으면
+    가장 오래 사용하지 않은 항목부터 제거합니다. 만료된 항목은 get()에서는 보이지 않지만,
+    재검증을 위해 get_stale()로는 꺼낼 수 있습니다.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_weight: int = None, weigher=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_weight = max_weight
+        self.weigher = weigher or (lambda value: 1)
+        self._entries = OrderedDict()  # key -> (value, weight, expires_at)
+        self._total_weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """만료되지 않은 값을 반환합니다."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def get_stale(self, key, default=None):
+        """만료 여부와 관계없이 저장된 값을 반환합니다."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[0]
+
+    def set(self, key, value):
+        """값을 저장하고 TTL을 새로 시작합니다."""
+        weight = self.weigher(value)
+        with self._lock:
+            self._pop(key)
+            if self.max_weight is not None and weight > self.max_weight:
+                return
+            self._entries[key] = (value, weight, time.monotonic() + self.ttl_seconds)
+            self._total_weight += weight
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_weight is not None and self._total_weight > self.max_weight)
+            ):
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, key):
+        """항목을 제거합니다."""
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_weight -= entry[1]